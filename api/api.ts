@@ -18,8 +18,14 @@ const api: AxiosInstance = axios.create({
     "Content-Type": "application/json",
     Accept: "application/json",
   },
+  // 304s are answered from etagCache below
+  validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
 });
 
+// Last response of each GET that carried an ETag, keyed by full URL.
+// Revalidating with If-None-Match turns unchanged data into an empty 304.
+const etagCache = new Map<string, { etag: string; data: unknown; headers: Record<string, unknown> }>();
+
 // ENHANCEMENT: Use an interceptor to automatically add auth tokens
 api.interceptors.request.use(
   async (config) => {
@@ -39,6 +45,13 @@ api.interceptors.request.use(
             config.params = { ...config.params, user_id: user.id };
         }
     }
+
+    if (config.method === "get") {
+      const cached = etagCache.get(api.getUri(config));
+      if (cached) {
+        config.headers["If-None-Match"] = cached.etag;
+      }
+    }
     return config;
   },
   (error) => {
@@ -46,4 +59,30 @@ api.interceptors.request.use(
   }
 );
 
+api.interceptors.response.use((response) => {
+  if (response.config.method !== "get") return response;
+  const key = api.getUri(response.config);
+  if (response.status === 304) {
+    const cached = etagCache.get(key);
+    if (cached) {
+      return { ...response, status: 200, data: cached.data, headers: { ...cached.headers, ...response.headers } };
+    }
+  } else if (response.headers.etag) {
+    etagCache.set(key, { etag: response.headers.etag, data: response.data, headers: { ...response.headers } });
+  }
+  return response;
+});
+
+// Follows the X-Next-Cursor header of keyset-paginated list endpoints
+export async function fetchAllPages<T>(url: string, params: Record<string, unknown> = {}): Promise<T[]> {
+  const items: T[] = [];
+  let after: string | undefined;
+  do {
+    const res = await api.get<T[]>(url, { params: { ...params, after } });
+    items.push(...(res.data || []));
+    after = res.headers["x-next-cursor"];
+  } while (after);
+  return items;
+}
+
 export default api;
\ No newline at end of file
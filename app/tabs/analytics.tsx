@@ -3,7 +3,7 @@ import { AlertCircle, TrendingUp } from "lucide-react-native";
 import { useEffect, useState } from "react";
 import { ActivityIndicator, Dimensions, StyleSheet, Text, View } from "react-native";
 import { BarChart, LineChart, PieChart } from "react-native-chart-kit";
-import api from "../../api/api";
+import { fetchAllPages } from "../../api/api";
 import { useAuth } from "../../contexts/AuthContext";
 import ScreenWrapper from "../../components/ScreenWrapper";
 import { COLORS, SIZING } from "../../constants/theme";
@@ -49,8 +49,7 @@ export default function AnalyticsScreen() {
       setLoading(true);
       try {
         // This route should be protected and get user from token
-        const res = await api.get(`/expenses/`); 
-        const data = res.data || [];
+        const data = await fetchAllPages<Expense>(`/expenses/`);
         setExpenses(data);
         processAnalytics(data);
       } catch (error) {
@@ -1,11 +1,96 @@
 # backend/ai/ai_model.py
-def get_ai_reply(query: str) -> str:
+from typing import Optional
+
+FORECAST_WORDS = ("forecast", "predict", "month", "budget", "spend", "spent", "projected")
+ANOMALY_WORDS = ("unusual", "anomal", "odd", "strange", "suspicious", "weird", "large", "big")
+GOAL_WORDS = ("goal", "saving", "save", "target")
+
+
+def _money(amount: float, currency: str) -> str:
+    return f"{currency} {amount:,.2f}"
+
+
+def _forecast_reply(insights: dict, category: Optional[str] = None) -> str:
+    forecast, currency = insights["forecast"], insights["currency"]
+    if category:
+        entry = next(c for c in forecast["categories"] if c["category"].lower() == category)
+        reply = (
+            f"You've spent {_money(entry['spent'], currency)} on {entry['category']} this month "
+            f"and are on track for about {_money(entry['projected'], currency)} by month end"
+        )
+        if entry["typical"]:
+            reply += f" (a typical month is {_money(entry['typical'], currency)})"
+        return reply + "."
+    reply = (
+        f"You've spent {_money(forecast['spent'], currency)} so far this month; at your usual pace "
+        f"that's about {_money(forecast['projected'], currency)} by month end."
+    )
+    if forecast["categories"]:
+        top = forecast["categories"][0]
+        reply += f" {top['category']} is the biggest line at {_money(top['projected'], currency)}."
+    return reply
+
+
+def _anomaly_reply(insights: dict, category: Optional[str] = None) -> str:
+    anomalies = [a for a in insights["anomalies"] if category is None or a["category"].lower() == category]
+    if not anomalies:
+        return "Nothing unusual in the last 30 days; your recent expenses look typical."
+    lines = [
+        f"{a['date']}: {_money(a['amount'], insights['currency'])} on {a['category']}"
+        + (f" ({a['description']})" if a["description"] else "")
+        + f", vs. a typical {_money(a['typical'], insights['currency'])}"
+        for a in anomalies[:3]
+    ]
+    return "These stand out from your usual spending:\n" + "\n".join(lines)
+
+
+def _goal_reply(insights: dict) -> str:
+    goals, currency = insights["goals"], insights["currency"]
+    if not goals:
+        return "You have no saving goals yet. Set a fixed monthly target and automate transfers to savings."
+    lines = []
+    for goal in goals:
+        if goal["remaining"] == 0:
+            lines.append(f"{goal['title']}: reached!")
+        elif goal["projected_completion"]:
+            lines.append(
+                f"{goal['title']}: {_money(goal['remaining'], currency)} to go, "
+                f"on track for {goal['projected_completion']:%b %Y}"
+            )
+        else:
+            lines.append(
+                f"{goal['title']}: {_money(goal['remaining'], currency)} to go; spend less than last month "
+                "to start closing the gap"
+            )
+    return "\n".join(lines)
+
+
+def get_ai_reply(query: str, insights: Optional[dict] = None) -> str:
+    """
+    Answers from a precomputed ai.insights summary. Without one (or without
+    any data in it) it falls back to generic tips.
+    """
     q = query.lower()
-    if "food" in q:
-        return "You’ve spent a lot on food; try a weekly meal plan to reduce costs."
-    if "travel" in q:
-        return "Travel expenses are high — consider public transport or carpooling."
-    if "saving" in q or "save" in q:
-        return "Set a fixed monthly target and automate transfers to savings."
-    # default
-    return "I need more data to give precise advice — try adding some expense entries first."
+    if insights is None or not (insights["forecast"]["categories"] or insights["goals"]):
+        if "food" in q:
+            return "You’ve spent a lot on food; try a weekly meal plan to reduce costs."
+        if "travel" in q:
+            return "Travel expenses are high — consider public transport or carpooling."
+        if "saving" in q or "save" in q:
+            return "Set a fixed monthly target and automate transfers to savings."
+        # default
+        return "I need more data to give precise advice — try adding some expense entries first."
+
+    categories = [c["category"].lower() for c in insights["forecast"]["categories"]]
+    category = next((c for c in categories if c in q), None)
+    if any(word in q for word in ANOMALY_WORDS):
+        return _anomaly_reply(insights, category)
+    if any(word in q for word in GOAL_WORDS):
+        return _goal_reply(insights)
+    if category or any(word in q for word in FORECAST_WORDS):
+        return _forecast_reply(insights, category)
+
+    reply = _forecast_reply(insights)
+    if insights["anomalies"]:
+        reply += f" {len(insights['anomalies'])} recent expense(s) look unusual; ask me about them."
+    return reply
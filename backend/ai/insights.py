@@ -0,0 +1,278 @@
+# backend/ai/insights.py
+"""
+Per-user spending insights behind the chatbot: month-end spend forecasts,
+unusual transactions and saving-goal completion dates. Everything runs
+locally on the CPU.
+
+An `Insights` model is built from two scans (see crud.get_insight_source).
+The first reads HISTORY_MONTHS of daily rollup rows and turns them into
+monthly per-category series. The second reads ANOMALY_LOOKBACK_DAYS of
+expenses, which provide the per-category amount distributions. Series and
+distributions are int64 arrays of minor units.
+
+Models are cached per (user, currency) in `cache.insights_cache`. New
+writes are folded in from a /sync-style change set (`get_changes(since=
+model.version)`), so a chat reply normally costs one primary-key lookup.
+A deleted expense, or a new day, rebuilds the model instead.
+"""
+import calendar
+import statistics
+from array import array
+from datetime import date as DateType, timedelta
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+import async_crud
+import cache
+import money
+
+HISTORY_MONTHS = 12          # months of monthly series, the current one included
+ANOMALY_LOOKBACK_DAYS = 180  # expenses the per-category distributions are fitted on
+RECENT_DAYS = 30             # how far back transactions are checked for anomalies
+SMOOTHING = 0.5              # exponential smoothing factor for daily spend rates
+Z_THRESHOLD = 3.0
+IQR_FENCE = 3.0              # Tukey's "far out" fence: Q3 + 3 * IQR
+MIN_SAMPLES = 8              # fewer amounts than this in a category: no anomaly test
+BUILD_ATTEMPTS = 3
+
+
+def _month_start(day: DateType, months_back: int = 0) -> DateType:
+    index = day.year * 12 + day.month - 1 - months_back
+    return DateType(index // 12, index % 12 + 1, 1)
+
+
+def _days_in_month(month: DateType) -> int:
+    return calendar.monthrange(month.year, month.month)[1]
+
+
+class Insights:
+    """One user's spending model in one currency, as of `today` and data version `version`."""
+
+    def __init__(self, user_id: int, currency: str, today: DateType, version: int):
+        self.user_id = user_id
+        self.currency = currency
+        self.today = today
+        self.version = version
+        self.months = [_month_start(today, back) for back in range(HISTORY_MONTHS - 1, -1, -1)]
+        self.lookback_start = today - timedelta(days=ANOMALY_LOOKBACK_DAYS)
+        self.recent_start = today - timedelta(days=RECENT_DAYS)
+        self.monthly: dict[str, array] = {}   # category -> minor units per month, oldest first
+        self.amounts: dict[str, array] = {}   # category -> amounts since lookback_start
+        self.recent: list[tuple] = []         # (id, date, category, amount_minor, description)
+        self.goals: dict[int, tuple] = {}     # id -> (title, target_minor, saved_minor)
+        self._summary: Optional[dict] = None
+
+    # ---- building / updating ----
+    def add_day_total(self, day: DateType, category: str, amount_minor: int) -> None:
+        if day < self.months[0] or day > self.today:
+            return
+        series = self.monthly.get(category)
+        if series is None:
+            series = self.monthly[category] = array("q", bytes(8 * len(self.months)))
+        series[(day.year - self.months[0].year) * 12 + day.month - self.months[0].month] += amount_minor
+        self._summary = None
+
+    def add_transaction(self, expense_id: int, day: DateType, category: str, amount_minor: int, description) -> None:
+        if day is None or day < self.lookback_start or day > self.today:
+            return
+        self.amounts.setdefault(category, array("q")).append(amount_minor)
+        if day >= self.recent_start:
+            self.recent.append((expense_id, day, category, amount_minor, description))
+        self._summary = None
+
+    def set_goal(self, goal) -> None:
+        if goal.currency != self.currency:
+            self.goals.pop(goal.id, None)
+        else:
+            self.goals[goal.id] = (goal.title, goal.target_amount_minor, goal.saved_amount_minor or 0)
+        self._summary = None
+
+    def apply(self, changes: dict) -> bool:
+        """
+        Folds in a get_changes() result. Returns False when the model must be
+        rebuilt instead, because an expense was deleted.
+        """
+        if any(tombstone.entity == "expense" for tombstone in changes["deleted"]):
+            return False
+        version = changes["token"]
+        for expense in changes["expenses"]:
+            # Rows at or below `version` are already counted; this also makes a repeated apply harmless.
+            if expense.change_seq <= self.version or expense.currency != self.currency or expense.date is None:
+                continue
+            self.add_day_total(expense.date, expense.category, expense.amount_minor)
+            self.add_transaction(expense.id, expense.date, expense.category, expense.amount_minor, expense.description)
+            version = max(version, expense.change_seq)
+        for goal in changes["goals"]:
+            self.set_goal(goal)
+        for tombstone in changes["deleted"]:
+            self.goals.pop(tombstone.row_id, None)
+        self.version = max(self.version, version)
+        self._summary = None
+        return True
+
+    # ---- results ----
+    def _major(self, minor: float) -> float:
+        return float(money.to_major(round(minor), self.currency))
+
+    def _daily_rate(self, series: array) -> tuple[float, float]:
+        """(smoothed daily rate over completed months, this month's daily rate so far), in minor units."""
+        rates = [total / _days_in_month(month) for month, total in zip(self.months, series)]
+        history = rates[:-1]
+        first = next((i for i, total in enumerate(series[:-1]) if total), None)
+        level = 0.0
+        if first is not None:
+            level = history[first]
+            for rate in history[first + 1:]:
+                level = SMOOTHING * rate + (1 - SMOOTHING) * level
+        return level, series[-1] / self.today.day
+
+    def forecast(self) -> dict:
+        """
+        Month-end spend per category: this month's spend plus a daily rate
+        for the remaining days. The rate blends the exponentially smoothed
+        history with this month's pace, weighted by how much of the month
+        has passed.
+        """
+        month = self.months[-1]
+        days = _days_in_month(month)
+        remaining = days - self.today.day
+        weight = self.today.day / days
+        categories = []
+        for category, series in self.monthly.items():
+            level, pace = self._daily_rate(series)
+            rate = pace if not level else weight * pace + (1 - weight) * level
+            projected = series[-1] + rate * remaining
+            if not projected and not level:
+                continue
+            categories.append({
+                "category": category,
+                "spent": self._major(series[-1]),
+                "projected": self._major(projected),
+                "typical": self._major(level * days),
+            })
+        categories.sort(key=lambda c: c["projected"], reverse=True)
+        return {
+            "month": month,
+            "days_left": remaining,
+            "spent": self._major(sum(series[-1] for series in self.monthly.values())),
+            "projected": round(float(sum(c["projected"] for c in categories)), money.exponent(self.currency)),
+            "categories": categories,
+        }
+
+    def anomalies(self) -> list[dict]:
+        """
+        Recent transactions that are outliers for their category: a z-score of
+        at least Z_THRESHOLD, or above the IQR_FENCE Tukey fence.
+        """
+        fences = {}
+        for category, amounts in self.amounts.items():
+            if len(amounts) < MIN_SAMPLES:
+                continue
+            mean = statistics.fmean(amounts)
+            stdev = statistics.pstdev(amounts, mu=mean)
+            q1, _, q3 = statistics.quantiles(amounts, n=4)
+            fences[category] = (mean, stdev, q3 + IQR_FENCE * (q3 - q1))
+
+        flagged = []
+        for expense_id, day, category, amount, description in self.recent:
+            if category not in fences:
+                continue
+            mean, stdev, fence = fences[category]
+            z = (amount - mean) / stdev if stdev else 0.0
+            if z >= Z_THRESHOLD or amount > fence:
+                flagged.append({
+                    "id": expense_id,
+                    "date": day,
+                    "category": category,
+                    "amount": self._major(amount),
+                    "description": description,
+                    "typical": self._major(mean),
+                    "z_score": round(z, 2),
+                })
+        flagged.sort(key=lambda a: a["z_score"], reverse=True)
+        return flagged
+
+    def monthly_savings(self) -> float:
+        """
+        Average monthly saving, in minor units, over the completed months. A
+        month's saving uses the same definition as /expenses/analysis: how
+        far spending fell below the month before.
+        """
+        totals = [sum(column) for column in zip(*self.monthly.values())][:-1]
+        first = next((i for i, total in enumerate(totals) if total), None)
+        if first is None or len(totals) - first < 2:
+            return 0.0
+        steps = list(zip(totals[first:], totals[first + 1:]))
+        return sum(max(before - after, 0) for before, after in steps) / len(steps)
+
+    def goal_projections(self) -> list[dict]:
+        rate = self.monthly_savings()
+        projections = []
+        for goal_id, (title, target, saved) in sorted(self.goals.items()):
+            remaining = max(target - saved, 0)
+            eta = None
+            if remaining == 0:
+                eta = self.today
+            elif rate > 0:
+                eta = self.today + timedelta(days=round(remaining / rate * 365.25 / 12))
+            projections.append({
+                "id": goal_id,
+                "title": title,
+                "target": self._major(target),
+                "saved": self._major(saved),
+                "remaining": self._major(remaining),
+                "monthly_saving": self._major(rate),
+                "projected_completion": eta,
+            })
+        return projections
+
+    def summary(self) -> dict:
+        """Everything the chatbot answers from; recomputed only after the model changes."""
+        if self._summary is None:
+            self._summary = {
+                "currency": self.currency,
+                "as_of": self.today,
+                "version": self.version,
+                "forecast": self.forecast(),
+                "anomalies": self.anomalies(),
+                "goals": self.goal_projections(),
+            }
+        return self._summary
+
+
+async def build(db: AsyncSession, user_id: int, currency: str, today: DateType, version: int) -> Insights:
+    model = Insights(user_id, currency, today, version)
+    rollup_rows, expense_rows = await async_crud.get_insight_source(
+        db, user_id, currency, model.months[0], model.lookback_start
+    )
+    for row in rollup_rows:
+        model.add_day_total(row.day, row.category, row.total_minor)
+    for row in expense_rows:
+        model.add_transaction(row.id, row.date, row.category, row.amount_minor, row.description)
+    for goal in await async_crud.get_goals_by_user(db, user_id):
+        model.set_goal(goal)
+    return model
+
+
+async def load(db: AsyncSession, user_id: int, currency: Optional[str] = None) -> Insights:
+    """The user's cached model, brought up to date; built from scratch only when needed."""
+    currency = currency or money.default_currency()
+    today = DateType.today()
+    key = (user_id, currency)
+    version = await async_crud.get_data_version(db, user_id)
+
+    model = cache.insights_cache.get(key)
+    if model is not None and model.today == today:
+        if model.version >= version:
+            return model
+        if model.apply(await async_crud.get_changes(db, user_id, since=model.version)):
+            return model
+
+    for _ in range(BUILD_ATTEMPTS):
+        model = await build(db, user_id, currency, today, version)
+        latest = await async_crud.get_data_version(db, user_id)
+        if latest == version:
+            # No write landed mid-build, so `version` describes exactly what was read.
+            cache.insights_cache.set(key, model)
+            return model
+        version = latest
+    return model
@@ -0,0 +1,524 @@
+# backend/archive.py
+"""
+Cold archive for old expenses.
+
+    python archive.py run [--horizon-months N] [--dry-run]   # archive every month older than the horizon
+    python archive.py restore --month YYYY-MM                # move an archived month back into `expenses`
+    python archive.py compact                                # drop unreferenced segments and files
+    python archive.py status
+
+`run` keeps the newest ARCHIVE_HORIZON_MONTHS months in `expenses`,
+counting the current one. Everything older moves into files under
+ARCHIVE_DIR, one file per month per run. On PostgreSQL, `run` also creates
+the partitions for the hot window and the next few months. An archived month
+is removed there by dropping its partition (see partitions.py); SQLite
+deletes its rows instead. Run it daily from cron and the hot table holds
+about the horizon's worth of rows however long the history gets.
+
+File layout: a magic line, then one segment per user. A segment is a 4-byte
+big-endian length followed by zlib-compressed JSON of column arrays (ids,
+days of the month, categories, ...). `expense_archives` records the user,
+month, file, offset and length of each segment, so a read decompresses only
+the segments it needs.
+
+Reads are transparent. crud's page, stream and full-sync queries look up
+the user's segments for the months in range, then merge their rows with the
+hot ones in the requested order. Rollup rows are never archived, so
+analysis, totals, trends and statements don't read the archive at all.
+Archived expenses are read-only: DELETE answers 404 until their month is
+restored.
+
+Files are written once and never changed. They only become visible when
+their catalog rows commit in the same transaction that removes the hot
+rows. A crash leaves at most an unreferenced file, which `compact` deletes.
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from collections import namedtuple
+from datetime import date as DateType, datetime, timezone
+from decimal import ROUND_CEILING, ROUND_FLOOR
+from functools import lru_cache
+from itertools import groupby
+from typing import Iterable, Iterator, Optional
+from sqlalchemy import and_, delete, func, insert, select, text, update
+from sqlalchemy.orm import Session
+from config import get_settings
+from database import SessionLocal
+from models import Expense, ExpenseArchive
+import money
+import partitions
+import schemas
+import search
+
+MAGIC = b"EXPENSE-ARCHIVE 1\n"
+SUFFIX = ".arc"
+MIN_HORIZON_MONTHS = 7  # ai/insights.py reads 180 days of individual expenses
+INSERT_BATCH_SIZE = 1000
+# `compact` leaves unreferenced files this recent alone: a run may be about
+# to commit them, or readers may still be on the catalog rows it replaced.
+COMPACT_GRACE_SECONDS = 3600
+
+# Same fields, in the same order, as crud.EXPENSE_COLUMNS rows.
+ArchivedExpense = namedtuple("ArchivedExpense", "id user_id category amount_minor currency description date")
+
+# Everything a segment stores, so `restore` puts rows back exactly as they were.
+ROW_COLUMNS = (
+    Expense.id, Expense.user_id, Expense.category, Expense.amount_minor, Expense.currency,
+    Expense.description, Expense.date, Expense.change_seq, Expense.updated_at,
+)
+
+
+def _file(name: str) -> str:
+    return os.path.join(get_settings().archive_dir, name)
+
+
+# ----------------------------
+# Segments
+# ----------------------------
+def encode_segment(user_id: int, month: DateType, rows: list) -> bytes:
+    """One user's rows for `month` (ROW_COLUMNS rows) as a compressed column set."""
+    columns = {
+        "user_id": user_id,
+        "month": month.isoformat(),
+        "id": [row.id for row in rows],
+        "day": [row.date.day for row in rows],
+        "category": [row.category for row in rows],
+        "amount_minor": [row.amount_minor for row in rows],
+        "currency": [row.currency for row in rows],
+        "description": [row.description for row in rows],
+        "change_seq": [row.change_seq for row in rows],
+        "updated_at": [row.updated_at.isoformat() if row.updated_at else None for row in rows],
+    }
+    return zlib.compress(json.dumps(columns, separators=(",", ":")).encode("utf-8"), 9)
+
+
+def read_columns(path: str, offset: int, length: int) -> dict:
+    with open(_file(path), "rb") as f:
+        f.seek(offset)
+        data = f.read(length)
+    return json.loads(zlib.decompress(data))
+
+
+@lru_cache(maxsize=256)
+def load_segment(path: str, offset: int, length: int) -> tuple:
+    """A segment's rows as ArchivedExpense tuples. Segments never change, so they are cached as is."""
+    return _rows(read_columns(path, offset, length))
+
+
+def _rows(columns: dict) -> tuple:
+    month = DateType.fromisoformat(columns["month"])
+    user_id = columns["user_id"]
+    return tuple(
+        ArchivedExpense(expense_id, user_id, category, amount_minor, currency, description, month.replace(day=day))
+        for expense_id, day, category, amount_minor, currency, description in zip(
+            columns["id"], columns["day"], columns["category"],
+            columns["amount_minor"], columns["currency"], columns["description"],
+        )
+    )
+
+
+def as_expense(row: ArchivedExpense, change_seq: Optional[int] = None) -> Expense:
+    """A transient (never added to a session) Expense for callers that want ORM objects."""
+    return Expense(**row._asdict(), change_seq=change_seq)
+
+
+def change_ordered(segments: Iterable) -> list[Expense]:
+    """Every row in `segments` as transient Expenses, in /sync order (change_seq, id)."""
+    expenses = []
+    for segment in segments:
+        # load_segment's rows don't carry change_seq, so decode the columns once here instead.
+        columns = read_columns(segment.path, segment.byte_offset, segment.byte_length)
+        expenses.extend(as_expense(row, change_seq) for row, change_seq in zip(_rows(columns), columns["change_seq"]))
+    return sorted(expenses, key=lambda expense: (expense.change_seq, expense.id))
+
+
+# ----------------------------
+# Reads
+# ----------------------------
+def segments_stmt(user_id: int, start: Optional[DateType] = None, end: Optional[DateType] = None):
+    """The user's segments for months overlapping [start, end]."""
+    stmt = select(
+        ExpenseArchive.path, ExpenseArchive.byte_offset, ExpenseArchive.byte_length, ExpenseArchive.month,
+    ).where(ExpenseArchive.user_id == user_id)
+    if start is not None:
+        stmt = stmt.where(ExpenseArchive.month >= start.replace(day=1))
+    if end is not None:
+        stmt = stmt.where(ExpenseArchive.month <= end)
+    return stmt
+
+
+def _sort(filters: Optional[schemas.ExpenseFilter]) -> tuple[str, bool]:
+    sort = filters.sort if filters else "-date"
+    return sort.lstrip("-"), sort.startswith("-")
+
+
+def sort_key(column: str):
+    """(sort value, id), as crud.order_expenses orders them. SQLite sorts NULL dates first."""
+    if column == "date":
+        return lambda row: (row.date or DateType.min, row.id)
+    return lambda row: (row.amount_minor, row.id)
+
+
+def read_range(filters: Optional[schemas.ExpenseFilter], after: Optional[tuple]) -> tuple:
+    """The (start, end) dates that rows matching `filters` past the keyset `after` can have."""
+    start, end = (filters.start, filters.end) if filters else (None, None)
+    column, descending = _sort(filters)
+    if after is not None and column == "date":
+        if descending:
+            end = after[0] if end is None else min(end, after[0])
+        else:
+            start = after[0] if start is None else max(start, after[0])
+    return start, end
+
+
+def page_range(filters: Optional[schemas.ExpenseFilter], after: Optional[tuple], page: list, limit: int) -> tuple:
+    """
+    `read_range`, narrowed further when the hot rows already fill the page:
+    archived rows must then sort ahead of its last row to make it in.
+    """
+    start, end = read_range(filters, after)
+    column, descending = _sort(filters)
+    if column == "date" and len(page) >= limit and page[-1].date is not None:
+        last = page[-1].date
+        if descending:
+            start = last if start is None else max(start, last)
+        else:
+            end = last if end is None else min(end, last)
+    return start, end
+
+
+def row_filter(filters: Optional[schemas.ExpenseFilter]):
+    """crud.filter_expenses as a predicate on ArchivedExpense rows."""
+    if filters is None:
+        return lambda row: True
+    currency = low = high = None
+    if filters.currency or filters.min_amount is not None or filters.max_amount is not None:
+        currency = filters.currency or money.default_currency()
+    if filters.min_amount is not None:
+        low = money.to_minor(filters.min_amount, currency, ROUND_CEILING)
+    if filters.max_amount is not None:
+        high = money.to_minor(filters.max_amount, currency, ROUND_FLOOR)
+    categories = set(filters.categories)
+
+    def matches(row: ArchivedExpense) -> bool:
+        return (
+            (filters.start is None or row.date >= filters.start)
+            and (filters.end is None or row.date <= filters.end)
+            and (not categories or row.category in categories)
+            and (currency is None or row.currency == currency)
+            and (low is None or row.amount_minor >= low)
+            and (high is None or row.amount_minor <= high)
+            and (not filters.q or search.text_matches(filters.q, row.description))
+        )
+    return matches
+
+
+def ordered_rows(segments: Iterable, filters: Optional[schemas.ExpenseFilter], after: Optional[tuple] = None) -> Iterator[ArchivedExpense]:
+    """
+    The archived rows in `segments` that match `filters` and come after
+    `after`, in the filters' sort order. For date sorts, segments are only
+    decompressed once the iteration reaches their month.
+    """
+    column, descending = _sort(filters)
+    key = sort_key(column)
+    keep = row_filter(filters)
+
+    def wanted(group) -> list:
+        rows = [
+            row for segment in group for row in load_segment(segment.path, segment.byte_offset, segment.byte_length)
+            if keep(row) and (after is None or (key(row) < after if descending else key(row) > after))
+        ]
+        return sorted(rows, key=key, reverse=descending)
+
+    if column != "date":
+        yield from wanted(segments)
+        return
+    by_month = sorted(segments, key=lambda segment: segment.month, reverse=descending)
+    for _, group in groupby(by_month, key=lambda segment: segment.month):
+        yield from wanted(group)
+
+
+def merge_page(
+    page: list, segments: list, limit: int, after: Optional[tuple],
+    filters: Optional[schemas.ExpenseFilter], orm: bool = False,
+) -> list:
+    """The first `limit` rows of the hot `page` and the matching archived rows together."""
+    archived = []
+    for row in ordered_rows(segments, filters, after):
+        if len(archived) >= limit:
+            break
+        archived.append(as_expense(row) if orm else row)
+    if not archived:
+        return page
+    column, descending = _sort(filters)
+    return sorted(page + archived, key=sort_key(column), reverse=descending)[:limit]
+
+
+class Merger:
+    """Interleaves ordered archived rows into an ordered stream of hot rows (see crud.iter_expenses_by_user)."""
+
+    def __init__(self, archived: Iterator[ArchivedExpense], filters: Optional[schemas.ExpenseFilter]):
+        column, self.descending = _sort(filters)
+        self.key = sort_key(column)
+        self.archived = archived
+        self.next = next(archived, None)
+
+    def before(self, row) -> Iterator[dict]:
+        """Archived rows, as dicts, that come ahead of the hot `row`."""
+        key = self.key(row)
+        while self.next is not None and (self.key(self.next) > key if self.descending else self.key(self.next) < key):
+            yield self.next._asdict()
+            self.next = next(self.archived, None)
+
+    def rest(self) -> Iterator[dict]:
+        while self.next is not None:
+            yield self.next._asdict()
+            self.next = next(self.archived, None)
+
+
+# ----------------------------
+# Maintenance
+# ----------------------------
+def hot_window_start(horizon_months: int, today: Optional[DateType] = None) -> DateType:
+    """First day of the oldest month kept in `expenses`."""
+    return partitions.add_months((today or DateType.today()).replace(day=1), 1 - horizon_months)
+
+
+def cold_months(db: Session, cutoff: DateType) -> list[DateType]:
+    """Months before `cutoff` that still have rows (or, on PostgreSQL, a partition) in `expenses`."""
+    if db.get_bind().dialect.name == "postgresql":
+        months = {month for month in partitions.monthly_partitions(db) if month < cutoff}
+        months.update(db.scalars(text(
+            f"SELECT DISTINCT CAST(date_trunc('month', date) AS DATE) FROM {partitions.DEFAULT_PARTITION} WHERE date < :cutoff"
+        ), {"cutoff": cutoff}))
+        return sorted(months)
+    months = db.scalars(select(func.distinct(func.strftime("%Y-%m", Expense.date))).where(Expense.date < cutoff))
+    return sorted(DateType.fromisoformat(f"{month}-01") for month in months)
+
+
+def _write_file(month: DateType, payloads: Iterable[bytes]) -> tuple[Optional[str], list[tuple[int, int]]]:
+    """
+    Writes the segments to a new file for `month`; returns its name and each
+    segment's (offset, length). No file is left behind when there are none.
+    """
+    directory = get_settings().archive_dir
+    os.makedirs(directory, exist_ok=True)
+    name = f"expenses-{month:%Y-%m}-{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}{SUFFIX}"
+    temporary = os.path.join(directory, name + ".tmp")
+    spans = []
+    try:
+        with open(temporary, "wb") as f:
+            f.write(MAGIC)
+            for payload in payloads:
+                f.write(struct.pack(">I", len(payload)))
+                spans.append((f.tell(), len(payload)))
+                f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        if not spans:
+            os.remove(temporary)
+            return None, []
+        os.replace(temporary, os.path.join(directory, name))
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    return name, spans
+
+
+def archive_month(db: Session, month: DateType) -> dict:
+    """Moves `month`'s rows out of `expenses` into a new archive file, in one transaction."""
+    in_month = and_(Expense.date >= month, Expense.date < partitions.add_months(month, 1))
+    partitioned = db.get_bind().dialect.name == "postgresql" and month in partitions.monthly_partitions(db)
+    try:
+        if partitioned:
+            # Writers to this month wait until the partition is gone; readers don't.
+            db.execute(text(f"LOCK TABLE {partitions.partition_name(month)} IN EXCLUSIVE MODE"))
+            rows = db.execute(
+                select(*ROW_COLUMNS).where(in_month)
+                .order_by(Expense.user_id, Expense.date, Expense.id)
+                .execution_options(yield_per=INSERT_BATCH_SIZE)
+            )
+        else:
+            # Deleted and read in one statement, so no concurrent insert can slip between the two.
+            deleted = db.execute(
+                delete(Expense).where(in_month).returning(*ROW_COLUMNS)
+                .execution_options(synchronize_session=False)
+            )
+            rows = sorted(deleted, key=lambda row: (row.user_id, row.date, row.id))
+        users = []  # (user_id, rows) per segment
+
+        def payloads() -> Iterator[bytes]:
+            for user_id, user_rows in groupby(rows, key=lambda row: row.user_id):
+                user_rows = list(user_rows)
+                users.append((user_id, len(user_rows)))
+                yield encode_segment(user_id, month, user_rows)
+
+        name, spans = _write_file(month, payloads())
+        entries = [
+            {"user_id": user_id, "month": month, "path": name, "byte_offset": offset, "byte_length": length, "row_count": count}
+            for (user_id, count), (offset, length) in zip(users, spans)
+        ]
+        if entries:
+            db.execute(insert(ExpenseArchive), entries)
+        if partitioned:
+            partitions.drop_partition(db, month)
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    return {
+        "month": f"{month:%Y-%m}", "file": name, "users": len(entries),
+        "rows": sum(entry["row_count"] for entry in entries),
+    }
+
+
+def run(db: Session, horizon_months: int, today: Optional[DateType] = None, dry_run: bool = False) -> list[dict]:
+    """Archives every month older than the newest `horizon_months`; one summary per month."""
+    if horizon_months < MIN_HORIZON_MONTHS:
+        raise ValueError(f"The horizon must be at least {MIN_HORIZON_MONTHS} months")
+    today = today or DateType.today()
+    cutoff = hot_window_start(horizon_months, today)
+    if db.get_bind().dialect.name == "postgresql" and not dry_run:
+        partitions.ensure_partitions(db, cutoff, partitions.add_months(today.replace(day=1), partitions.MONTHS_AHEAD))
+        db.commit()
+    summaries = []
+    for month in cold_months(db, cutoff):
+        if dry_run:
+            rows = db.scalar(select(func.count()).select_from(Expense).where(
+                Expense.date >= month, Expense.date < partitions.add_months(month, 1)
+            ))
+            summaries.append({"month": f"{month:%Y-%m}", "file": None, "rows": rows})
+        else:
+            summaries.append(archive_month(db, month))
+    return summaries
+
+
+def restore(db: Session, month: DateType) -> int:
+    """
+    Moves `month`'s archived rows back into `expenses` and drops its catalog
+    rows, in one transaction. The files stay until `compact` removes them.
+    """
+    entries = db.scalars(select(ExpenseArchive).where(ExpenseArchive.month == month)).all()
+    if db.get_bind().dialect.name == "postgresql":
+        partitions.ensure_partitions(db, month, month)
+    restored = 0
+    for entry in entries:
+        columns = read_columns(entry.path, entry.byte_offset, entry.byte_length)
+        rows = [
+            {
+                "id": expense_id, "user_id": columns["user_id"], "category": category,
+                "amount_minor": amount_minor, "currency": currency, "description": description,
+                "date": month.replace(day=day), "change_seq": change_seq,
+                "updated_at": datetime.fromisoformat(updated_at) if updated_at else None,
+            }
+            for expense_id, day, category, amount_minor, currency, description, change_seq, updated_at in zip(
+                columns["id"], columns["day"], columns["category"], columns["amount_minor"],
+                columns["currency"], columns["description"], columns["change_seq"], columns["updated_at"],
+            )
+        ]
+        for start in range(0, len(rows), INSERT_BATCH_SIZE):
+            db.execute(insert(Expense), rows[start:start + INSERT_BATCH_SIZE])
+        restored += len(rows)
+    db.execute(delete(ExpenseArchive).where(ExpenseArchive.month == month))
+    db.commit()
+    return restored
+
+
+def compact(db: Session) -> dict:
+    """
+    Rewrites files that hold segments the catalog no longer points at
+    (deleted users, restored months) and deletes files it doesn't point at
+    at all, once they are older than COMPACT_GRACE_SECONDS.
+    """
+    directory = get_settings().archive_dir
+    if not os.path.isdir(directory):
+        return {"rewritten": 0, "deleted": 0}
+    entries = {}
+    for entry in db.scalars(select(ExpenseArchive).order_by(ExpenseArchive.path, ExpenseArchive.byte_offset)):
+        entries.setdefault(entry.path, []).append(entry)
+    rewritten = deleted = 0
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if not name.endswith((SUFFIX, SUFFIX + ".tmp")):
+            continue
+        live = entries.get(name)
+        if not live:
+            if time.time() - os.path.getmtime(path) > COMPACT_GRACE_SECONDS:
+                os.remove(path)
+                deleted += 1
+            continue
+        if os.path.getsize(path) == len(MAGIC) + sum(4 + entry.byte_length for entry in live):
+            continue
+        # Copy the live segments to a new file and repoint the catalog at it.
+        month = live[0].month
+        with open(path, "rb") as source:
+            segments = []
+            for entry in live:
+                source.seek(entry.byte_offset)
+                segments.append(source.read(entry.byte_length))
+        new_name, spans = _write_file(month, segments)
+        for entry, (offset, _) in zip(live, spans):
+            db.execute(update(ExpenseArchive).where(ExpenseArchive.id == entry.id).values(path=new_name, byte_offset=offset))
+        db.commit()
+        os.utime(path)  # unreferenced from now on; deleted by a later run after the grace period
+        rewritten += 1
+    return {"rewritten": rewritten, "deleted": deleted}
+
+
+def status(db: Session) -> dict:
+    archived = db.execute(
+        select(
+            ExpenseArchive.month,
+            func.count(func.distinct(ExpenseArchive.user_id)),
+            func.sum(ExpenseArchive.row_count),
+            func.count(func.distinct(ExpenseArchive.path)),
+        ).group_by(ExpenseArchive.month).order_by(ExpenseArchive.month)
+    ).all()
+    result = {
+        "hot_rows": db.scalar(select(func.count()).select_from(Expense)),
+        "archived": [
+            {"month": f"{month:%Y-%m}", "users": users, "rows": int(rows), "files": files}
+            for month, users, rows, files in archived
+        ],
+    }
+    if db.get_bind().dialect.name == "postgresql":
+        result["partitions"] = [f"{month:%Y-%m}" for month in sorted(partitions.monthly_partitions(db))]
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["run", "restore", "compact", "status"])
+    parser.add_argument("--horizon-months", type=int, default=None, help="default: ARCHIVE_HORIZON_MONTHS")
+    parser.add_argument("--month", help="YYYY-MM, for restore")
+    parser.add_argument("--dry-run", action="store_true", help="run: only report what would be archived")
+    args = parser.parse_args(argv)
+    if args.command == "restore" and not args.month:
+        parser.error("restore needs --month")
+
+    db = SessionLocal()
+    try:
+        if args.command == "run":
+            horizon = args.horizon_months or get_settings().archive_horizon_months
+            for summary in run(db, horizon, dry_run=args.dry_run):
+                print(json.dumps(summary))
+        elif args.command == "restore":
+            rows = restore(db, DateType.fromisoformat(f"{args.month}-01"))
+            print(f"Restored {rows} expenses.")
+        elif args.command == "compact":
+            print(json.dumps(compact(db)))
+        else:
+            print(json.dumps(status(db), indent=2))
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
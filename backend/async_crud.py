@@ -0,0 +1,421 @@
+# backend/async_crud.py
+"""
+AsyncSession versions of the crud functions used by the FastAPI routes.
+Statement builders are shared with crud.py so both paths run the same SQL.
+"""
+from typing import AsyncIterator, Optional
+from datetime import datetime, date as DateType
+from sqlalchemy import Row, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+import cache
+from database import mark_written
+import hashing
+from models import User, Expense, SavingGoal, GoalContribution, ExpenseDailyRollup, SyncTombstone, Job
+import archive
+import crud
+import money
+import schemas
+
+# ----------------------------
+# User CRUD
+# ----------------------------
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    return await db.scalar(select(User).where(User.email == email).limit(1))
+
+async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
+    return await db.get(User, user_id)
+
+async def get_users_page(db: AsyncSession, limit: int, after: Optional[int] = None) -> list[Row]:
+    return list(await db.execute(crud.users_page_stmt(limit, after)))
+
+async def iter_users(db: AsyncSession, batch_size: int = 1000) -> AsyncIterator[dict]:
+    result = await db.stream(crud.users_export_stmt(batch_size))
+    async for row in result:
+        yield dict(row._mapping)
+
+async def count_users(db: AsyncSession, exact: bool = False) -> int:
+    """See crud.count_users."""
+    if not exact and db.bind.dialect.name == "postgresql":
+        estimate = await db.scalar(crud.user_estimate_stmt())
+        if estimate is not None and estimate >= 0:
+            return int(estimate)
+    return await db.scalar(select(func.count()).select_from(User))
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate) -> User:
+    hashed_password = await hashing.hasher.hash(user.password)
+    new_user = User(
+        name=user.name,
+        email=user.email,
+        password=hashed_password,
+        date_of_birth=user.date_of_birth,
+        age=user.age,
+        gender=user.gender
+    )
+    db.add(new_user)
+    await db.flush()
+    mark_written(db, new_user.id)
+    await db.commit()
+    await db.refresh(new_user)
+    return new_user
+
+async def verify_user_details(db: AsyncSession, details: schemas.UserVerifyRequest) -> Optional[User]:
+    return await db.scalar(select(User).where(
+        User.email == details.email,
+        User.name == details.name,
+        User.date_of_birth == details.date_of_birth
+    ).limit(1))
+
+async def update_user_password_by_email(db: AsyncSession, email: str, new_password: str) -> Optional[User]:
+    user = await get_user_by_email(db, email=email)
+    if user:
+        user.password = await hashing.hasher.hash(new_password)
+        await db.commit()
+        cache.user_cache.invalidate(email)
+        await db.refresh(user)
+        return user
+    return None
+
+async def update_password_hash(db: AsyncSession, user: User, hashed_password: str) -> None:
+    """Stores a re-computed hash (e.g. after a cost-factor bump) for an already verified user."""
+    user.password = hashed_password
+    await db.commit()
+    cache.user_cache.invalidate(user.email)
+
+async def get_data_version(db: AsyncSession, user_id: int) -> int:
+    return await db.scalar(crud.data_version_stmt(user_id)) or 0
+
+async def bump_data_version(db: AsyncSession, user_id: int) -> int:
+    """See crud.bump_data_version."""
+    mark_written(db, user_id)
+    return await db.scalar(crud.data_version_bump_stmt(user_id))
+
+# ----------------------------
+# Expense CRUD
+# ----------------------------
+async def get_expenses_page(
+    db: AsyncSession,
+    user_id: int,
+    limit: int,
+    after: Optional[tuple] = None,
+    filters: Optional[schemas.ExpenseFilter] = None,
+) -> list[Expense]:
+    stmt = crud.expenses_page_stmt(user_id, limit, after, filters, db.bind.dialect.name)
+    page = list(await db.scalars(stmt))
+    return await merge_archived_page(db, user_id, page, limit, after, filters, orm=True)
+
+async def get_expense_rows_page(
+    db: AsyncSession,
+    user_id: int,
+    limit: int,
+    after: Optional[tuple] = None,
+    filters: Optional[schemas.ExpenseFilter] = None,
+) -> list[Row]:
+    stmt = crud.expenses_page_stmt(user_id, limit, after, filters, db.bind.dialect.name, crud.EXPENSE_COLUMNS)
+    page = list(await db.execute(stmt))
+    return await merge_archived_page(db, user_id, page, limit, after, filters)
+
+async def merge_archived_page(
+    db: AsyncSession,
+    user_id: int,
+    page: list,
+    limit: int,
+    after: Optional[tuple],
+    filters: Optional[schemas.ExpenseFilter],
+    orm: bool = False,
+) -> list:
+    """Adds the archived rows that belong on `page` (see archive.py); reading segments happens off the event loop."""
+    segments = (await db.execute(crud.archive_page_stmt(user_id, page, limit, after, filters))).all()
+    if not segments:
+        return page
+    return await run_in_threadpool(archive.merge_page, page, segments, limit, after, filters, orm)
+
+async def iter_expenses_by_user(
+    db: AsyncSession,
+    user_id: int,
+    after: Optional[tuple] = None,
+    batch_size: int = 500,
+    filters: Optional[schemas.ExpenseFilter] = None,
+) -> AsyncIterator[dict]:
+    """See crud.iter_expenses_by_user."""
+    segments = (await db.execute(archive.segments_stmt(user_id, *archive.read_range(filters, after)))).all()
+    merger = archive.Merger(archive.ordered_rows(segments, filters, after), filters)
+    result = await db.stream(crud.expense_rows_stmt(user_id, after, batch_size, filters, db.bind.dialect.name))
+    async for row in result:
+        for archived in merger.before(row):
+            yield archived
+        yield dict(row._mapping)
+    for archived in merger.rest():
+        yield archived
+
+async def create_expense(db: AsyncSession, expense: schemas.ExpenseCreate) -> Expense:
+    version = await bump_data_version(db, expense.user_id)
+    new_expense = Expense(**expense.as_row(), change_seq=version)
+    db.add(new_expense)
+    await db.flush()
+    if new_expense.date is None:
+        await db.refresh(new_expense)  # pick up the server-side CURRENT_DATE default
+    await apply_rollup_delta(
+        db, new_expense.user_id, new_expense.date, new_expense.category, new_expense.currency, new_expense.amount_minor, 1
+    )
+    await db.commit()
+    await db.refresh(new_expense)
+    return new_expense
+
+async def insert_expense_batch(db: AsyncSession, expenses: list[schemas.ExpenseCreate]) -> int:
+    """See crud.insert_expense_batch; the caller commits."""
+    rows, deltas = crud.expense_batch_rows(expenses)
+    if not rows:
+        return 0
+    versions = {user_id: await bump_data_version(db, user_id) for user_id in {row["user_id"] for row in rows}}
+    for row in rows:
+        row["change_seq"] = versions[row["user_id"]]
+    await db.execute(insert(Expense).values(rows))
+    await apply_rollup_deltas(db, deltas)
+    return len(rows)
+
+async def delete_expense(db: AsyncSession, expense_id: int, user_id: int) -> bool:
+    """See crud.delete_expense."""
+    expense = await db.scalar(select(Expense).where(Expense.id == expense_id, Expense.user_id == user_id))
+    if expense is None:
+        return False
+    version = await bump_data_version(db, user_id)
+    if expense.date is not None:
+        await apply_rollup_delta(db, user_id, expense.date, expense.category, expense.currency, -expense.amount_minor, -1)
+    db.add(SyncTombstone(user_id=user_id, entity="expense", row_id=expense.id, change_seq=version))
+    await db.delete(expense)
+    await db.commit()
+    return True
+
+async def analyze_user_expenses(
+    db: AsyncSession,
+    user_id: int,
+    weeks: int = 0,
+    months: int = 0,
+    by_category: bool = False,
+    daily_days: int = 0,
+    currency: Optional[str] = None,
+) -> dict:
+    """See crud.analyze_user_expenses."""
+    now = datetime.now().date()
+    currency = currency or money.default_currency()
+    windows = crud.analysis_windows(now, max(weeks, 2), max(months, 2), daily_days)
+    rows = (await db.execute(crud.analysis_stmt(user_id, windows, now, currency))).all()
+    return crud.summarize_analysis(rows, windows, weeks, months, daily_days, by_category, currency)
+
+# ----------------------------
+# Expense Rollup
+# ----------------------------
+async def apply_rollup_delta(
+    db: AsyncSession, user_id: int, day: DateType, category: str, currency: str, amount_minor: int, count: int
+) -> None:
+    """See crud.apply_rollup_delta."""
+    upsert = crud.rollup_upsert_stmt(db.bind.dialect.name, user_id, day, category, currency, amount_minor, count)
+    if upsert is not None:
+        await db.execute(upsert)
+        return
+
+    updated = await db.execute(crud.rollup_update_stmt(user_id, day, category, currency, amount_minor, count))
+    if updated.rowcount == 0:
+        db.add(ExpenseDailyRollup(
+            user_id=user_id, day=day, category=category, currency=currency, total_minor=amount_minor, count=count
+        ))
+        await db.flush()
+
+async def apply_rollup_deltas(db: AsyncSession, deltas: dict) -> None:
+    """See crud.apply_rollup_deltas."""
+    upsert = crud.rollup_upsert_many_stmt(db.bind.dialect.name, deltas)
+    if upsert is not None:
+        await db.execute(upsert)
+        return
+    for (user_id, day, category, currency), (amount_minor, count) in deltas.items():
+        await apply_rollup_delta(db, user_id, day, category, currency, amount_minor, count)
+
+async def get_category_totals(
+    db: AsyncSession, user_id: int, start: DateType, end: DateType, currency: Optional[str] = None
+) -> list[dict]:
+    currency = currency or money.default_currency()
+    rows = (await db.execute(crud.category_totals_stmt(user_id, start, end, currency))).all()
+    return crud.category_totals(rows, currency)
+
+async def get_daily_trend(
+    db: AsyncSession, user_id: int, start: DateType, end: DateType, currency: Optional[str] = None
+) -> list[dict]:
+    currency = currency or money.default_currency()
+    rows = (await db.execute(crud.daily_trend_stmt(user_id, start, end, currency))).all()
+    return crud.fill_daily_trend(rows, start, end, currency)
+
+# ----------------------------
+# SavingGoal CRUD
+# ----------------------------
+async def get_goals_by_user(db: AsyncSession, user_id: int) -> list[SavingGoal]:
+    return list(await db.scalars(select(SavingGoal).where(SavingGoal.user_id == user_id)))
+
+async def get_goal_rows(db: AsyncSession, user_id: int) -> list[Row]:
+    return list(await db.execute(crud.goal_rows_stmt(user_id)))
+
+async def get_goal_by_id(db: AsyncSession, goal_id: int) -> Optional[SavingGoal]:
+    return await db.get(SavingGoal, goal_id)
+
+async def create_saving_goal(db: AsyncSession, goal: schemas.SavingGoalCreate) -> SavingGoal:
+    new_goal = SavingGoal(
+        **goal.as_row(),
+        saved_amount_minor=0,
+        change_seq=await bump_data_version(db, goal.user_id)
+    )
+    db.add(new_goal)
+    await db.commit()
+    await db.refresh(new_goal)
+    return new_goal
+
+async def update_saving_goal_amount(db: AsyncSession, goal_id: int, user_id: int, goal_update: schemas.SavingGoalUpdate) -> Optional[SavingGoal]:
+    """See crud.update_saving_goal_amount."""
+    version = await bump_data_version(db, user_id)
+    goal = await db.scalar(select(SavingGoal).where(
+        SavingGoal.id == goal_id,
+        SavingGoal.user_id == user_id
+    ).with_for_update())
+    if not goal:
+        await db.rollback()
+        return None
+    saved = money.to_minor(goal_update.saved_amount, goal.currency)
+    if saved != goal.saved_amount_minor:
+        db.add(crud.adjustment_entry(goal, saved))
+    goal.saved_amount_minor = saved
+    goal.change_seq = version
+    await db.commit()
+    await db.refresh(goal)
+    return goal
+
+async def delete_saving_goal(db: AsyncSession, goal_id: int, user_id: int) -> bool:
+    goal = await db.scalar(select(SavingGoal).where(SavingGoal.id == goal_id, SavingGoal.user_id == user_id))
+    if goal is None:
+        return False
+    version = await bump_data_version(db, user_id)
+    db.add(SyncTombstone(user_id=user_id, entity="goal", row_id=goal.id, change_seq=version))
+    await db.delete(goal)
+    await db.commit()
+    return True
+
+# ----------------------------
+# Goal contributions
+# ----------------------------
+async def add_goal_contribution(
+    db: AsyncSession,
+    goal_id: int,
+    user_id: int,
+    contribution: schemas.GoalContributionCreate,
+    idempotency_key: Optional[str] = None,
+) -> tuple[Optional[GoalContribution], bool]:
+    """See crud.add_goal_contribution."""
+    amount_minor = money.to_minor(contribution.amount, contribution.currency)
+    version = await bump_data_version(db, user_id)
+    if idempotency_key is not None:
+        existing = await db.scalar(crud.contribution_by_key_stmt(user_id, idempotency_key))
+        if existing is not None:
+            db.expunge(existing)  # keeps its loaded state through the rollback
+            await db.rollback()
+            return crud.check_replay(existing, goal_id, amount_minor, contribution.currency), True
+    saved_after = await db.scalar(crud.goal_increment_stmt(goal_id, user_id, contribution.currency, amount_minor, version))
+    if saved_after is None:
+        await db.rollback()
+        return crud.explain_refused_contribution(await get_goal_by_id(db, goal_id), user_id, contribution.currency), False
+    entry = crud.contribution_entry(goal_id, user_id, contribution, amount_minor, saved_after, idempotency_key)
+    db.add(entry)
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        if idempotency_key is None:
+            raise
+        existing = await db.scalar(crud.contribution_by_key_stmt(user_id, idempotency_key))
+        if existing is None:
+            raise
+        return crud.check_replay(existing, goal_id, amount_minor, contribution.currency), True
+    await db.commit()
+    return entry, False
+
+async def get_goal_contributions(
+    db: AsyncSession, goal_id: int, user_id: int, limit: int, after: Optional[int] = None
+) -> list[GoalContribution]:
+    return list(await db.scalars(crud.goal_contributions_stmt(goal_id, user_id, limit, after)))
+
+async def get_goal_progress(db: AsyncSession, goal_id: int, user_id: int, months: int = 12) -> Optional[dict]:
+    goal = await db.scalar(select(SavingGoal).where(SavingGoal.id == goal_id, SavingGoal.user_id == user_id))
+    if goal is None:
+        return None
+    today = DateType.today()
+    rows = (await db.execute(crud.contribution_months_stmt(goal_id, today, months))).all()
+    return crud.summarize_goal_progress(goal, rows, today, months)
+
+# ----------------------------
+# Chatbot insights
+# ----------------------------
+async def get_insight_source(
+    db: AsyncSession, user_id: int, currency: str, months_from: DateType, days_from: DateType
+) -> tuple[list, list]:
+    """See crud.get_insight_source."""
+    rollup_rows = (await db.execute(crud.insight_rollup_stmt(user_id, currency, months_from))).all()
+    expense_rows = (await db.execute(crud.insight_expenses_stmt(user_id, currency, days_from))).all()
+    return rollup_rows, expense_rows
+
+# ----------------------------
+# Background jobs
+# ----------------------------
+async def create_job(db: AsyncSession, user_id: int, kind: str, params: dict, max_attempts: int, run_after: datetime) -> Job:
+    job = Job(
+        user_id=user_id, kind=kind, params=params, status="queued", progress=0.0,
+        attempts=0, max_attempts=max_attempts, run_after=run_after,
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+async def get_job(db: AsyncSession, job_id: int, user_id: int) -> Optional[Job]:
+    return await db.scalar(select(Job).where(Job.id == job_id, Job.user_id == user_id))
+
+async def list_jobs(db: AsyncSession, user_id: int, limit: int = 50) -> list[Job]:
+    return list(await db.scalars(crud.user_jobs_stmt(user_id, limit)))
+
+async def count_active_jobs(db: AsyncSession, user_id: int) -> int:
+    return await db.scalar(crud.active_jobs_count_stmt(user_id))
+
+async def claim_jobs(db: AsyncSession, limit: int, now: datetime, lease_until: datetime) -> list[Job]:
+    """Claims up to `limit` due jobs for this process and returns them (attempts already incremented)."""
+    claimed = []
+    for job_id in list(await db.scalars(crud.due_jobs_stmt(now, limit))):
+        if (await db.execute(crud.claim_job_stmt(job_id, now, lease_until))).rowcount == 1:
+            claimed.append(job_id)
+    await db.commit()
+    if not claimed:
+        return []
+    return list(await db.scalars(select(Job).where(Job.id.in_(claimed)).order_by(Job.id)))
+
+async def finish_job(db: AsyncSession, job_id: int, attempt: int, values: dict) -> bool:
+    """See crud.finish_job_stmt; False if another runner has since taken the job over."""
+    updated = await db.execute(crud.finish_job_stmt(job_id, attempt, **values))
+    await db.commit()
+    return updated.rowcount == 1
+
+# ----------------------------
+# Delta sync
+# ----------------------------
+async def get_changes(db: AsyncSession, user_id: int, since: Optional[int]) -> dict:
+    """See crud.get_changes."""
+    token = await get_data_version(db, user_id)
+    expenses = list(await db.scalars(crud.changed_expenses_stmt(user_id, since)))
+    deleted = []
+    if since is not None:
+        deleted = list(await db.scalars(crud.tombstones_stmt(user_id, since)))
+    else:
+        segments = (await db.execute(archive.segments_stmt(user_id))).all()
+        if segments:
+            expenses = await run_in_threadpool(crud.with_archived, segments, expenses)
+    return {
+        "token": token,
+        "expenses": expenses,
+        "goals": list(await db.scalars(crud.changed_goals_stmt(user_id, since))),
+        "deleted": deleted,
+    }
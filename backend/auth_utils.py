@@ -1,51 +1,78 @@
 # backend/auth_utils.py
-import os
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from sqlalchemy.orm import Session
-from dotenv import load_dotenv
-import crud, models, schemas
-from database import get_db
+import async_crud, models, schemas
+import cache
+from config import get_settings
+from database import read_session
 
-load_dotenv()
-
-SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-if SECRET_KEY is None:
-    raise Exception("Missing SECRET_KEY in .env file")
+# python-jose (and its crypto backends) is imported on first use; it isn't needed to build the app.
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    from jose import jwt
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=15)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, get_settings().secret_key, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def _cacheable(user: models.User) -> models.User:
+    """Detached copy without the password hash, safe to share across requests."""
+    return models.User(
+        id=user.id,
+        name=user.name,
+        email=user.email,
+        date_of_birth=user.date_of_birth,
+        age=user.age,
+        gender=user.gender,
+    )
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    from jose import JWTError, jwt
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, get_settings().secret_key, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
+        user_id: Optional[int] = payload.get("uid")
         if email is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    
-    user = crud.get_user_by_email(db, email=email)
+
+    cached = cache.user_cache.get(email)
+    if cached is not None:
+        return cached
+
+    # Newer tokens carry the user id, so a miss is a primary-key lookup.
+    # Only a miss takes a connection, and a replica's when there are any.
+    async with read_session(user_id) as db:
+        if user_id is not None:
+            user = await async_crud.get_user_by_id(db, user_id=user_id)
+            if user is not None and user.email != email:
+                user = None
+        else:
+            user = await async_crud.get_user_by_email(db, email=email)
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    user = _cacheable(user)
+    cache.user_cache.set(email, user)
+    return user
+
+async def get_current_user_read_db(current_user: models.User = Depends(get_current_user)):
+    """Session for read-only routes over the authenticated user's data (see database.read_session)."""
+    async with read_session(current_user.id) as db:
+        yield db
@@ -0,0 +1,172 @@
+# backend/benchmarks/bench_archive.py
+"""
+Cold-archive check: a long expense history read through the app in this
+process, before and after archive.py moves the old months out of `expenses`.
+
+    python benchmarks/bench_archive.py
+    python benchmarks/bench_archive.py --years 10 --expenses 500000 --horizon-months 12
+    python benchmarks/bench_archive.py --database-url postgresql://.../empty_db
+
+Seeds --expenses rows spread over --years and records each --check-users
+user's answers to a set of reads:
+
+  recent    GET /expenses/ (newest first)
+  history   a date range from --years ago
+  amount    the largest expenses (sort=-amount)
+  search    q=coffee
+  export    the full CSV export
+  sync      a full /sync download
+
+It then runs `archive.run` and repeats the reads. Every answer must be
+byte-for-byte the same, the hot table must only hold the horizon's months,
+and `rollup.check` must stay clean.
+
+Output is one JSON line per phase ("hot" before archiving, "archived"
+after), with the hot table's rows and size and the latency of each read. A
+last line describes the archive run: rows moved, seconds and file bytes per
+row. Exits with status 1 if a check fails.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import harness
+import seed
+
+READS = ("recent", "history", "amount", "search", "export", "sync")
+
+
+def _paths(years: int) -> dict:
+    old = date.today() - timedelta(days=365 * years - 60)
+    return {
+        "recent": "/expenses/?limit=100",
+        "history": f"/expenses/?limit=100&start={old}&end={old + timedelta(days=90)}",
+        "amount": "/expenses/?limit=100&sort=-amount",
+        "search": "/expenses/?limit=100&q=coffee",
+        "export": "/expenses/export?format=csv",
+        "sync": "/sync",
+    }
+
+
+def _hot_table(db) -> dict:
+    """Rows in `expenses` and the bytes it (or the whole SQLite file) occupies."""
+    from sqlalchemy import func, select, text
+    from models import Expense
+
+    rows = db.scalar(select(func.count()).select_from(Expense))
+    if db.get_bind().dialect.name == "postgresql":
+        size = db.scalar(text(
+            "SELECT coalesce(sum(pg_total_relation_size(inhrelid)), 0) FROM pg_inherits WHERE inhparent = 'expenses'::regclass"
+        ))
+    else:
+        # Pages in use; freed pages stay in the file and are reused by later inserts.
+        pages = db.scalar(text("PRAGMA page_count")) - db.scalar(text("PRAGMA freelist_count"))
+        size = pages * db.scalar(text("PRAGMA page_size"))
+    return {"hot_rows": rows, "hot_bytes": int(size)}
+
+
+async def _phase(client, sessions: list, paths: dict, args) -> tuple[dict, dict]:
+    """Reads every path; returns ({read: latencies}, {(user id, read): (status, cursor, body)})."""
+    answers, timings = {}, {}
+    for session in sessions[:args.check_users]:
+        for read, path in paths.items():
+            response = await client.get(path, headers=session["headers"])
+            answers[(session["id"], read)] = (response.status_code, response.headers.get("x-next-cursor"), response.content)
+    for read, path in paths.items():
+        async def send(i: int) -> int:
+            return (await client.get(path, headers=sessions[i % len(sessions)]["headers"])).status_code
+
+        requests = args.requests if read not in ("export", "sync") else max(1, args.requests // 10)
+        latencies, statuses, elapsed = await harness.drive(send, requests, args.concurrency)
+        summary = harness.latency_summary(latencies, statuses, elapsed)
+        timings[read] = {"p50_ms": summary["p50_ms"], "p95_ms": summary["p95_ms"], "statuses": summary["statuses"]}
+    return timings, answers
+
+
+async def _run(args, output: harness.Output) -> bool:
+    import httpx
+    from sqlalchemy import func, select
+    import archive
+    import rollup
+    from database import SessionLocal
+    from main import create_app
+    from models import Expense
+
+    app = create_app()
+    failures = []
+    labels = {"benchmark": "archive", "expenses": args.expenses, "years": args.years, "horizon_months": args.horizon_months}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://archive", timeout=None) as client:
+            sessions = []
+            for n in range(args.users):
+                response = await client.post("/auth/login", json={"email": seed.EMAIL.format(n), "password": seed.PASSWORD})
+                response.raise_for_status()
+                login = response.json()
+                sessions.append({"id": login["user"]["id"], "headers": {"Authorization": f"Bearer {login['access_token']}"}})
+            paths = _paths(args.years)
+
+            with SessionLocal() as db:
+                before_size = _hot_table(db)
+            timings, before = await _phase(client, sessions, paths, args)
+            output.emit({**labels, "phase": "hot", **before_size, "reads": timings})
+
+            started = time.perf_counter()
+            with SessionLocal() as db:
+                summaries = await asyncio.to_thread(archive.run, db, args.horizon_months)
+            elapsed = time.perf_counter() - started
+            archive.load_segment.cache_clear()
+
+            with SessionLocal() as db:
+                after_size = _hot_table(db)
+                cutoff = archive.hot_window_start(args.horizon_months)
+                if db.scalar(select(func.count()).select_from(Expense).where(Expense.date < cutoff)):
+                    failures.append("rows older than the horizon are still in expenses")
+                mismatches = rollup.check(db)
+                if mismatches:
+                    failures.append(f"{len(mismatches)} rollup mismatches after archiving")
+            timings, after = await _phase(client, sessions, paths, args)
+            changed = sorted({read for (user_id, read), answer in after.items() if before[(user_id, read)] != answer})
+            if changed:
+                failures.append(f"answers changed after archiving: {', '.join(changed)}")
+            output.emit({**labels, "phase": "archived", **after_size, "reads": timings})
+
+    moved = sum(summary["rows"] for summary in summaries)
+    archive_bytes = sum(entry.stat().st_size for entry in os.scandir(os.environ["ARCHIVE_DIR"]))
+    output.emit({
+        **labels, "phase": "run", "months": len(summaries), "rows_moved": moved, "seconds": round(elapsed, 3),
+        "archive_bytes": archive_bytes, "archive_bytes_per_row": round(archive_bytes / moved, 1) if moved else 0.0,
+        "checks": {"failures": failures},
+    })
+    return not failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="empty database to seed instead of a scratch SQLite file")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--expenses", type=int, default=100000)
+    parser.add_argument("--years", type=int, default=6)
+    parser.add_argument("--horizon-months", type=int, default=12)
+    parser.add_argument("--check-users", type=int, default=5, help="users whose answers are compared")
+    parser.add_argument("--requests", type=int, default=200, help="per read (a tenth for export and sync)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--output", help="also append the JSON lines to this file")
+    args = parser.parse_args(argv)
+    output = harness.Output(args.output)
+
+    # No result cache: every read must come from the tables (and archive) it is meant to check.
+    harness.scratch_environment(
+        args.database_url, ARCHIVE_DIR=tempfile.mkdtemp(prefix="archive-"), JOB_WORKERS="0", RESULT_CACHE_SIZE="0",
+    )
+    harness.migrate()
+    seed.seed(args.users, args.expenses, days=365 * args.years)
+    return 0 if asyncio.run(_run(args, output)) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
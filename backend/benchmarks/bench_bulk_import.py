@@ -0,0 +1,130 @@
+# backend/benchmarks/bench_bulk_import.py
+"""
+Bulk import throughput, in-process over ASGI against a scratch SQLite database.
+
+    python benchmarks/bench_bulk_import.py                   # 10k rows, bulk vs per-row
+    python benchmarks/bench_bulk_import.py --rows 100000 --skip-baseline
+
+Posts a generated CSV to POST /expenses/bulk and, as a baseline, the same
+rows one request at a time to POST /expenses/. Prints one JSON line per run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.dirname(HERE)
+CATEGORIES = ["Food", "Transport", "Bills", "Shopping", "Health", "Other"]
+
+
+def _rows(count: int) -> list[dict]:
+    rng = random.Random(42)
+    today = date.today()
+    return [
+        {
+            "date": (today - timedelta(days=rng.randrange(365))).isoformat(),
+            "category": rng.choice(CATEGORIES),
+            "amount": round(rng.uniform(1, 200), 2),
+            "description": f"row {i}",
+        }
+        for i in range(count)
+    ]
+
+
+def _csv(rows: list[dict]) -> str:
+    lines = ["date,category,amount,description"]
+    lines.extend(f"{r['date']},{r['category']},{r['amount']},{r['description']}" for r in rows)
+    return "\n".join(lines) + "\n"
+
+
+async def _run(count: int, skip_baseline: bool, concurrency: int) -> list[dict]:
+    import httpx
+    from alembic import command
+    from alembic.config import Config
+    from main import app
+    from database import dispose_engines
+    from hashing import hasher
+
+    command.upgrade(Config(os.path.join(BACKEND, "alembic.ini")), "head")
+    rows = _rows(count)
+    results = []
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            credentials = {"email": "bench@example.com", "password": "correct horse battery staple"}
+            await client.post("/auth/register", json={"name": "Bench", **credentials})
+            login = (await client.post("/auth/login", json=credentials)).json()
+            user_id = login["user"]["id"]
+            headers = {"Authorization": f"Bearer {login['access_token']}"}
+
+            body = _csv(rows).encode()
+            started = time.perf_counter()
+            response = await client.post("/expenses/bulk", content=body, headers={**headers, "Content-Type": "text/csv"})
+            elapsed = time.perf_counter() - started
+            response.raise_for_status()
+            results.append({
+                "benchmark": "bulk_import",
+                "mode": "bulk_csv",
+                "rows": count,
+                "bytes": len(body),
+                "inserted": response.json()["inserted"],
+                "seconds": round(elapsed, 3),
+                "rows_per_second": round(count / elapsed, 1),
+            })
+
+            if not skip_baseline:
+                queue = asyncio.Queue()
+                for row in rows:
+                    queue.put_nowait(row)
+
+                async def worker():
+                    while not queue.empty():
+                        row = queue.get_nowait()
+                        (await client.post("/expenses/", json={**row, "user_id": user_id}, headers=headers)).raise_for_status()
+
+                started = time.perf_counter()
+                await asyncio.gather(*(worker() for _ in range(concurrency)))
+                elapsed = time.perf_counter() - started
+                results.append({
+                    "benchmark": "bulk_import",
+                    "mode": "per_row_post",
+                    "rows": count,
+                    "concurrency": concurrency,
+                    "seconds": round(elapsed, 3),
+                    "rows_per_second": round(count / elapsed, 1),
+                })
+    finally:
+        hasher.shutdown()
+        await dispose_engines()
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel clients for the per-row baseline")
+    parser.add_argument("--skip-baseline", action="store_true", help="only time the bulk endpoint")
+    args = parser.parse_args(argv)
+
+    scratch = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(scratch, 'bench.db')}"
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ["HASH_WORKERS"] = "0"
+    os.environ["BCRYPT_ROUNDS"] = "4"
+    os.chdir(BACKEND)
+    sys.path.insert(0, BACKEND)
+
+    for result in asyncio.run(_run(args.rows, args.skip_baseline, args.concurrency)):
+        print(json.dumps(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+# backend/benchmarks/bench_conditional_get.py
+"""
+Latency of the ETag'd GET endpoints, in-process over ASGI against a scratch
+SQLite database seeded with one user's history.
+
+    python benchmarks/bench_conditional_get.py
+    python benchmarks/bench_conditional_get.py --expenses 20000 --requests 300
+
+For each endpoint, three modes are timed:
+  uncached      every request changes the data first, so the server rebuilds the response
+  cached        a 200 served from the result cache
+  not_modified  a 304 for a client that sent If-None-Match
+Prints one JSON line per endpoint and mode.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.dirname(HERE)
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def _run(expenses: int, requests: int) -> list[dict]:
+    import httpx
+    from alembic import command
+    from alembic.config import Config
+    from main import app
+    from database import AsyncSessionLocal, dispose_engines
+    from hashing import hasher
+    import async_crud
+    import schemas
+
+    command.upgrade(Config(os.path.join(BACKEND, "alembic.ini")), "head")
+    results = []
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            credentials = {"email": "bench@example.com", "password": "correct horse battery staple"}
+            await client.post("/auth/register", json={"name": "Bench", **credentials})
+            login = (await client.post("/auth/login", json=credentials)).json()
+            user_id = login["user"]["id"]
+            headers = {"Authorization": f"Bearer {login['access_token']}"}
+
+            rng = random.Random(42)
+            async with AsyncSessionLocal() as db:
+                await async_crud.insert_expense_batch(db, [
+                    schemas.ExpenseCreate(
+                        category=rng.choice(["Food", "Transport", "Bills", "Shopping"]),
+                        amount=round(rng.uniform(1, 200), 2),
+                        date=date.today() - timedelta(days=rng.randrange(365)),
+                        user_id=user_id,
+                    )
+                    for _ in range(expenses)
+                ])
+                await db.commit()
+
+            endpoints = {
+                "expenses_page": "/expenses/?limit=100",
+                "analysis": f"/expenses/analysis/{user_id}?weeks=8&months=6&by_category=true",
+                "goals": f"/goals/user/{user_id}",
+            }
+            for name, url in endpoints.items():
+                for mode in ("uncached", "cached", "not_modified"):
+                    etag = (await client.get(url, headers=headers)).headers["etag"]
+                    latencies, statuses = [], {}
+                    for _ in range(requests):
+                        if mode == "uncached":
+                            async with AsyncSessionLocal() as db:
+                                await async_crud.bump_data_version(db, user_id)
+                                await db.commit()
+                        extra = {"If-None-Match": etag} if mode == "not_modified" else {}
+                        started = time.perf_counter()
+                        response = await client.get(url, headers={**headers, **extra})
+                        latencies.append(time.perf_counter() - started)
+                        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                    latencies.sort()
+                    results.append({
+                        "benchmark": "conditional_get",
+                        "endpoint": name,
+                        "mode": mode,
+                        "expenses": expenses,
+                        "requests": requests,
+                        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+                        "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+                        "statuses": statuses,
+                    })
+    finally:
+        hasher.shutdown()
+        await dispose_engines()
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--expenses", type=int, default=5000, help="expenses seeded for the user")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint and mode")
+    args = parser.parse_args(argv)
+
+    scratch = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(scratch, 'bench.db')}"
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ["HASH_WORKERS"] = "0"
+    os.environ["BCRYPT_ROUNDS"] = "4"
+    os.chdir(BACKEND)
+    sys.path.insert(0, BACKEND)
+
+    for result in asyncio.run(_run(args.expenses, args.requests)):
+        print(json.dumps(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+# backend/benchmarks/bench_export.py
+"""
+Export throughput and memory, in-process over ASGI against a scratch SQLite database.
+
+    python benchmarks/bench_export.py                  # 100k rows, csv / ndjson / csv+gzip
+    python benchmarks/bench_export.py --rows 20000 --formats csv
+
+Seeds the rows through POST /expenses/bulk, then downloads GET
+/expenses/export once per format, discarding the body as it arrives. The
+peak is the tracemalloc high-water mark during the download, so it should
+stay flat as --rows grows. Prints one JSON line per run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+
+
+async def _download(app, path: str, params: dict, headers: dict) -> tuple[int, int]:
+    """
+    Calls the ASGI app directly and counts body bytes as they are sent.
+    httpx.ASGITransport collects the whole body before returning, which
+    would hide whether the endpoint itself streams.
+    """
+    from urllib.parse import urlencode
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": urlencode({k: str(v).lower() if isinstance(v, bool) else v for k, v in params.items()}).encode(),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    status, received = 0, 0
+    requested, done = False, asyncio.Event()
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()  # the client stays connected until the response ends
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, received
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            received += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    done.set()
+    return status, received
+
+
+async def _run(count: int, formats: list[str]) -> list[dict]:
+    import httpx
+    from alembic import command
+    from alembic.config import Config
+    from bench_bulk_import import _csv, _rows
+    from main import app
+    from database import dispose_engines
+    from hashing import hasher
+
+    command.upgrade(Config(os.path.join(BACKEND, "alembic.ini")), "head")
+    results = []
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            credentials = {"email": "bench@example.com", "password": "correct horse battery staple"}
+            await client.post("/auth/register", json={"name": "Bench", **credentials})
+            login = (await client.post("/auth/login", json=credentials)).json()
+            headers = {"Authorization": f"Bearer {login['access_token']}"}
+            body = _csv(_rows(count)).encode()
+            (await client.post("/expenses/bulk", content=body, headers={**headers, "Content-Type": "text/csv"})).raise_for_status()
+            del body
+
+            for spec in formats:
+                fmt, _, compression = spec.partition("+")
+                params = {"format": fmt, "gzip": compression == "gzip"}
+                tracemalloc.start()
+                started = time.perf_counter()
+                status, received = await _download(app, "/expenses/export", params, headers)
+                elapsed = time.perf_counter() - started
+                _, peak = tracemalloc.get_traced_memory()
+                assert status == 200, status
+                tracemalloc.stop()
+                results.append({
+                    "benchmark": "export",
+                    "format": spec,
+                    "rows": count,
+                    "bytes": received,
+                    "seconds": round(elapsed, 3),
+                    "rows_per_second": round(count / elapsed, 1),
+                    "peak_kib": round(peak / 1024, 1),
+                })
+    finally:
+        hasher.shutdown()
+        await dispose_engines()
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--formats", nargs="+", default=["csv", "ndjson", "csv+gzip"],
+                        help="csv, ndjson or parquet, optionally suffixed with +gzip")
+    args = parser.parse_args(argv)
+
+    scratch = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(scratch, 'bench.db')}"
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ["HASH_WORKERS"] = "0"
+    os.environ["BCRYPT_ROUNDS"] = "4"
+    os.chdir(BACKEND)
+    sys.path.insert(0, BACKEND)
+
+    for result in asyncio.run(_run(args.rows, args.formats)):
+        print(json.dumps(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+# backend/benchmarks/bench_http.py
+"""
+HTTP load test of the real app. For each scenario it reports throughput and
+p50/p95/p99 latency under closed-loop concurrency.
+
+    python benchmarks/bench_http.py                              # in-process, 20 users, 20k expenses
+    python benchmarks/bench_http.py --users 100 --expenses 1000000 --concurrency 32
+    python benchmarks/bench_http.py --target server --server-workers 4
+    python benchmarks/bench_http.py --target url --url http://staging:8000 --users 100 --expenses 1000000
+
+Targets:
+  asgi    the app in this process over httpx.ASGITransport (no network, one event loop)
+  server  `uvicorn main:app --workers N` on a local port, driven over TCP
+  url     a running server whose database was seeded with seed.py. Pass the
+          same --users / --expenses so results are labelled correctly.
+
+For asgi and server, a scratch database is seeded first: SQLite by default,
+or --database-url. Scenarios:
+  login     POST /auth/login
+  expenses  GET /expenses/?limit=100
+  analysis  GET /expenses/analysis/{id}
+  goals     GET /goals/user/{id}
+  dashboard GET /dashboard (the previous three in one request)
+
+Requests rotate over --sessions logged-in users. Prints one JSON line per
+scenario; add --output results.jsonl to keep them for compare.py.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import harness
+import seed
+
+SCENARIOS = ("login", "expenses", "analysis", "goals", "dashboard")
+
+
+def _request(scenario: str, session: dict) -> tuple[str, str, dict]:
+    if scenario == "login":
+        return "POST", "/auth/login", {"json": {"email": session["email"], "password": seed.PASSWORD}}
+    paths = {
+        "expenses": "/expenses/?limit=100",
+        "analysis": f"/expenses/analysis/{session['id']}",
+        "goals": f"/goals/user/{session['id']}",
+        "dashboard": "/dashboard",
+    }
+    return "GET", paths[scenario], {"headers": session["headers"]}
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def start_server(workers: int, poll_seconds: float = 0.2) -> tuple[subprocess.Popen, str]:
+    """Runs uvicorn against the current environment's DATABASE_URL; returns it once it answers."""
+    import httpx
+
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=harness.BACKEND, env={**os.environ, "JOB_WORKERS": "0"},
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"uvicorn exited with status {process.returncode}")
+        try:
+            httpx.get(url + "/", timeout=1).raise_for_status()
+            return process, url
+        except httpx.HTTPError:
+            time.sleep(poll_seconds)
+    process.terminate()
+    raise SystemExit("uvicorn did not start within 60 s")
+
+
+async def _run(args, output: harness.Output, url: str = None) -> None:
+    import httpx
+
+    if url is None:
+        from main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None)
+    else:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        client = httpx.AsyncClient(base_url=url, timeout=60, limits=limits)
+
+    async with client:
+        sessions = []
+        for n in range(min(args.sessions, args.users)):
+            email = seed.EMAIL.format(n)
+            response = await client.post("/auth/login", json={"email": email, "password": seed.PASSWORD})
+            response.raise_for_status()
+            login = response.json()
+            sessions.append({
+                "id": login["user"]["id"],
+                "email": email,
+                "headers": {"Authorization": f"Bearer {login['access_token']}"},
+            })
+
+        for scenario in args.scenarios:
+            async def send(i: int) -> int:
+                method, path, kwargs = _request(scenario, sessions[i % len(sessions)])
+                response = await client.request(method, path, **kwargs)
+                return response.status_code
+
+            await harness.drive(send, args.warmup, args.concurrency)
+            latencies, statuses, elapsed = await harness.drive(send, args.requests, args.concurrency)
+            output.emit({
+                "benchmark": "http",
+                "scenario": scenario,
+                "target": args.target,
+                "server_workers": args.server_workers if args.target == "server" else None,
+                "users": args.users,
+                "rows": args.expenses,
+                "concurrency": args.concurrency,
+                **harness.latency_summary(latencies, statuses, elapsed),
+            })
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=("asgi", "server", "url"), default="asgi")
+    parser.add_argument("--url", help="base URL for --target url")
+    parser.add_argument("--server-workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--database-url", help="seed this (empty) database instead of a scratch SQLite file")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--expenses", type=int, default=20000)
+    parser.add_argument("--sessions", type=int, default=20, help="distinct logged-in users the requests rotate over")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=500, help="timed requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--output", help="also append the JSON lines to this file")
+    args = parser.parse_args(argv)
+    output = harness.Output(args.output)
+
+    if args.target == "url":
+        if not args.url:
+            parser.error("--target url needs --url")
+        asyncio.run(_run(args, output, args.url.rstrip("/")))
+        return 0
+
+    harness.scratch_environment(args.database_url)
+    harness.migrate()
+    seed.seed(args.users, args.expenses)
+
+    if args.target == "asgi":
+        from database import dispose_engines
+
+        async def run_in_process():
+            try:
+                await _run(args, output)
+            finally:
+                await dispose_engines()
+
+        asyncio.run(run_in_process())
+        return 0
+
+    process, url = start_server(args.server_workers)
+    try:
+        asyncio.run(_run(args, output, url))
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
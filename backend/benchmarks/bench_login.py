@@ -0,0 +1,114 @@
+# backend/benchmarks/bench_login.py
+"""
+Login throughput under concurrency, in-process over ASGI against a scratch
+SQLite database.
+
+    python benchmarks/bench_login.py                      # compare inline vs process pool
+    python benchmarks/bench_login.py --workers 4 --concurrency 64 --requests 500
+
+`--workers 0` hashes inline in the request (the old behaviour); any other
+value uses the bounded bcrypt process pool. Prints one JSON line per run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.dirname(HERE)
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def _run(requests: int, concurrency: int) -> dict:
+    import httpx
+    from alembic import command
+    from alembic.config import Config
+    from main import app
+    from database import dispose_engines
+    from hashing import hasher
+
+    command.upgrade(Config(os.path.join(BACKEND, "alembic.ini")), "head")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        credentials = {"email": "bench@example.com", "password": "correct horse battery staple"}
+        await client.post("/auth/register", json={"name": "Bench", **credentials})
+
+        latencies, statuses = [], {}
+        queue = asyncio.Queue()
+        for _ in range(requests):
+            queue.put_nowait(None)
+
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                started = time.perf_counter()
+                response = await client.post("/auth/login", json=credentials)
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    hasher.shutdown()
+    await dispose_engines()
+    latencies.sort()
+    return {
+        "benchmark": "login",
+        "hash_workers": hasher.workers,
+        "bcrypt_rounds": hasher.rounds,
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "logins_per_second": round(statuses.get(200, 0) / elapsed, 2),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 1),
+        "statuses": statuses,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=None, help="bcrypt worker processes (0 = inline)")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args(argv)
+
+    if args.workers is None:
+        # Compare both modes, each in a fresh interpreter (settings are read at import).
+        for workers in (0, os.cpu_count() or 2):
+            subprocess.run(
+                [sys.executable, __file__, "--workers", str(workers), "--rounds", str(args.rounds),
+                 "--requests", str(args.requests), "--concurrency", str(args.concurrency)],
+                check=True,
+            )
+        return 0
+
+    scratch = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(scratch, 'bench.db')}"
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ["HASH_WORKERS"] = str(args.workers)
+    os.environ["HASH_QUEUE_SIZE"] = str(args.concurrency)
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    os.chdir(BACKEND)
+    sys.path.insert(0, BACKEND)
+
+    print(json.dumps(asyncio.run(_run(args.requests, args.concurrency))))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# backend/benchmarks/bench_micro.py
+"""
+Micro-benchmarks for the `crud` query functions and the hot pure-Python
+paths (analysis summarizing, batch row building, schema validation and
+serialization), against a scratch SQLite database seeded with seed.py.
+
+    python benchmarks/bench_micro.py
+    python benchmarks/bench_micro.py --users 1 --expenses 100000 --only crud.
+    python benchmarks/bench_micro.py --output results.jsonl
+
+Each case is timed with timeit: autorange picks a loop count, then the best
+and median of --repeat runs are reported per call. Prints one JSON line per case.
+"""
+import argparse
+import statistics
+import sys
+import timeit
+from datetime import date, timedelta
+from decimal import Decimal
+
+import harness
+import seed
+
+
+def cases(user_id: int) -> dict:
+    """name -> zero-argument callable. Fixtures are built here, outside the timed calls."""
+    from pydantic import TypeAdapter
+    from database import SessionLocal
+    import crud
+    import money
+    import schemas
+
+    db = SessionLocal()
+    today = date.today()
+    filters = schemas.ExpenseFilter(start=today - timedelta(days=90), end=today, categories=["Food", "Travel"])
+    search = schemas.ExpenseFilter(q="coffee")
+    currency = money.default_currency()
+    windows = crud.analysis_windows(today, 4, 6, 30)
+    analysis_rows = db.execute(crud.analysis_stmt(user_id, windows, today, currency)).all()
+    page = crud.get_expenses_page(db, user_id, 100)
+    rows = [row for _, row in zip(range(100), crud.iter_expenses_by_user(db, user_id, batch_size=100))]
+    creates = [
+        {"user_id": user_id, "category": "Food", "amount": f"{i}.25", "date": today.isoformat(), "description": f"row {i}"}
+        for i in range(1000)
+    ]
+    validated = [schemas.ExpenseCreate.model_validate(raw) for raw in creates]
+    expense_list = TypeAdapter(list[schemas.ExpenseResponse])
+    amounts = [Decimal(f"{i}.{i % 100:02d}") for i in range(1000)]
+
+    return {
+        "crud.get_expenses_page": lambda: crud.get_expenses_page(db, user_id, 100),
+        "crud.get_expenses_page.filtered": lambda: crud.get_expenses_page(db, user_id, 100, filters=filters),
+        "crud.get_expenses_page.search": lambda: crud.get_expenses_page(db, user_id, 100, filters=search),
+        "crud.iter_expenses_by_user.1000": lambda: sum(1 for _ in zip(range(1000), crud.iter_expenses_by_user(db, user_id))),
+        "crud.analyze_user_expenses": lambda: crud.analyze_user_expenses(db, user_id),
+        "crud.analyze_user_expenses.full": lambda: crud.analyze_user_expenses(
+            db, user_id, weeks=4, months=6, by_category=True, daily_days=30
+        ),
+        "crud.get_category_totals": lambda: crud.get_category_totals(db, user_id, today - timedelta(days=365), today),
+        "crud.get_daily_trend": lambda: crud.get_daily_trend(db, user_id, today - timedelta(days=90), today),
+        "crud.get_goals_by_user": lambda: crud.get_goals_by_user(db, user_id),
+        "crud.summarize_analysis": lambda: crud.summarize_analysis(analysis_rows, windows, 4, 6, 30, True, currency),
+        "crud.expense_batch_rows.1000": lambda: crud.expense_batch_rows(validated),
+        "schemas.ExpenseCreate.validate.1000": lambda: [schemas.ExpenseCreate.model_validate(raw) for raw in creates],
+        "schemas.ExpenseResponse.from_orm.100": lambda: expense_list.validate_python(page, from_attributes=True),
+        "schemas.ExpenseResponse.dump_json.100": lambda: expense_list.dump_json(expense_list.validate_python(page, from_attributes=True)),
+        "schemas.ExpenseResponse.ndjson.100": lambda: "".join(
+            schemas.ExpenseResponse.model_validate(row).model_dump_json() + "\n" for row in rows
+        ),
+        "money.to_minor.1000": lambda: [money.to_minor(amount, currency) for amount in amounts],
+    }
+
+
+def measure(fn, repeat: int) -> dict:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    per_call = sorted(total / number for total in timer.repeat(repeat=repeat, number=number))
+    return {
+        "loops": number,
+        "best_us": round(per_call[0] * 1e6, 2),
+        "median_us": round(statistics.median(per_call) * 1e6, 2),
+        "calls_per_second": round(1 / per_call[0], 1),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--expenses", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", default="", help="run only cases whose name starts with this")
+    parser.add_argument("--output", help="also append the JSON lines to this file")
+    args = parser.parse_args(argv)
+    output = harness.Output(args.output)
+
+    harness.scratch_environment()
+    harness.migrate()
+    user_ids = seed.seed(args.users, args.expenses)
+    for name, fn in cases(user_ids[0]).items():
+        if name.startswith(args.only):
+            output.emit({
+                "benchmark": "micro",
+                "name": name,
+                "users": args.users,
+                "rows": args.expenses,
+                **measure(fn, args.repeat),
+            })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+# backend/benchmarks/bench_serialization.py
+"""
+Rows serialized per second for a list of expenses: the old path (ORM
+objects validated through ExpenseResponse) against serialization.py (row
+tuples turned straight into dicts), for each body encoding and compression.
+
+    python benchmarks/bench_serialization.py
+    python benchmarks/bench_serialization.py --page-sizes 100 500 --expenses 50000
+    python benchmarks/bench_serialization.py --output results.jsonl
+
+Cases, per page size:
+  query.*     fetch and serialize, as the route does (ORM page vs row page)
+  encode.*    serialize rows that were already fetched
+  compress.*  compress the JSON body (the route skips bodies under 1 KiB)
+
+Optional packages that aren't installed (orjson, msgpack, brotli) skip
+their cases. Prints one JSON line per case, timed as in bench_micro.py.
+"""
+import argparse
+import json
+import sys
+
+import harness
+import seed
+from bench_micro import measure
+
+
+def cases(user_id: int, page_size: int) -> dict:
+    """name -> zero-argument callable. Fixtures are built here, outside the timed calls."""
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from database import SessionLocal
+    import crud
+    import schemas
+    import serialization
+
+    db = SessionLocal()
+    expense_list = TypeAdapter(list[schemas.ExpenseResponse])
+    orm_page = crud.get_expenses_page(db, user_id, page_size)
+    row_page = crud.get_expense_rows_page(db, user_id, page_size)
+    data = serialization.expenses(row_page)
+    body = serialization.dumps(data)
+
+    def pydantic_json(page):
+        return expense_list.dump_json(expense_list.validate_python(page, from_attributes=True))
+
+    def fast_json(page):
+        return serialization.dumps(serialization.expenses(page))
+
+    def stdlib_json():
+        return json.dumps(serialization.expenses(row_page), ensure_ascii=False, separators=(",", ":")).encode()
+
+    def response_model():
+        # What FastAPI does for a route that returns ORM objects under a response_model.
+        validated = expense_list.validate_python(orm_page, from_attributes=True)
+        return json.dumps(jsonable_encoder(validated)).encode()
+
+    found = {
+        "query.orm+pydantic": lambda: pydantic_json(crud.get_expenses_page(db, user_id, page_size)),
+        "query.rows+fast": lambda: fast_json(crud.get_expense_rows_page(db, user_id, page_size)),
+        "encode.response_model": response_model,
+        "encode.pydantic": lambda: pydantic_json(orm_page),
+        "encode.rows+stdlib_json": stdlib_json,
+        "encode.rows+json": lambda: fast_json(row_page),
+        "encode.rows.dicts_only": lambda: serialization.expenses(row_page),
+        "compress.gzip": lambda: serialization.compress(body, "gzip"),
+    }
+    if serialization.orjson is None:
+        del found["encode.rows+json"]  # it would just repeat the stdlib case
+    if serialization.msgpack is not None:
+        found["encode.rows+msgpack"] = lambda: serialization.dumps(serialization.expenses(row_page), serialization.MSGPACK)
+    if serialization.brotli is not None:
+        found["compress.br"] = lambda: serialization.compress(body, "br")
+    return found
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--expenses", type=int, default=20000, help="seeded for one user; larger pages are capped to this")
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", default="", help="run only cases whose name starts with this")
+    parser.add_argument("--output", help="also append the JSON lines to this file")
+    args = parser.parse_args(argv)
+    output = harness.Output(args.output)
+
+    harness.scratch_environment()
+    harness.migrate()
+    user_id = seed.seed(1, args.expenses)[0]
+    for page_size in sorted({min(size, args.expenses) for size in args.page_sizes}):
+        for name, fn in cases(user_id, page_size).items():
+            if not name.startswith(args.only):
+                continue
+            result = measure(fn, args.repeat)
+            produced = fn()
+            output.emit({
+                "benchmark": "serialization",
+                "name": name,
+                "users": 1,
+                "rows": args.expenses,
+                "page_size": page_size,
+                **result,
+                "rows_per_second": round(page_size * result["calls_per_second"]),
+                "bytes": len(produced) if isinstance(produced, bytes) else None,
+            })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
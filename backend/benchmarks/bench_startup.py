@@ -0,0 +1,117 @@
+# backend/benchmarks/bench_startup.py
+"""
+Cold-start time: how long a fresh process takes to serve its first request,
+as a new worker or an autoscaled instance must.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 20 --server-workers 1 4
+    python benchmarks/bench_startup.py --output results.jsonl
+
+Cases:
+  process  a fresh interpreter that imports main, calls create_app(), runs
+           the lifespan startup and sends GET / and then GET /users/{id} (the
+           first database query) over ASGI. Each phase is timed inside the
+           child, and total_ms is measured from spawning it.
+  server   `uvicorn main:app --workers N`, from spawning it until GET /
+           answers over TCP.
+
+Each case runs --repeat times against a scratch SQLite database; best and
+median are reported. Prints one JSON line per case.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import harness
+import seed
+from bench_http import start_server
+
+PHASES = ("import", "create_app", "lifespan", "first_request", "first_query")
+
+
+async def _child(user_id: int) -> dict:
+    """Runs in the spawned process: times each phase up to the first database query."""
+    marks = [time.perf_counter()]
+    import main
+    marks.append(time.perf_counter())
+    app = main.create_app()
+    marks.append(time.perf_counter())
+
+    import httpx
+    async with app.router.lifespan_context(app):
+        marks.append(time.perf_counter())
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://startup") as client:
+            (await client.get("/")).raise_for_status()
+            marks.append(time.perf_counter())
+            (await client.get(f"/users/{user_id}")).raise_for_status()
+            marks.append(time.perf_counter())
+    return {f"{phase}_ms": (end - start) * 1000 for phase, start, end in zip(PHASES, marks, marks[1:])}
+
+
+def _process_run(user_id: int) -> dict:
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", str(user_id)],
+        cwd=harness.BACKEND, env={**os.environ, "JOB_WORKERS": "0"}, capture_output=True, text=True,
+    )
+    total = (time.perf_counter() - started) * 1000
+    if completed.returncode != 0:
+        raise SystemExit(completed.stderr)
+    return {**json.loads(completed.stdout.strip().splitlines()[-1]), "total_ms": total}
+
+
+def _server_run(workers: int) -> dict:
+    started = time.perf_counter()
+    process, _ = start_server(workers, poll_seconds=0.005)
+    ready = (time.perf_counter() - started) * 1000
+    process.terminate()
+    process.wait(timeout=30)
+    return {"total_ms": ready}
+
+
+def _summary(runs: list[dict]) -> dict:
+    """best_<field> and p50_<field> for each timed field."""
+    summary = {}
+    for field in runs[0]:
+        values = [run[field] for run in runs]
+        name = field[:-len("_ms")]
+        summary[f"best_{name}_ms"] = round(min(values), 2)
+        summary[f"p50_{name}_ms"] = round(statistics.median(values), 2)
+    return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--server-workers", type=int, nargs="*", default=[1], help="none skips the server case")
+    parser.add_argument("--output", help="also append the JSON lines to this file")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        sys.path.insert(0, harness.BACKEND)
+        print(json.dumps(asyncio.run(_child(args.child))))
+        return 0
+
+    output = harness.Output(args.output)
+    harness.scratch_environment()
+    harness.migrate()
+    user_id = seed.seed(1, 100)[0]
+
+    _process_run(user_id)  # untimed: warms the OS file cache and writes .pyc files
+    runs = [_process_run(user_id) for _ in range(args.repeat)]
+    output.emit({"benchmark": "startup", "case": "process", **_summary(runs)})
+
+    for workers in args.server_workers:
+        runs = [_server_run(workers) for _ in range(args.repeat)]
+        output.emit({"benchmark": "startup", "case": "server", "server_workers": workers, **_summary(runs)})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
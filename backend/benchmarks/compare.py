@@ -0,0 +1,89 @@
+# backend/benchmarks/compare.py
+"""
+Compares two benchmark result files (JSON lines written with --output) and
+flags regressions.
+
+    python benchmarks/compare.py base.jsonl head.jsonl
+    python benchmarks/compare.py base.jsonl head.jsonl --threshold 0.05
+
+Results are matched on their labels: every string, boolean or integer field
+except the metrics themselves, such as benchmark, scenario, name, target,
+rows and concurrency. For each metric present in both files:
+  *_per_second          higher is better
+  *_ms, *_us, peak_kib  lower is better
+When a file has several runs of the same case, the best value is used.
+Exits with status 1 if any metric got worse by more than --threshold
+(a fraction; 0.10 = 10 %).
+"""
+import argparse
+import json
+import sys
+
+IGNORED = {"run", "statuses", "seconds", "requests", "loops", "bytes", "inserted"}
+
+
+def _direction(metric: str) -> int:
+    """+1 if bigger is better, -1 if smaller is better, 0 if not a metric."""
+    if metric.endswith("_per_second"):
+        return 1
+    if metric.endswith(("_ms", "_us")) or metric == "peak_kib":
+        return -1
+    return 0
+
+
+def load(path: str) -> dict[tuple, dict[str, float]]:
+    """{case labels: {metric: best value}}"""
+    results: dict[tuple, dict[str, float]] = {}
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            labels = tuple(sorted(
+                (key, value) for key, value in record.items()
+                if key not in IGNORED and not _direction(key) and not isinstance(value, (float, dict, list))
+            ))
+            metrics = results.setdefault(labels, {})
+            for key, value in record.items():
+                direction = _direction(key)
+                if direction and isinstance(value, (int, float)):
+                    best = metrics.get(key)
+                    metrics[key] = value if best is None else (max if direction > 0 else min)(best, value)
+    return results
+
+
+def compare(base: dict, head: dict, threshold: float) -> tuple[list[str], int]:
+    lines, regressions = [], 0
+    for labels in sorted(base.keys() & head.keys(), key=repr):
+        name = " ".join(f"{key}={value}" for key, value in labels if value is not None)
+        for metric in sorted(base[labels].keys() & head[labels].keys()):
+            before, after = base[labels][metric], head[labels][metric]
+            if not before:
+                continue
+            change = (after - before) / before
+            worse = -change * _direction(metric) > threshold
+            regressions += worse
+            lines.append(
+                f"{'REGRESSION ' if worse else ''}{name} {metric}: {before:g} -> {after:g} ({change:+.1%})"
+            )
+    for labels in sorted(base.keys() ^ head.keys(), key=repr):
+        side = "base" if labels in base else "head"
+        lines.append(f"only in {side}: " + " ".join(f"{key}={value}" for key, value in labels if value is not None))
+    return lines, regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    lines, regressions = compare(load(args.base), load(args.head), args.threshold)
+    print("\n".join(lines))
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+# backend/benchmarks/harness.py
+"""
+Shared plumbing for the benchmark suite (seed.py, bench_http.py,
+bench_micro.py, suite.py and compare.py).
+
+Settings are read the first time the backend asks for them, so scripts call
+`scratch_environment` before importing anything from the backend.
+"""
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.dirname(HERE)
+INVOKED_FROM = os.getcwd()  # scratch_environment changes directory; --output paths are relative to this
+
+
+def scratch_environment(database_url: Optional[str] = None, **overrides: str) -> str:
+    """
+    Points the backend at `database_url` (a fresh SQLite file by default),
+    with inline, cheap bcrypt and no slow-query log unless `overrides` say
+    otherwise. Returns the URL.
+    """
+    if database_url is None:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ["HASH_WORKERS"] = "0"
+    os.environ["BCRYPT_ROUNDS"] = "4"
+    os.environ["SLOW_QUERY_MS"] = "0"  # seeding and large scans are slow on purpose
+    os.environ.update(overrides)
+    os.chdir(BACKEND)
+    if BACKEND not in sys.path:
+        sys.path.insert(0, BACKEND)
+    return database_url
+
+
+def migrate() -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    command.upgrade(Config(os.path.join(BACKEND, "alembic.ini")), "head")
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def drive(send: Callable[[int], Awaitable[int]], requests: int, concurrency: int) -> tuple[list[float], dict, float]:
+    """
+    Closed-loop load: `concurrency` workers call `send(i)` for i in
+    range(requests), each as soon as its previous call returns. `send`
+    returns the status code. Returns (latencies, {status: count}, elapsed).
+    """
+    latencies, statuses = [], {}
+    next_index = iter(range(requests))
+
+    async def worker():
+        for i in next_index:
+            started = time.perf_counter()
+            status = await send(i)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - started
+
+
+def latency_summary(latencies: list[float], statuses: dict, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    ok = sum(count for status, count in statuses.items() if 200 <= int(status) < 400)
+    return {
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(ok / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def run_metadata() -> dict:
+    """Identifies the code and machine a result came from."""
+    def git(*args: str) -> str:
+        try:
+            return subprocess.run(["git", *args], cwd=BACKEND, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ""
+
+    return {
+        "commit": git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} cpus)",
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+class Output:
+    """Prints each result as a JSON line, and appends it to `path` if given."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = os.path.join(INVOKED_FROM, path) if path else None
+        self.run = run_metadata()
+
+    def emit(self, result: dict) -> None:
+        line = json.dumps({**result, "run": self.run}, default=str)
+        print(line, flush=True)
+        if self.path:
+            with open(self.path, "a", encoding="utf-8") as handle:
+                handle.write(line + "\n")
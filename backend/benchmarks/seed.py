@@ -0,0 +1,125 @@
+# backend/benchmarks/seed.py
+"""
+Seeds a database with synthetic users, expenses and saving goals for the
+benchmarks.
+
+    python benchmarks/seed.py --database-url sqlite:///bench.db --users 100 --expenses 1000000
+    python benchmarks/seed.py --database-url postgresql://... --users 1000 --expenses 10000000
+
+Runs `alembic upgrade head` first. Users are bench{n}@example.com with the
+password in PASSWORD, hashed at BCRYPT_ROUNDS (4 by default here, so login
+benchmarks measure the service rather than bcrypt). Expenses are spread
+across the users and over the last --days days and inserted in batches with
+executemany. The daily rollup is rebuilt once at the end. Generation is
+deterministic for a given --seed. Prints one JSON line.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import harness
+
+PASSWORD = "correct horse battery staple"
+EMAIL = "bench{}@example.com"
+DAYS = 730
+BATCH_SIZE = 10000
+CATEGORIES = ["Food", "Transport", "Bills", "Shopping", "Health", "Entertainment", "Travel", "Other"]
+WORDS = ["coffee", "grocery", "taxi", "rent", "pharmacy", "cinema", "train", "lunch", "market", "fuel", "gift", "books"]
+
+
+def seed(
+    users: int, expenses: int, goals_per_user: int = 3, rng_seed: int = 42, batch_size: int = BATCH_SIZE, days: int = DAYS,
+) -> list[int]:
+    """Inserts the synthetic data through the configured DATABASE_URL; returns the new user ids in order."""
+    from sqlalchemy import func, insert, select
+    from config import get_settings
+    from database import SessionLocal
+    from hashing import make_context
+    from models import Expense, SavingGoal, User
+    import money
+    import rollup
+
+    settings = get_settings()
+    currency = money.default_currency()
+    password_hash = make_context(settings.bcrypt_rounds).hash(PASSWORD)
+    rng = random.Random(rng_seed)
+    today = date.today()
+
+    with SessionLocal() as db:
+        if db.scalar(select(func.count()).select_from(User).where(User.email == EMAIL.format(0))):
+            raise SystemExit("This database is already seeded; point --database-url at an empty one")
+
+        for start in range(0, users, batch_size):
+            db.execute(insert(User), [
+                {"name": f"Bench {n}", "email": EMAIL.format(n), "password": password_hash, "data_version": 1}
+                for n in range(start, min(start + batch_size, users))
+            ])
+        db.commit()
+        user_ids = list(db.scalars(
+            select(User.id).where(User.email.like("bench%@example.com")).order_by(User.id)
+        ))
+
+        for start in range(0, expenses, batch_size):
+            db.execute(insert(Expense), [
+                {
+                    "user_id": user_ids[rng.randrange(len(user_ids))],
+                    "category": rng.choice(CATEGORIES),
+                    "amount_minor": int(rng.lognormvariate(7, 1.2)),  # median ~11 major units, long tail
+                    "currency": currency,
+                    "description": f"{rng.choice(WORDS)} {rng.choice(WORDS)} #{start + i}",
+                    "date": today - timedelta(days=rng.randrange(days)),
+                    "change_seq": 1,
+                }
+                for i in range(min(batch_size, expenses - start))
+            ])
+            db.commit()
+
+        goals = [
+            {
+                "user_id": user_id,
+                "title": f"Goal {g}",
+                "target_amount_minor": rng.randrange(10_000, 10_000_000),
+                "saved_amount_minor": 0,
+                "currency": currency,
+                "change_seq": 1,
+            }
+            for user_id in user_ids for g in range(goals_per_user)
+        ]
+        for start in range(0, len(goals), batch_size):
+            db.execute(insert(SavingGoal), goals[start:start + batch_size])
+        db.commit()
+        rollup.rebuild(db)
+    return user_ids
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--expenses", type=int, default=100000)
+    parser.add_argument("--goals-per-user", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--days", type=int, default=DAYS, help="history length the expenses are spread over")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4)
+    parser.add_argument("--output", help="also append the JSON line to this file")
+    args = parser.parse_args(argv)
+
+    harness.scratch_environment(args.database_url, BCRYPT_ROUNDS=str(args.bcrypt_rounds))
+    harness.migrate()
+    started = time.perf_counter()
+    seed(args.users, args.expenses, args.goals_per_user, args.seed, days=args.days)
+    elapsed = time.perf_counter() - started
+    harness.Output(args.output).emit({
+        "benchmark": "seed",
+        "users": args.users,
+        "rows": args.expenses,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(args.expenses / elapsed, 1),
+    })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
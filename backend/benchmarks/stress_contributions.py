@@ -0,0 +1,203 @@
+# backend/benchmarks/stress_contributions.py
+"""
+Concurrency stress test for POST /goals/{goal_id}/contributions: many
+clients deposit into a few goals at once, and afterwards every deposit must
+be counted exactly once.
+
+    python benchmarks/stress_contributions.py
+    python benchmarks/stress_contributions.py --requests 20000 --concurrency 64 --goals 2
+    python benchmarks/stress_contributions.py --target server --server-workers 4 --database-url postgresql://.../stress
+    python benchmarks/stress_contributions.py --compare-patch
+
+Every --retry-every'th deposit is sent twice at the same time with the same
+Idempotency-Key, like a phone retrying after a timeout, so retries race the
+original. Once the load stops, for each goal:
+  saved_amount == the sum of the accepted deposits == the sum of its ledger
+and there is exactly one ledger entry per accepted key.
+
+--compare-patch replays the same deposits the way clients had to before:
+read the goal, then PATCH the total they computed. It reports how many of
+those deposits were lost, which is expected and not a failure.
+
+Prints one JSON line per mode; exits with status 1 if a check fails.
+"""
+import argparse
+import asyncio
+import random
+import sys
+from decimal import Decimal
+
+import harness
+import seed
+from bench_http import start_server
+
+
+async def _goal_amounts(client, user_id: int) -> dict[int, Decimal]:
+    response = await client.get(f"/goals/user/{user_id}")
+    response.raise_for_status()
+    return {goal["id"]: Decimal(str(goal["saved_amount"])) for goal in response.json()}
+
+
+def _ledger() -> dict[int, tuple[int, int, int]]:
+    """goal id -> (sum of amounts, entries, distinct idempotency keys), read straight from the database."""
+    from sqlalchemy import func, select
+    from database import SessionLocal
+    from models import GoalContribution
+
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(
+                GoalContribution.goal_id,
+                func.sum(GoalContribution.amount_minor),
+                func.count(),
+                func.count(GoalContribution.idempotency_key.distinct()),
+            ).group_by(GoalContribution.goal_id)
+        )
+        return {goal_id: (total, entries, keys) for goal_id, total, entries, keys in rows}
+
+
+async def _contributions(args, client, user_id: int, goal_ids: list[int], deposits: list[Decimal], exponent: int) -> dict:
+    accepted: dict[int, Decimal] = {goal_id: Decimal(0) for goal_id in goal_ids}
+    accepted_keys = {goal_id: 0 for goal_id in goal_ids}
+    replayed = 0
+
+    async def post(i: int):
+        return await client.post(
+            f"/goals/{goal_ids[i % len(goal_ids)]}/contributions",
+            json={"amount": str(deposits[i])},
+            headers={"Idempotency-Key": f"stress-{i}"},
+        )
+
+    async def send(i: int) -> int:
+        nonlocal replayed
+        if args.retry_every and i % args.retry_every == 0:
+            responses = await asyncio.gather(post(i), post(i))
+        else:
+            responses = [await post(i)]
+        statuses = sorted(response.status_code for response in responses)
+        if 201 in statuses:
+            goal_id = goal_ids[i % len(goal_ids)]
+            accepted[goal_id] += deposits[i]
+            accepted_keys[goal_id] += 1
+        replayed += statuses.count(200)
+        # Anything but one 201 (plus a replayed 200 for a retry) is reported as-is.
+        return next((status for status in statuses if status not in (200, 201)), 201)
+
+    latencies, statuses, elapsed = await harness.drive(send, args.requests, args.concurrency)
+    saved = await _goal_amounts(client, user_id)
+    ledger = _ledger()
+    scale = Decimal(10) ** -exponent
+    failures = []
+    for goal_id in goal_ids:
+        total_minor, entries, keys = ledger.get(goal_id, (0, 0, 0))
+        if not (saved[goal_id] == accepted[goal_id] == Decimal(total_minor) * scale):
+            failures.append(f"goal {goal_id}: saved {saved[goal_id]}, accepted {accepted[goal_id]}, ledger {Decimal(total_minor) * scale}")
+        if not (entries == keys == accepted_keys[goal_id]):
+            failures.append(f"goal {goal_id}: {entries} ledger entries, {keys} keys, {accepted_keys[goal_id]} accepted")
+    summary = harness.latency_summary(latencies, statuses, elapsed)
+    return {
+        **summary,
+        "writes_per_second": round(sum(accepted_keys.values()) / elapsed, 1),
+        "checks": {"accepted": sum(accepted_keys.values()), "replayed": replayed, "failures": failures},
+    }
+
+
+async def _patch(args, client, user_id: int, goal_id: int, deposits: list[Decimal]) -> dict:
+    async def send(i: int) -> int:
+        current = (await _goal_amounts(client, user_id))[goal_id]
+        response = await client.patch(
+            f"/goals/{goal_id}", json={"saved_amount": str(current + deposits[i])}
+        )
+        return response.status_code
+
+    latencies, statuses, elapsed = await harness.drive(send, args.requests, args.concurrency)
+    expected = sum(deposits[:args.requests], Decimal(0))
+    saved = (await _goal_amounts(client, user_id))[goal_id]
+    return {
+        **harness.latency_summary(latencies, statuses, elapsed),
+        "checks": {"expected": str(expected), "saved": str(saved), "lost": str(expected - saved)},
+    }
+
+
+async def _run(args, output: harness.Output, url: str = None) -> bool:
+    import httpx
+    import money
+
+    if url is None:
+        from main import app
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)  # a 500 is a result here
+        client = httpx.AsyncClient(transport=transport, base_url="http://stress", timeout=None)
+    else:
+        limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+        client = httpx.AsyncClient(base_url=url, timeout=60, limits=limits)
+
+    # seed.py creates the goals in the default currency.
+    exponent = money.exponent(money.default_currency())
+    rng = random.Random(42)
+    deposits = [Decimal(rng.randrange(1, 100_000)).scaleb(-exponent) for _ in range(args.requests)]
+    user_id = args.user_id
+    ok = True
+    async with client:
+        login = await client.post("/auth/login", json={"email": seed.EMAIL.format(0), "password": seed.PASSWORD})
+        login.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {login.json()['access_token']}"
+        goal_ids = sorted(await _goal_amounts(client, user_id))
+        labels = {
+            "benchmark": "stress_contributions",
+            "target": args.target,
+            "server_workers": args.server_workers if args.target == "server" else None,
+            "goals": args.goals,
+            "concurrency": args.concurrency,
+        }
+        result = await _contributions(args, client, user_id, goal_ids[:args.goals], deposits, exponent)
+        ok = not result["checks"]["failures"] and result["statuses"].keys() <= {"201"}
+        output.emit({**labels, "mode": "contributions", **result})
+        if args.compare_patch:
+            result = await _patch(args, client, user_id, goal_ids[args.goals], deposits)
+            output.emit({**labels, "goals": 1, "mode": "patch", **result})
+    return ok
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=("asgi", "server"), default="asgi")
+    parser.add_argument("--server-workers", type=int, default=4)
+    parser.add_argument("--database-url", help="use this (empty) database instead of a scratch SQLite file")
+    parser.add_argument("--goals", type=int, default=4, help="goals the deposits are spread over")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--retry-every", type=int, default=10, help="0 disables the duplicate retries")
+    parser.add_argument("--compare-patch", action="store_true")
+    parser.add_argument("--output", help="also append the JSON lines to this file")
+    args = parser.parse_args(argv)
+    output = harness.Output(args.output)
+
+    # SQLite runs one writer at a time, and its busy handler isn't fair; a
+    # generous timeout keeps this test about lost updates rather than lock waits.
+    harness.scratch_environment(args.database_url, SQLITE_BUSY_TIMEOUT_MS="30000")
+    harness.migrate()
+    # One extra goal for --compare-patch.
+    args.user_id = seed.seed(1, 0, goals_per_user=args.goals + 1)[0]
+
+    if args.target == "asgi":
+        from database import dispose_engines
+
+        async def run_in_process():
+            try:
+                return await _run(args, output)
+            finally:
+                await dispose_engines()
+
+        return 0 if asyncio.run(run_in_process()) else 1
+
+    process, url = start_server(args.server_workers)
+    try:
+        ok = asyncio.run(_run(args, output, url))
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
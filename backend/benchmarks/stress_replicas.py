@@ -0,0 +1,188 @@
+# backend/benchmarks/stress_replicas.py
+"""
+Read/write splitting check: a primary plus read replicas, driven through the
+app in this process.
+
+    python benchmarks/stress_replicas.py
+    python benchmarks/stress_replicas.py --replicas 3 --dead-replica --requests 5000
+    python benchmarks/stress_replicas.py --database-url postgresql://.../primary \\
+        --replica-urls postgresql://.../standby1 postgresql://.../standby2
+
+By default the primary is a scratch SQLite file and each replica is a
+snapshot of it taken after seeding, i.e. a replica that stopped replicating.
+Anything a replica serves is therefore visibly stale, which makes routing
+mistakes show up as wrong answers. With --replica-urls, real standbys are
+used instead.
+
+Modes (one JSON line each):
+  reads             GET /expenses/ for --users logged-in users; reports how
+                    the reads were split between the replicas and the primary
+  read_your_writes  each request adds an expense and immediately lists the
+                    user's expenses; the new one must be first, which only
+                    holds if the user was pinned to the primary
+  unpinned          after REPLICA_PIN_SECONDS the same users read from the
+                    replicas again (snapshots only: they still miss the new rows)
+
+--dead-replica adds a replica URL that can't be opened; reads must fail over.
+Exits with status 1 if a check fails.
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+
+import harness
+import seed
+
+PIN_SECONDS = 2.0
+
+
+def _snapshot(primary_path: str, replica_paths: list[str]) -> None:
+    """Copies the primary SQLite file to each replica path (a consistent online backup)."""
+    source = sqlite3.connect(primary_path)
+    try:
+        for path in replica_paths:
+            target = sqlite3.connect(path)
+            source.backup(target)
+            target.close()
+    finally:
+        source.close()
+
+
+def _routing(replica_stats: dict) -> dict:
+    """Reads served per replica and by the primary, from /metrics/pool."""
+    return {name: stats["reads"] for name, stats in replica_stats.items()}
+
+
+def _delta(after: dict, before: dict) -> dict:
+    return {name: after[name] - before.get(name, 0) for name in after}
+
+
+async def _run(args, output: harness.Output) -> bool:
+    import httpx
+    from main import create_app
+
+    app = create_app()
+    failures = []
+
+    def check_statuses(mode: str, statuses: dict) -> None:
+        errors = {status: count for status, count in statuses.items() if status != 200}
+        if errors:
+            failures.append(f"{mode}: unexpected statuses {errors}")
+
+    async with app.router.lifespan_context(app):  # starts the replica health checks
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replicas", timeout=None) as client:
+            async def routing() -> dict:
+                return _routing((await client.get("/metrics/pool")).json()["replicas"])
+
+            sessions = []
+            for n in range(args.users):
+                response = await client.post("/auth/login", json={"email": seed.EMAIL.format(n), "password": seed.PASSWORD})
+                response.raise_for_status()
+                login = response.json()
+                sessions.append({"id": login["user"]["id"], "headers": {"Authorization": f"Bearer {login['access_token']}"}})
+            labels = {"benchmark": "stress_replicas", "replicas": len(args.replica_urls), "concurrency": args.concurrency}
+
+            async def read(i: int) -> int:
+                return (await client.get("/expenses/?limit=100", headers=sessions[i % len(sessions)]["headers"])).status_code
+
+            before = await routing()
+            latencies, statuses, elapsed = await harness.drive(read, args.requests, args.concurrency)
+            split = _delta(await routing(), before)
+            check_statuses("reads", statuses)
+            if args.dead_replica and split.get(f"replica{len(args.replica_urls) - 1}"):
+                failures.append("the unreachable replica served reads")
+            if sum(split.values()) - split["primary"] == 0:
+                failures.append("no reads reached a replica")
+            output.emit({**labels, "mode": "reads", **harness.latency_summary(latencies, statuses, elapsed), "routing": split})
+
+            created: dict[int, int] = {}
+            missed = 0
+
+            async def write_then_read(i: int) -> int:
+                nonlocal missed
+                session = sessions[i % len(sessions)]
+                response = await client.post("/expenses/", headers=session["headers"], json={
+                    "category": "Food", "amount": "1.00", "user_id": session["id"], "description": f"replica check {i}",
+                })
+                if response.status_code != 200:
+                    return response.status_code
+                expense_id = response.json()["id"]
+                created[session["id"]] = max(created.get(session["id"], 0), expense_id)
+                page = await client.get("/expenses/?limit=1&sort=-date", headers=session["headers"])
+                if page.status_code != 200:
+                    return page.status_code
+                # Another request for the same user may have added a newer one meanwhile.
+                if not page.json() or page.json()[0]["id"] < expense_id:
+                    missed += 1
+                return 200
+
+            before = await routing()
+            latencies, statuses, elapsed = await harness.drive(write_then_read, args.writes, args.concurrency)
+            split = _delta(await routing(), before)
+            check_statuses("read_your_writes", statuses)
+            if missed:
+                failures.append(f"{missed} reads right after a write did not see it")
+            output.emit({
+                **labels, "mode": "read_your_writes", **harness.latency_summary(latencies, statuses, elapsed),
+                "routing": split, "checks": {"missed": missed},
+            })
+
+            await asyncio.sleep(PIN_SECONDS + 0.5)
+            before = await routing()
+            stale = 0
+            for session in sessions:
+                page = (await client.get("/expenses/?limit=1&sort=-date", headers=session["headers"])).json()
+                stale += bool(page) and page[0]["id"] != created.get(session["id"])
+            split = _delta(await routing(), before)
+            if split["primary"]:
+                failures.append(f"{split['primary']} reads stayed on the primary after the pin expired")
+            if args.snapshots and stale != len(sessions):
+                failures.append(f"only {stale} of {len(sessions)} unpinned reads came from the stale replicas")
+            output.emit({**labels, "mode": "unpinned", "routing": split, "checks": {"stale_reads": stale, "failures": failures}})
+    return not failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="primary (empty; it is seeded) instead of a scratch SQLite file")
+    parser.add_argument("--replica-urls", nargs="+", help="standbys of --database-url instead of SQLite snapshots")
+    parser.add_argument("--replicas", type=int, default=2, help="SQLite snapshots to create")
+    parser.add_argument("--dead-replica", action="store_true", help="also configure a replica that can't be reached")
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--expenses", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=1000, help="reads in the reads mode")
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--output", help="also append the JSON lines to this file")
+    args = parser.parse_args(argv)
+    if args.replica_urls and not args.database_url:
+        parser.error("--replica-urls needs --database-url")
+    output = harness.Output(args.output)
+
+    database_url = harness.scratch_environment(args.database_url)
+    args.snapshots = not args.replica_urls
+    if args.snapshots:
+        directory = os.path.dirname(database_url[len("sqlite:///"):])
+        paths = [os.path.join(directory, f"replica{i}.db") for i in range(args.replicas)]
+        args.replica_urls = [f"sqlite:///{path}" for path in paths]
+    if args.dead_replica:
+        args.replica_urls.append("sqlite:////nonexistent/replica.db")
+    os.environ.update(
+        DATABASE_REPLICA_URLS=",".join(args.replica_urls),
+        REPLICA_PIN_SECONDS=str(PIN_SECONDS),
+        REPLICA_CHECK_SECONDS="0.5",
+        JOB_WORKERS="0",
+    )
+    harness.migrate()
+    seed.seed(args.users, args.expenses)
+    if args.snapshots:
+        _snapshot(database_url[len("sqlite:///"):], paths)  # never refreshed: replication "stops" here
+
+    return 0 if asyncio.run(_run(args, output)) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+# backend/benchmarks/suite.py
+"""
+Runs the benchmark suite at a given scale and collects every result in one
+JSON-lines file, ready for compare.py.
+
+    python benchmarks/suite.py --scale 10k                       # -> results-<commit>.jsonl
+    python benchmarks/suite.py --scale 1m --output base.jsonl
+    python benchmarks/suite.py --scale 10k --http-target server --database-url postgresql://.../bench
+
+    git stash; python benchmarks/suite.py --output base.jsonl; git stash pop
+    python benchmarks/suite.py --output head.jsonl
+    python benchmarks/compare.py base.jsonl head.jsonl
+
+Each benchmark runs in a fresh interpreter, because settings are read at
+import time. A --database-url must point at an empty database and is only
+used for the HTTP runs; the micro-benchmarks always use scratch SQLite.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+import harness
+
+# rows of expenses -> users they are spread over
+SCALES = {
+    "1k": (1000, 10),
+    "10k": (10000, 20),
+    "100k": (100000, 100),
+    "1m": (1000000, 1000),
+    "10m": (10000000, 10000),
+}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="10k")
+    parser.add_argument("--output", help="results file (default: results-<commit>.jsonl)")
+    parser.add_argument("--http-target", choices=("asgi", "server"), default="asgi")
+    parser.add_argument("--database-url", help="empty database to seed for the HTTP runs")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--skip-micro", action="store_true", help="skip bench_micro.py and bench_serialization.py")
+    parser.add_argument("--skip-http", action="store_true")
+    parser.add_argument("--skip-startup", action="store_true", help="skip bench_startup.py")
+    args = parser.parse_args(argv)
+
+    rows, users = SCALES[args.scale]
+    output = os.path.abspath(args.output or f"results-{harness.run_metadata()['commit'] or 'unknown'}.jsonl")
+    scripts = []
+    if not args.skip_micro:
+        # One user's history, capped: per-call costs depend on rows per user, not table size.
+        scripts.append(["bench_micro.py", "--users", "1", "--expenses", str(min(rows, 100000))])
+        scripts.append(["bench_serialization.py", "--expenses", str(min(rows, 100000))])
+    if not args.skip_startup:
+        scripts.append(["bench_startup.py"])
+    if not args.skip_http:
+        http = ["bench_http.py", "--target", args.http_target, "--users", str(users), "--expenses", str(rows),
+                "--requests", str(args.requests), "--concurrency", str(args.concurrency)]
+        if args.database_url:
+            http += ["--database-url", args.database_url]
+        scripts.append(http)
+
+    for script, *script_args in scripts:
+        subprocess.run(
+            [sys.executable, os.path.join(harness.HERE, script), *script_args, "--output", output],
+            check=True,
+        )
+    print(f"results: {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
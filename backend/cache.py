@@ -0,0 +1,168 @@
+# backend/cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from config import Settings, get_settings
+
+
+class TTLCache:
+    """In-process LRU cache whose entries also expire `ttl` seconds after being set."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class RedisCache:
+    """
+    Same interface as TTLCache, backed by a Redis-compatible client so every
+    worker shares one cache. Values must be bytes. Any object with
+    get / set(ex=) / delete / scan_iter works as the client.
+    """
+
+    def __init__(self, client, ttl: float, prefix: str = "finance:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    # The cache is best-effort: a Redis outage degrades to cache misses.
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            value = self.client.get(self.prefix + key)
+        except Exception:
+            self.errors += 1
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        try:
+            self.client.set(self.prefix + key, value, ex=max(1, int(self.ttl)))
+        except Exception:
+            self.errors += 1
+
+    def invalidate(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def _redis_client(settings: Settings):
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError("RESULT_CACHE_URL is set but the `redis` package is not installed")
+    return redis.Redis.from_url(settings.result_cache_url, socket_timeout=0.25)
+
+
+def make_result_cache(settings: Settings):
+    """In-process LRU unless `result_cache_url` points at Redis (needs the `redis` package)."""
+    if not settings.result_cache_url:
+        return TTLCache(settings.result_cache_size, settings.result_cache_ttl_seconds)
+    return RedisCache(_redis_client(settings), settings.result_cache_ttl_seconds)
+
+
+def make_pin_cache(settings: Settings):
+    """
+    Users pinned to the primary after a write (see database.read_session).
+    Shared through Redis when `result_cache_url` is set, so a write pins the
+    user on every worker; otherwise only on the worker that handled it.
+    """
+    if not settings.result_cache_url:
+        return TTLCache(settings.user_cache_size, settings.replica_pin_seconds)
+    return RedisCache(_redis_client(settings), settings.replica_pin_seconds, prefix="finance:pin:")
+
+
+_caches: dict = {}  # name -> cache; see init_caches
+
+
+def init_caches(settings: Settings) -> None:
+    """
+    Replaces the process-wide caches with empty ones built from `settings`
+    (main.create_app calls this). Read them as `cache.user_cache` and so on,
+    not with `from cache import ...`, so callers see the replacements.
+    """
+    _caches.update(
+        # Authenticated users keyed by token subject (email); see auth_utils.get_current_user.
+        user_cache=TTLCache(settings.user_cache_size, settings.user_cache_ttl_seconds),
+        # Serialized GET responses keyed by ETag; see etags.py.
+        result_cache=make_result_cache(settings),
+        # ai.insights.Insights models keyed by (user id, currency); Python objects, so never Redis.
+        insights_cache=TTLCache(settings.insights_cache_size, settings.insights_cache_ttl_seconds),
+        # str(user id) -> b"1" while the user's reads must see their own writes.
+        primary_pins=make_pin_cache(settings),
+    )
+
+
+def __getattr__(name: str):
+    # The caches are built from get_settings() on first access unless init_caches ran.
+    if name in ("user_cache", "result_cache", "insights_cache", "primary_pins"):
+        if not _caches:
+            init_caches(get_settings())
+        return _caches[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,228 @@
+# backend/check_query_plans.py
+"""
+Query-plan regression check for the hot crud queries.
+
+Migrates a scratch database to head, seeds a little data, runs the real crud
+functions while capturing their SQL, and EXPLAINs each statement to assert it
+is served by an index (no full table scan, no sort step for keyset pages).
+On PostgreSQL it also asserts that date-bounded expense queries only scan
+the monthly partitions in range (see partitions.py).
+
+    python check_query_plans.py                          # scratch SQLite file
+    python check_query_plans.py --url postgresql://...   # disposable Postgres DB
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+from datetime import date, timedelta
+from typing import Optional
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
+import crud
+import partitions
+import schemas
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HOT_TABLES = ("users", "expenses", "saving_goals", "expense_daily_rollups", "sync_tombstones", "expense_archives")
+PARTITION_SCAN = re.compile(r" on (expenses_p\d{6}|%s)\b" % partitions.DEFAULT_PARTITION)
+# A Sort node, not the "Sort Key:" detail of e.g. a Merge Append over presorted partitions.
+SORT_NODE = re.compile(r"^(->\s*)?(Incremental )?Sort\s+\(")
+
+
+def _seed(db: Session) -> int:
+    user = crud.create_user(db, schemas.UserCreate(name="Plan Check", email="plans@example.com", password="x"))
+    for i in range(50):
+        crud.create_expense(db, schemas.ExpenseCreate(
+            category=("food", "travel", "bills")[i % 3],
+            amount=10 + i,
+            date=date.today() - timedelta(days=i),
+            description=f"lunch {i}" if i % 5 == 0 else None,
+            user_id=user.id,
+        ))
+    crud.create_saving_goal(db, schemas.SavingGoalCreate(title="Trip", target_amount=500, user_id=user.id))
+    return user.id
+
+
+def _hot_queries(user_id: int):
+    """(label, crud call, index that must appear in the plan or None for any, must avoid a sort step)"""
+    today = date.today()
+    return [
+        ("get_user_by_email", lambda db: crud.get_user_by_email(db, "plans@example.com"), "ix_users_email", False),
+        ("get_users_page(after)", lambda db: crud.get_users_page(db, 50, after=0), None, True),
+        ("get_expenses_page", lambda db: crud.get_expenses_page(db, user_id, limit=20), "ix_expenses_user_date_id", True),
+        ("get_expenses_page(after)", lambda db: crud.get_expenses_page(db, user_id, limit=20, after=(today, 10**9)), "ix_expenses_user_date_id", True),
+        ("get_expenses_page(sort=amount)", lambda db: crud.get_expenses_page(db, user_id, limit=20, filters=schemas.ExpenseFilter(sort="-amount")), "ix_expenses_user_amount_minor_id", True),
+        ("get_expenses_page(filters)", lambda db: crud.get_expenses_page(db, user_id, limit=20, filters=schemas.ExpenseFilter(
+            start=today - timedelta(days=30), end=today, categories=["food", "bills"], min_amount=15)), "ix_expenses_user_date_id", True),
+        ("get_expense_rows_page", lambda db: crud.get_expense_rows_page(db, user_id, limit=20), "ix_expenses_user_date_id", True),
+        ("get_expenses_page(q)", lambda db: crud.get_expenses_page(db, user_id, limit=20, filters=schemas.ExpenseFilter(q="lunch")), None, False),
+        ("iter_expenses_by_user", lambda db: list(crud.iter_expenses_by_user(db, user_id)), "ix_expenses_user_date_id", True),
+        ("analyze_user_expenses", lambda db: crud.analyze_user_expenses(db, user_id), None, False),
+        ("get_category_totals", lambda db: crud.get_category_totals(db, user_id, today - timedelta(days=30), today), None, False),
+        ("get_daily_trend", lambda db: crud.get_daily_trend(db, user_id, today - timedelta(days=30), today), None, False),
+        ("get_changes", lambda db: crud.get_changes(db, user_id, since=10), None, True),
+        ("get_insight_source", lambda db: crud.get_insight_source(db, user_id, "INR", today - timedelta(days=365), today - timedelta(days=180)), None, False),
+        ("get_goals_by_user", lambda db: crud.get_goals_by_user(db, user_id), "ix_saving_goals_user_change_seq_id", False),
+        ("get_goal_rows", lambda db: crud.get_goal_rows(db, user_id), "ix_saving_goals_user_change_seq_id", False),
+        ("get_goal_contributions", lambda db: crud.get_goal_contributions(db, 1, user_id, limit=50, after=10**9), "ix_goal_contributions_goal_id_id", True),
+        ("contribution_months", lambda db: db.execute(crud.contribution_months_stmt(1, today, 12)).all(), "ix_goal_contributions_goal_id_id", False),
+    ]
+
+
+def _pruned_queries(user_id: int):
+    """
+    (label, crud call, first day, last day or None): each plan may only scan
+    the partitions for those months. With no last day, the later months and
+    the default partition (future or unpartitioned dates) are in range too.
+    """
+    today = date.today()
+    month = today.replace(day=1)
+    previous = partitions.add_months(month, -1)
+    last_of_previous = month - timedelta(days=1)
+    return [
+        ("get_expenses_page(start)", lambda db: crud.get_expenses_page(db, user_id, limit=20, filters=schemas.ExpenseFilter(
+            start=today - timedelta(days=30))), today - timedelta(days=30), None),
+        ("get_expenses_page(previous month)", lambda db: crud.get_expenses_page(db, user_id, limit=20, filters=schemas.ExpenseFilter(
+            start=previous, end=last_of_previous, sort="-amount")), previous, last_of_previous),
+        ("iter_expenses_by_user(start)", lambda db: list(crud.iter_expenses_by_user(db, user_id, filters=schemas.ExpenseFilter(
+            start=today - timedelta(days=60)))), today - timedelta(days=60), None),
+        ("insight_expenses", lambda db: db.execute(crud.insight_expenses_stmt(user_id, "INR", today - timedelta(days=180))).all(),
+            today - timedelta(days=180), None),
+    ]
+
+
+def _allowed_partitions(conn, first: date, last: Optional[date]) -> set[str]:
+    names = {
+        name for month, name in partitions.monthly_partitions(conn).items()
+        if month >= first.replace(day=1) and (last is None or month <= last)
+    }
+    return names if last is not None else names | {partitions.DEFAULT_PARTITION}
+
+
+def _index_names(conn, index: str) -> set[str]:
+    """`index` plus, on PostgreSQL, the per-partition indexes it was created as."""
+    if conn.dialect.name != "postgresql":
+        return {index}
+    children = conn.exec_driver_sql(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(%(index)s)", {"index": index}
+    ).scalars()
+    return {index, *children}
+
+
+def _captured(engine, db: Session, call) -> list:
+    """(statement, params) of every SELECT `call` runs."""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        call(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return captured
+
+
+def _explain(conn, statement: str, params) -> str:
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, params).fetchall()
+        return "\n".join(row[-1] for row in rows)
+    rows = conn.exec_driver_sql("EXPLAIN " + statement, params).fetchall()
+    return "\n".join(row[0] for row in rows)
+
+
+def _problems(plan: str, dialect: str, ordered: bool) -> list[str]:
+    problems = []
+    for table in HOT_TABLES:
+        if dialect == "sqlite":
+            scanned = any(
+                line.split()[:2] == ["SCAN", table] and "USING" not in line
+                for line in plan.splitlines()
+            )
+        else:
+            scanned = f"Seq Scan on {table}" in plan
+        if scanned:
+            problems.append(f"full scan of {table}")
+    sorts = any(
+        "TEMP B-TREE FOR ORDER BY" in line or SORT_NODE.match(line.strip())
+        for line in plan.splitlines()
+    )
+    if ordered and sorts:
+        problems.append("extra sort step")
+    return problems
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="database to migrate and check (default: scratch SQLite file)")
+    args = parser.parse_args(argv)
+
+    scratch = None
+    url = args.url
+    if url is None:
+        scratch = tempfile.mkdtemp()
+        url = f"sqlite:///{os.path.join(scratch, 'plans.db')}"
+    engine = create_engine(url)
+
+    with engine.begin() as conn:
+        cfg = Config(os.path.join(HERE, "alembic.ini"))
+        cfg.set_main_option("script_location", os.path.join(HERE, "migrations"))
+        cfg.attributes["connection"] = conn
+        command.upgrade(cfg, "head")
+
+    failures = 0
+    with Session(bind=engine) as db:
+        user_id = _seed(db)
+        if engine.dialect.name == "postgresql":
+            # Tiny tables make sequential scans and sorts cheapest; we only care whether an index *can* serve the query.
+            db.execute(text("SET enable_seqscan = off"))
+            db.execute(text("SET enable_sort = off"))
+
+        for label, call, index, ordered in _hot_queries(user_id):
+            captured = _captured(engine, db, call)
+            conn = db.connection()
+            plans = []
+            for statement, params in captured:
+                plan = _explain(conn, statement, params)
+                plans.append(plan)
+                problems = _problems(plan, engine.dialect.name, ordered)
+                status = "ok" if not problems else "FAIL: " + ", ".join(problems)
+                print(f"[{label}] {status}")
+                if problems:
+                    failures += 1
+                    print("    " + plan.replace("\n", "\n    "))
+            # The index has to serve one of the call's statements (others read e.g. the archive catalog).
+            if index and not any(name in plan for plan in plans for name in _index_names(conn, index)):
+                failures += 1
+                print(f"[{label}] FAIL: {index} not used")
+                print("    " + "\n".join(plans).replace("\n", "\n    "))
+
+        if engine.dialect.name == "postgresql":
+            for label, call, first, last in _pruned_queries(user_id):
+                conn = db.connection()
+                allowed = _allowed_partitions(conn, first, last)
+                for statement, params in _captured(engine, db, call):
+                    plan = _explain(conn, statement, params)
+                    scanned = set(PARTITION_SCAN.findall(plan))
+                    if not scanned:
+                        continue  # not a query on expenses
+                    extra = scanned - allowed
+                    print(f"[{label}] " + ("ok" if not extra else "FAIL: not pruned: " + ", ".join(sorted(extra))))
+                    if extra:
+                        failures += 1
+                        print("    " + plan.replace("\n", "\n    "))
+
+    engine.dispose()
+    print("All hot queries use indexes." if not failures else f"{failures} query plan regressions.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,32 @@
 # backend/crud.py
 from sqlalchemy.orm import Session  # ✅ FIX: Import Session
-from sqlalchemy import func, extract
-from datetime import datetime, timedelta , date as DateType
-from models import User, Expense, SavingGoal
+from sqlalchemy import Row, and_, case, func, extract, insert, or_, select, text, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, time, timedelta, timezone, date as DateType
+from models import User, Expense, SavingGoal, GoalContribution, ExpenseDailyRollup, SyncTombstone, Job
 import schemas
-from passlib.context import CryptContext
-from typing import Optional  # ✅ FIX: Import Optional
+from typing import Iterator, Optional  # ✅ FIX: Import Optional
+from decimal import ROUND_CEILING, ROUND_FLOOR
+import cache
+from config import get_settings
+from database import mark_written
+from hashing import make_context
+import heapq
+import math
+import archive
+import search
+import money
 
 # ----------------------------
 # Password Hashing Setup
 # ----------------------------
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
+# Sync helpers for scripts; the async routes go through hashing.hasher.
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return make_context(get_settings().bcrypt_rounds).hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     try:
-        return pwd_context.verify(plain_password, hashed_password)
+        return make_context(get_settings().bcrypt_rounds).verify(plain_password, hashed_password)
     except Exception:
         return False
 
@@ -30,8 +39,41 @@ def get_user_by_email(db: Session, email: str) -> Optional[User]:
 def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
     return db.query(User).filter(User.id == user_id).first()
 
-def get_all_users(db: Session) -> list[User]:
-    return db.query(User).all()
+# Everything UserResponse needs, in the order serialization.users unpacks them; never the password hash.
+USER_PUBLIC_COLUMNS = (User.id, User.name, User.email, User.date_of_birth, User.age, User.gender)
+
+def get_users_page(db: Session, limit: int, after: Optional[int] = None) -> list[Row]:
+    """At most `limit` users ordered by id, starting after id `after`, as USER_PUBLIC_COLUMNS rows."""
+    return list(db.execute(users_page_stmt(limit, after)))
+
+def users_page_stmt(limit: int, after: Optional[int] = None):
+    stmt = select(*USER_PUBLIC_COLUMNS)
+    if after is not None:
+        stmt = stmt.where(User.id > after)
+    return stmt.order_by(User.id).limit(limit)
+
+def iter_users(db: Session, batch_size: int = 1000) -> Iterator[dict]:
+    """Yields every user (public columns only) from a server-side cursor."""
+    for row in db.execute(users_export_stmt(batch_size)):
+        yield dict(row._mapping)
+
+def users_export_stmt(batch_size: int = 1000):
+    return select(*USER_PUBLIC_COLUMNS).order_by(User.id).execution_options(yield_per=batch_size)
+
+def count_users(db: Session, exact: bool = False) -> int:
+    """
+    Number of users. With `exact=False` on Postgres this reads the planner's
+    row estimate from pg_class instead of scanning the table.
+    """
+    if not exact and db.get_bind().dialect.name == "postgresql":
+        estimate = db.scalar(user_estimate_stmt())
+        if estimate is not None and estimate >= 0:
+            return int(estimate)
+    return db.scalar(select(func.count()).select_from(User))
+
+def user_estimate_stmt():
+    # -1 until the table has been vacuumed / analyzed at least once.
+    return text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'users'::regclass")
 
 def create_user(db: Session, user: schemas.UserCreate) -> User:
     hashed_password = hash_password(user.password)
@@ -44,48 +86,312 @@ def create_user(db: Session, user: schemas.UserCreate) -> User:
         gender=user.gender
     )
     db.add(new_user)
+    db.flush()
+    mark_written(db, new_user.id)
     db.commit()
     db.refresh(new_user)
     return new_user
 
+def get_data_version(db: Session, user_id: int) -> int:
+    return db.scalar(data_version_stmt(user_id)) or 0
+
+def data_version_stmt(user_id: int):
+    return select(User.data_version).where(User.id == user_id)
+
+def bump_data_version(db: Session, user_id: int) -> int:
+    """
+    Marks a user's expenses / goals as changed, which invalidates their ETags
+    and cached responses (see etags.py). Call inside the write's transaction.
+    Returns the new version; written rows store it as their `change_seq`.
+    The bump locks the user row until commit, so versions commit in order.
+    It also pins the user's reads to the primary once the write commits.
+    """
+    mark_written(db, user_id)
+    return db.scalar(data_version_bump_stmt(user_id))
+
+def data_version_bump_stmt(user_id: int):
+    return (
+        update(User)
+        .where(User.id == user_id)
+        .values(data_version=User.data_version + 1)
+        .returning(User.data_version)
+        .execution_options(synchronize_session=False)
+    )
+
 # ----------------------------
 # Expense CRUD
 # ----------------------------
+# Everything ExpenseResponse needs, in the order serialization.expenses unpacks them.
+EXPENSE_COLUMNS = (
+    Expense.id, Expense.user_id, Expense.category,
+    Expense.amount_minor, Expense.currency, Expense.description, Expense.date,
+)
+
 def get_expenses_by_user(db: Session, user_id: int) -> list[Expense]:
     return db.query(Expense).filter(Expense.user_id == user_id).order_by(Expense.date.desc()).all()
 
-def get_all_expenses(db: Session) -> list[Expense]:
-    return db.query(Expense).all()
+def get_expenses_page(
+    db: Session,
+    user_id: int,
+    limit: int,
+    after: Optional[tuple] = None,
+    filters: Optional[schemas.ExpenseFilter] = None,
+) -> list[Expense]:
+    """
+    Returns at most `limit` expenses matching `filters`, newest first unless
+    `filters.sort` says otherwise, ordered by (sort key, id). `after` is the
+    (sort key, id) of the last row of the previous page, so each page is an
+    index range scan instead of an OFFSET over the whole history.
+    """
+    stmt = expenses_page_stmt(user_id, limit, after, filters, db.get_bind().dialect.name)
+    page = list(db.scalars(stmt))
+    segments = db.execute(archive_page_stmt(user_id, page, limit, after, filters)).all()
+    return archive.merge_page(page, segments, limit, after, filters, orm=True)
+
+def get_expense_rows_page(
+    db: Session,
+    user_id: int,
+    limit: int,
+    after: Optional[tuple] = None,
+    filters: Optional[schemas.ExpenseFilter] = None,
+) -> list[Row]:
+    """The same page as get_expenses_page, as EXPENSE_COLUMNS rows instead of ORM objects."""
+    stmt = expenses_page_stmt(user_id, limit, after, filters, db.get_bind().dialect.name, EXPENSE_COLUMNS)
+    page = list(db.execute(stmt))
+    segments = db.execute(archive_page_stmt(user_id, page, limit, after, filters)).all()
+    return archive.merge_page(page, segments, limit, after, filters)
+
+def expenses_page_stmt(
+    user_id: int,
+    limit: int,
+    after: Optional[tuple] = None,
+    filters: Optional[schemas.ExpenseFilter] = None,
+    dialect: str = "",
+    columns: tuple = (Expense,),
+):
+    stmt = filter_expenses(select(*columns).where(Expense.user_id == user_id), filters, dialect)
+    return order_expenses(stmt, filters.sort if filters else "-date", after).limit(limit)
+
+def archive_page_stmt(user_id: int, page: list, limit: int, after: Optional[tuple] = None, filters: Optional[schemas.ExpenseFilter] = None):
+    """The user's archived segments (see archive.py) that rows of this page could come from."""
+    return archive.segments_stmt(user_id, *archive.page_range(filters, after, page, limit))
+
+def iter_expenses_by_user(
+    db: Session,
+    user_id: int,
+    after: Optional[tuple] = None,
+    batch_size: int = 500,
+    filters: Optional[schemas.ExpenseFilter] = None,
+) -> Iterator[dict]:
+    """
+    Yields a user's expenses as plain dicts from a server-side cursor,
+    `batch_size` rows at a time, without building ORM objects. Archived
+    rows are merged in, in order.
+    """
+    segments = db.execute(archive.segments_stmt(user_id, *archive.read_range(filters, after))).all()
+    merger = archive.Merger(archive.ordered_rows(segments, filters, after), filters)
+    stmt = expense_rows_stmt(user_id, after, batch_size, filters, db.get_bind().dialect.name)
+    for row in db.execute(stmt):
+        yield from merger.before(row)
+        yield dict(row._mapping)
+    yield from merger.rest()
+
+def expense_rows_stmt(
+    user_id: int,
+    after: Optional[tuple] = None,
+    batch_size: int = 500,
+    filters: Optional[schemas.ExpenseFilter] = None,
+    dialect: str = "",
+):
+    stmt = select(*EXPENSE_COLUMNS).where(Expense.user_id == user_id)
+    stmt = order_expenses(filter_expenses(stmt, filters, dialect), filters.sort if filters else "-date", after)
+    return stmt.execution_options(yield_per=batch_size)
+
+EXPENSE_SORT_COLUMNS = {"date": Expense.date, "amount": Expense.amount_minor}
+
+def filter_expenses(stmt, filters: Optional[schemas.ExpenseFilter], dialect: str):
+    """Adds the WHERE clauses for `filters` (all optional, ANDed together)."""
+    if filters is None:
+        return stmt
+    if filters.start is not None:
+        stmt = stmt.where(Expense.date >= filters.start)
+    if filters.end is not None:
+        stmt = stmt.where(Expense.date <= filters.end)
+    if filters.categories:
+        stmt = stmt.where(Expense.category.in_(filters.categories))
+    amounts = filters.min_amount is not None or filters.max_amount is not None
+    if filters.currency or amounts:
+        # Amount bounds are in one currency, so they also restrict to it.
+        currency = filters.currency or money.default_currency()
+        stmt = stmt.where(Expense.currency == currency)
+    if filters.min_amount is not None:
+        stmt = stmt.where(Expense.amount_minor >= money.to_minor(filters.min_amount, currency, ROUND_CEILING))
+    if filters.max_amount is not None:
+        stmt = stmt.where(Expense.amount_minor <= money.to_minor(filters.max_amount, currency, ROUND_FLOOR))
+    if filters.q:
+        stmt = stmt.where(search.description_matches(dialect, filters.q))
+    return stmt
+
+def order_expenses(stmt, sort: str, after: Optional[tuple] = None):
+    """ORDER BY (sort column, id), plus the keyset condition for rows past `after`."""
+    column = EXPENSE_SORT_COLUMNS[sort.lstrip("-")]
+    descending = sort.startswith("-")
+    if after is not None:
+        key = tuple_(column, Expense.id)
+        stmt = stmt.where(key < after if descending else key > after)
+    if descending:
+        return stmt.order_by(column.desc(), Expense.id.desc())
+    return stmt.order_by(column.asc(), Expense.id.asc())
 
 def create_expense(db: Session, expense: schemas.ExpenseCreate) -> Expense:
-    new_expense = Expense(**expense.model_dump())
+    version = bump_data_version(db, expense.user_id)
+    new_expense = Expense(**expense.as_row(), change_seq=version)
     db.add(new_expense)
+    db.flush()
+    if new_expense.date is None:
+        db.refresh(new_expense)  # pick up the server-side CURRENT_DATE default
+    apply_rollup_delta(
+        db, new_expense.user_id, new_expense.date, new_expense.category, new_expense.currency, new_expense.amount_minor, 1
+    )
     db.commit()
     db.refresh(new_expense)
     return new_expense
 
-def analyze_user_expenses(db: Session, user_id: int) -> dict:
+def insert_expense_batch(db: Session, expenses: list[schemas.ExpenseCreate]) -> int:
+    """
+    Inserts `expenses` with one multi-row INSERT and folds them into the
+    rollup, without committing, so a whole import can share one transaction.
+    """
+    rows, deltas = expense_batch_rows(expenses)
+    if not rows:
+        return 0
+    versions = {user_id: bump_data_version(db, user_id) for user_id in {row["user_id"] for row in rows}}
+    for row in rows:
+        row["change_seq"] = versions[row["user_id"]]
+    db.execute(insert(Expense).values(rows))
+    apply_rollup_deltas(db, deltas)
+    return len(rows)
+
+def expense_batch_rows(expenses: list[schemas.ExpenseCreate]) -> tuple[list[dict], dict]:
+    """Row dicts for a multi-row INSERT plus the per-(user, day, category, currency) rollup deltas."""
+    rows, deltas = [], {}
+    for expense in expenses:
+        row = expense.as_row()
+        row["date"] = row["date"] or DateType.today()
+        rows.append(row)
+        key = (row["user_id"], row["date"], row["category"], row["currency"])
+        amount, count = deltas.get(key, (0, 0))
+        deltas[key] = (amount + row["amount_minor"], count + 1)
+    return rows, deltas
+
+def delete_expense(db: Session, expense_id: int, user_id: int) -> bool:
+    """Deletes one of `user_id`'s expenses, backing it out of the rollup and leaving a sync tombstone."""
+    expense = db.scalar(select(Expense).where(Expense.id == expense_id, Expense.user_id == user_id))
+    if expense is None:
+        return False
+    version = bump_data_version(db, user_id)
+    if expense.date is not None:
+        apply_rollup_delta(db, user_id, expense.date, expense.category, expense.currency, -expense.amount_minor, -1)
+    db.add(SyncTombstone(user_id=user_id, entity="expense", row_id=expense.id, change_seq=version))
+    db.delete(expense)
+    db.commit()
+    return True
+
+def _month_start(day: DateType, months_back: int) -> DateType:
+    month_index = day.year * 12 + (day.month - 1) - months_back
+    return DateType(month_index // 12, month_index % 12 + 1, 1)
+
+def analysis_windows(today: DateType, weeks: int, months: int, daily_days: int) -> list[tuple[str, DateType, DateType]]:
+    """
+    Builds the (label, start, end) date windows for analyze_user_expenses.
+    Index 0 is the current (partial) week/month, index 1 the previous one, etc.
+    """
+    windows = []
+    start_of_week = today - timedelta(days=today.weekday())
+    for i in range(weeks):
+        start = start_of_week - timedelta(weeks=i)
+        windows.append((f"w{i}", start, min(start + timedelta(days=6), today)))
+    for i in range(months):
+        start = _month_start(today, i)
+        end = _month_start(today, i - 1) - timedelta(days=1)
+        windows.append((f"m{i}", start, min(end, today)))
+    for i in range(daily_days):
+        day = today - timedelta(days=i)
+        windows.append((f"d{i}", day, day))
+    return windows
+
+def analyze_user_expenses(
+    db: Session,
+    user_id: int,
+    weeks: int = 0,
+    months: int = 0,
+    by_category: bool = False,
+    daily_days: int = 0,
+    currency: Optional[str] = None,
+) -> dict:
+    """
+    Computes every spending window in a single round trip using conditional
+    aggregation (one SUM(CASE ...) column per window, grouped by category)
+    over the daily rollup, so the cost scales with days, not transactions.
+
+    The base keys (this/last week, this/last month, saved_*) are always
+    returned. `weeks` / `months` add N trailing week/month totals,
+    `daily_days` adds per-day buckets for charts and `by_category` adds the
+    per-category split of every window. Totals are in `currency` (the
+    default currency if omitted); other currencies' spend is not mixed in.
+    """
     now = datetime.now().date()
-    start_of_week = now - timedelta(days=now.weekday())
-    start_of_last_week = start_of_week - timedelta(days=7)
-    end_of_last_week = start_of_week - timedelta(days=1)
-    start_of_month = now.replace(day=1)
-    end_of_last_month = start_of_month - timedelta(days=1)
-    start_of_last_month = end_of_last_month.replace(day=1)
-    user_expenses_query = db.query(Expense).filter(Expense.user_id == user_id)
-    def sum_in_range(start_date, end_date):
-        total = user_expenses_query.filter(
-            Expense.date >= start_date,
-            Expense.date <= end_date
-        ).with_entities(func.sum(Expense.amount)).scalar()
-        return total or 0.0
-    this_week_spent = sum_in_range(start_of_week, now)
-    last_week_spent = sum_in_range(start_of_last_week, end_of_last_week)
-    this_month_spent = sum_in_range(start_of_month, now)
-    last_month_spent = sum_in_range(start_of_last_month, end_of_last_month)
+    currency = currency or money.default_currency()
+    windows = analysis_windows(now, max(weeks, 2), max(months, 2), daily_days)
+    rows = db.execute(analysis_stmt(user_id, windows, now, currency)).all()
+    return summarize_analysis(rows, windows, weeks, months, daily_days, by_category, currency)
+
+def analysis_stmt(user_id: int, windows: list[tuple[str, DateType, DateType]], today: DateType, currency: str):
+    earliest = min(start for _, start, _ in windows)
+    columns = [
+        func.sum(case((ExpenseDailyRollup.day.between(start, end), ExpenseDailyRollup.total_minor), else_=0)).label(label)
+        for label, start, end in windows
+    ]
+    return (
+        select(ExpenseDailyRollup.category, *columns)
+        .where(
+            ExpenseDailyRollup.user_id == user_id,
+            ExpenseDailyRollup.currency == currency,
+            ExpenseDailyRollup.day >= earliest,
+            ExpenseDailyRollup.day <= today,
+        )
+        .group_by(ExpenseDailyRollup.category)
+    )
+
+def summarize_analysis(rows, windows, weeks: int, months: int, daily_days: int, by_category: bool, currency: str) -> dict:
+    # One int64 row of minor-unit window sums per category, summed column-wise
+    # for the totals; converted to major units only at the end, so it's exact.
+    labels = [label for label, _, _ in windows]
+    buffer = money.int64_buffer()
+    categories = []
+    for row in rows:
+        values = row._mapping
+        categories.append(row.category)
+        buffer.extend(int(values[label] or 0) for label in labels)
+
+    def major(minor: int) -> float:
+        return float(money.to_major(minor, currency))
+
+    totals = dict(zip(labels, map(major, money.column_sums(buffer, len(labels)))))
+    width = len(labels)
+    by_cat_totals = {
+        category: dict(zip(labels, map(major, buffer[i * width:(i + 1) * width])))
+        for i, category in enumerate(categories)
+    }
+
+    this_week_spent = totals["w0"]
+    last_week_spent = totals["w1"]
+    this_month_spent = totals["m0"]
+    last_month_spent = totals["m1"]
     saved_this_week = max(last_week_spent - this_week_spent, 0)
     saved_this_month = max(last_month_spent - this_month_spent, 0)
-    return {
+    result = {
+        "currency": currency,
         "this_week_spent": this_week_spent,
         "last_week_spent": last_week_spent,
         "this_month_spent": this_month_spent,
@@ -93,6 +399,174 @@ def analyze_user_expenses(db: Session, user_id: int) -> dict:
         "saved_this_week": saved_this_week,
         "saved_this_month": saved_this_month,
     }
+    if weeks:
+        result["weeks"] = [
+            {"start": start, "end": end, "spent": totals[label]}
+            for label, start, end in windows if label[0] == "w" and int(label[1:]) < weeks
+        ]
+    if months:
+        result["months"] = [
+            {"start": start, "end": end, "spent": totals[label]}
+            for label, start, end in windows if label[0] == "m" and int(label[1:]) < months
+        ]
+    if daily_days:
+        result["daily"] = [
+            {"date": start, "spent": totals[label]}
+            for label, start, _ in windows if label[0] == "d"
+        ]
+    if by_category:
+        result["categories"] = {
+            category: {
+                "this_week_spent": cat_totals["w0"],
+                "last_week_spent": cat_totals["w1"],
+                "this_month_spent": cat_totals["m0"],
+                "last_month_spent": cat_totals["m1"],
+            }
+            for category, cat_totals in by_cat_totals.items()
+        }
+    return result
+
+# ----------------------------
+# Expense Rollup
+# ----------------------------
+def apply_rollup_delta(
+    db: Session, user_id: int, day: DateType, category: str, currency: str, amount_minor: int, count: int
+) -> None:
+    """
+    Adds `amount_minor` / `count` to the (user_id, day, category, currency)
+    rollup row inside the caller's transaction. Create, update and delete
+    paths must call this (with negative deltas for removals) before committing.
+    """
+    upsert = rollup_upsert_stmt(db.get_bind().dialect.name, user_id, day, category, currency, amount_minor, count)
+    if upsert is not None:
+        db.execute(upsert)
+        return
+
+    updated = db.execute(rollup_update_stmt(user_id, day, category, currency, amount_minor, count))
+    if updated.rowcount == 0:
+        db.add(ExpenseDailyRollup(
+            user_id=user_id, day=day, category=category, currency=currency, total_minor=amount_minor, count=count
+        ))
+        db.flush()
+
+def apply_rollup_deltas(db: Session, deltas: dict) -> None:
+    """Batch form of apply_rollup_delta for {(user_id, day, category, currency): (amount_minor, count)}."""
+    upsert = rollup_upsert_many_stmt(db.get_bind().dialect.name, deltas)
+    if upsert is not None:
+        db.execute(upsert)
+        return
+    for (user_id, day, category, currency), (amount_minor, count) in deltas.items():
+        apply_rollup_delta(db, user_id, day, category, currency, amount_minor, count)
+
+def rollup_upsert_stmt(
+    dialect: str, user_id: int, day: DateType, category: str, currency: str, amount_minor: int, count: int
+):
+    """INSERT ... ON CONFLICT DO UPDATE for dialects that support it, else None."""
+    return rollup_upsert_many_stmt(dialect, {(user_id, day, category, currency): (amount_minor, count)})
+
+def rollup_upsert_many_stmt(dialect: str, deltas: dict):
+    """Multi-row rollup upsert; each (user_id, day, category, currency) key must appear once."""
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    stmt = insert(ExpenseDailyRollup).values([
+        {
+            "user_id": user_id, "day": day, "category": category, "currency": currency,
+            "total_minor": amount_minor, "count": count,
+        }
+        for (user_id, day, category, currency), (amount_minor, count) in deltas.items()
+    ])
+    return stmt.on_conflict_do_update(
+        index_elements=["user_id", "day", "category", "currency"],
+        set_={
+            "total_minor": ExpenseDailyRollup.total_minor + stmt.excluded.total_minor,
+            "count": ExpenseDailyRollup.count + stmt.excluded.count,
+        },
+    )
+
+def rollup_update_stmt(user_id: int, day: DateType, category: str, currency: str, amount_minor: int, count: int):
+    return (
+        update(ExpenseDailyRollup)
+        .where(
+            ExpenseDailyRollup.user_id == user_id,
+            ExpenseDailyRollup.day == day,
+            ExpenseDailyRollup.category == category,
+            ExpenseDailyRollup.currency == currency,
+        )
+        .values(
+            total_minor=ExpenseDailyRollup.total_minor + amount_minor,
+            count=ExpenseDailyRollup.count + count,
+        )
+    )
+
+def get_category_totals(
+    db: Session, user_id: int, start: DateType, end: DateType, currency: Optional[str] = None
+) -> list[dict]:
+    currency = currency or money.default_currency()
+    rows = db.execute(category_totals_stmt(user_id, start, end, currency)).all()
+    return category_totals(rows, currency)
+
+def category_totals_stmt(user_id: int, start: DateType, end: DateType, currency: str):
+    return (
+        select(
+            ExpenseDailyRollup.category,
+            func.sum(ExpenseDailyRollup.total_minor).label("total"),
+            func.sum(ExpenseDailyRollup.count).label("count"),
+        )
+        .where(
+            ExpenseDailyRollup.user_id == user_id,
+            ExpenseDailyRollup.currency == currency,
+            ExpenseDailyRollup.day.between(start, end),
+        )
+        .group_by(ExpenseDailyRollup.category)
+        .order_by(func.sum(ExpenseDailyRollup.total_minor).desc())
+    )
+
+def category_totals(rows, currency: str) -> list[dict]:
+    return [
+        {"category": r.category, "total": float(money.to_major(r.total, currency)), "count": int(r.count)}
+        for r in rows
+    ]
+
+def get_daily_trend(
+    db: Session, user_id: int, start: DateType, end: DateType, currency: Optional[str] = None
+) -> list[dict]:
+    """Per-day totals from `start` to `end`, with empty days filled in as zero."""
+    currency = currency or money.default_currency()
+    rows = db.execute(daily_trend_stmt(user_id, start, end, currency)).all()
+    return fill_daily_trend(rows, start, end, currency)
+
+def daily_trend_stmt(user_id: int, start: DateType, end: DateType, currency: str):
+    return (
+        select(
+            ExpenseDailyRollup.day,
+            func.sum(ExpenseDailyRollup.total_minor).label("total"),
+            func.sum(ExpenseDailyRollup.count).label("count"),
+        )
+        .where(
+            ExpenseDailyRollup.user_id == user_id,
+            ExpenseDailyRollup.currency == currency,
+            ExpenseDailyRollup.day.between(start, end),
+        )
+        .group_by(ExpenseDailyRollup.day)
+    )
+
+def fill_daily_trend(rows, start: DateType, end: DateType, currency: str) -> list[dict]:
+    by_day = {r.day: r for r in rows}
+    trend = []
+    day = start
+    while day <= end:
+        row = by_day.get(day)
+        trend.append({
+            "date": day,
+            "total": float(money.to_major(row.total, currency)) if row else 0.0,
+            "count": int(row.count) if row else 0,
+        })
+        day += timedelta(days=1)
+    return trend
 
 # ----------------------------
 # SavingGoal CRUD
@@ -100,13 +574,27 @@ def analyze_user_expenses(db: Session, user_id: int) -> dict:
 def get_goals_by_user(db: Session, user_id: int) -> list[SavingGoal]:
     return db.query(SavingGoal).filter(SavingGoal.user_id == user_id).all()
 
+# Everything SavingGoalResponse needs, in the order serialization.goals unpacks them.
+GOAL_COLUMNS = (
+    SavingGoal.id, SavingGoal.user_id, SavingGoal.title,
+    SavingGoal.target_amount_minor, SavingGoal.saved_amount_minor, SavingGoal.currency,
+)
+
+def get_goal_rows(db: Session, user_id: int) -> list[Row]:
+    """A user's goals as GOAL_COLUMNS rows, in the same order as get_goals_by_user."""
+    return list(db.execute(goal_rows_stmt(user_id)))
+
+def goal_rows_stmt(user_id: int):
+    return select(*GOAL_COLUMNS).where(SavingGoal.user_id == user_id)
+
 def get_goal_by_id(db: Session, goal_id: int) -> Optional[SavingGoal]:
     return db.query(SavingGoal).filter(SavingGoal.id == goal_id).first()
 
 def create_saving_goal(db: Session, goal: schemas.SavingGoalCreate) -> SavingGoal:
     new_goal = SavingGoal(
-        **goal.model_dump(),
-        saved_amount=0
+        **goal.as_row(),
+        saved_amount_minor=0,
+        change_seq=bump_data_version(db, goal.user_id)
     )
     db.add(new_goal)
     db.commit()
@@ -114,17 +602,339 @@ def create_saving_goal(db: Session, goal: schemas.SavingGoalCreate) -> SavingGoa
     return new_goal
 
 def update_saving_goal_amount(db: Session, goal_id: int, user_id: int, goal_update: schemas.SavingGoalUpdate) -> Optional[SavingGoal]:
-    goal = db.query(SavingGoal).filter(
+    """
+    Sets the saved amount outright and records the difference in the ledger
+    as an adjustment. Prefer add_goal_contribution, which can't lose a
+    concurrent deposit; the row lock here only keeps the ledger consistent.
+    """
+    version = bump_data_version(db, user_id)
+    goal = db.scalar(select(SavingGoal).where(
         SavingGoal.id == goal_id,
         SavingGoal.user_id == user_id
-    ).first()
+    ).with_for_update())
     if not goal:
+        db.rollback()
         return None
-    goal.saved_amount = goal_update.saved_amount
+    saved = money.to_minor(goal_update.saved_amount, goal.currency)
+    if saved != goal.saved_amount_minor:
+        db.add(adjustment_entry(goal, saved))
+    goal.saved_amount_minor = saved
+    goal.change_seq = version
     db.commit()
     db.refresh(goal)
     return goal
 
+def delete_saving_goal(db: Session, goal_id: int, user_id: int) -> bool:
+    goal = db.scalar(select(SavingGoal).where(SavingGoal.id == goal_id, SavingGoal.user_id == user_id))
+    if goal is None:
+        return False
+    version = bump_data_version(db, user_id)
+    db.add(SyncTombstone(user_id=user_id, entity="goal", row_id=goal.id, change_seq=version))
+    db.delete(goal)
+    db.commit()
+    return True
+
+# ----------------------------
+# Goal contributions
+# ----------------------------
+def add_goal_contribution(
+    db: Session,
+    goal_id: int,
+    user_id: int,
+    contribution: schemas.GoalContributionCreate,
+    idempotency_key: Optional[str] = None,
+) -> tuple[Optional[GoalContribution], bool]:
+    """
+    Adds `contribution` to the goal's saved amount with one UPDATE (no read,
+    so concurrent deposits can't overwrite each other) and appends it to the
+    ledger. Returns (entry, replayed): a retry with an `idempotency_key` that
+    already committed returns the original entry without applying it again.
+    (None, False) if the user has no such goal. Raises ValueError for a
+    currency mismatch, an overdrawn withdrawal or a reused key.
+    """
+    amount_minor = money.to_minor(contribution.amount, contribution.currency)
+    # The version bump comes first so it takes the user's row lock before any read.
+    version = bump_data_version(db, user_id)
+    if idempotency_key is not None:
+        existing = db.scalar(contribution_by_key_stmt(user_id, idempotency_key))
+        if existing is not None:
+            db.expunge(existing)  # keeps its loaded state through the rollback
+            db.rollback()
+            return check_replay(existing, goal_id, amount_minor, contribution.currency), True
+    saved_after = db.scalar(goal_increment_stmt(goal_id, user_id, contribution.currency, amount_minor, version))
+    if saved_after is None:
+        db.rollback()
+        return explain_refused_contribution(get_goal_by_id(db, goal_id), user_id, contribution.currency), False
+    entry = contribution_entry(goal_id, user_id, contribution, amount_minor, saved_after, idempotency_key)
+    db.add(entry)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        if idempotency_key is None:
+            raise
+        # A retry with the same key committed in between; it holds the deposit.
+        existing = db.scalar(contribution_by_key_stmt(user_id, idempotency_key))
+        if existing is None:
+            raise
+        return check_replay(existing, goal_id, amount_minor, contribution.currency), True
+    db.commit()
+    return entry, False
+
+def goal_increment_stmt(goal_id: int, user_id: int, currency: str, amount_minor: int, version: int):
+    """saved += amount in SQL, refused (no row returned) if the goal would go below zero."""
+    return (
+        update(SavingGoal)
+        .where(
+            SavingGoal.id == goal_id,
+            SavingGoal.user_id == user_id,
+            SavingGoal.currency == currency,
+            SavingGoal.saved_amount_minor + amount_minor >= 0,
+        )
+        .values(saved_amount_minor=SavingGoal.saved_amount_minor + amount_minor, change_seq=version)
+        .returning(SavingGoal.saved_amount_minor)
+        .execution_options(synchronize_session=False)
+    )
+
+def contribution_by_key_stmt(user_id: int, idempotency_key: str):
+    return select(GoalContribution).where(
+        GoalContribution.user_id == user_id, GoalContribution.idempotency_key == idempotency_key
+    )
+
+def contribution_entry(
+    goal_id: int,
+    user_id: int,
+    contribution: schemas.GoalContributionCreate,
+    amount_minor: int,
+    saved_after: int,
+    idempotency_key: Optional[str],
+) -> GoalContribution:
+    return GoalContribution(
+        goal_id=goal_id, user_id=user_id, kind="contribution",
+        amount_minor=amount_minor, currency=contribution.currency, saved_after_minor=saved_after,
+        note=contribution.note, idempotency_key=idempotency_key, created_at=datetime.now(timezone.utc),
+    )
+
+def adjustment_entry(goal: SavingGoal, saved: int) -> GoalContribution:
+    return GoalContribution(
+        goal_id=goal.id, user_id=goal.user_id, kind="adjustment",
+        amount_minor=saved - goal.saved_amount_minor, currency=goal.currency, saved_after_minor=saved,
+        created_at=datetime.now(timezone.utc),
+    )
+
+def check_replay(existing: GoalContribution, goal_id: int, amount_minor: int, currency: str) -> GoalContribution:
+    if (existing.goal_id, existing.amount_minor, existing.currency) != (goal_id, amount_minor, currency):
+        raise ValueError("Idempotency-Key was already used for a different contribution")
+    return existing
+
+def explain_refused_contribution(goal: Optional[SavingGoal], user_id: int, currency: str) -> None:
+    """Why goal_increment_stmt matched no row: None for a missing goal, otherwise ValueError."""
+    if goal is None or goal.user_id != user_id:
+        return None
+    if goal.currency != currency:
+        raise ValueError(f"This goal is saved in {goal.currency}")
+    raise ValueError("Withdrawal is larger than the saved amount")
+
+def get_goal_contributions(
+    db: Session, goal_id: int, user_id: int, limit: int, after: Optional[int] = None
+) -> list[GoalContribution]:
+    """A goal's ledger, newest first; `after` is the id of the last entry of the previous page."""
+    return list(db.scalars(goal_contributions_stmt(goal_id, user_id, limit, after)))
+
+def goal_contributions_stmt(goal_id: int, user_id: int, limit: int, after: Optional[int] = None):
+    stmt = select(GoalContribution).where(GoalContribution.goal_id == goal_id, GoalContribution.user_id == user_id)
+    if after is not None:
+        stmt = stmt.where(GoalContribution.id < after)
+    return stmt.order_by(GoalContribution.id.desc()).limit(limit)
+
+def get_goal_progress(db: Session, goal_id: int, user_id: int, months: int = 12) -> Optional[dict]:
+    """Saved vs target plus monthly contributions from the ledger (see summarize_goal_progress)."""
+    goal = db.scalar(select(SavingGoal).where(SavingGoal.id == goal_id, SavingGoal.user_id == user_id))
+    if goal is None:
+        return None
+    today = DateType.today()
+    rows = db.execute(contribution_months_stmt(goal_id, today, months)).all()
+    return summarize_goal_progress(goal, rows, today, months)
+
+def contribution_months_stmt(goal_id: int, today: DateType, months: int):
+    """Contribution totals for the last `months` calendar months (UTC); adjustments aren't counted."""
+    start = datetime.combine(_month_start(today, months - 1), time.min, timezone.utc)
+    year = extract("year", GoalContribution.created_at)
+    month = extract("month", GoalContribution.created_at)
+    return (
+        select(
+            year.label("year"), month.label("month"),
+            func.sum(GoalContribution.amount_minor).label("total_minor"), func.count().label("count"),
+        )
+        .where(
+            GoalContribution.goal_id == goal_id,
+            GoalContribution.kind == "contribution",
+            GoalContribution.created_at >= start,
+        )
+        .group_by(year, month)
+    )
+
+def summarize_goal_progress(goal: SavingGoal, rows, today: DateType, months: int) -> dict:
+    def major(minor: int) -> float:
+        return float(money.to_major(minor, goal.currency))
+
+    by_month = {(int(row.year), int(row.month)): row for row in rows}
+    series, total = [], 0
+    for back in range(months - 1, -1, -1):
+        start = _month_start(today, back)
+        row = by_month.get((start.year, start.month))
+        minor = int(row.total_minor) if row else 0
+        total += minor
+        series.append({"month": start.strftime("%Y-%m"), "contributed": major(minor), "count": row.count if row else 0})
+
+    remaining = max(goal.target_amount_minor - goal.saved_amount_minor, 0)
+    average = total / months
+    projected = None
+    if remaining == 0:
+        projected = today.strftime("%Y-%m")
+    elif average > 0:
+        projected = _month_start(today, -math.ceil(remaining / average)).strftime("%Y-%m")
+    return {
+        "goal_id": goal.id,
+        "currency": goal.currency,
+        "target_amount": major(goal.target_amount_minor),
+        "saved_amount": major(goal.saved_amount_minor),
+        "remaining": major(remaining),
+        "percent": round(100 * goal.saved_amount_minor / goal.target_amount_minor, 2) if goal.target_amount_minor else 100.0,
+        "months": series,
+        "average_monthly": major(round(average)),
+        "projected_completion": projected,
+    }
+
+# ----------------------------
+# Chatbot insights
+# ----------------------------
+def get_insight_source(db: Session, user_id: int, currency: str, months_from: DateType, days_from: DateType) -> tuple[list, list]:
+    """
+    The two scans ai.insights builds a model from: per-day, per-category
+    rollup totals since `months_from`, and individual expenses since `days_from`.
+    """
+    rollup_rows = db.execute(insight_rollup_stmt(user_id, currency, months_from)).all()
+    expense_rows = db.execute(insight_expenses_stmt(user_id, currency, days_from)).all()
+    return rollup_rows, expense_rows
+
+def insight_rollup_stmt(user_id: int, currency: str, start: DateType):
+    return select(
+        ExpenseDailyRollup.day, ExpenseDailyRollup.category, ExpenseDailyRollup.total_minor,
+    ).where(
+        ExpenseDailyRollup.user_id == user_id,
+        ExpenseDailyRollup.currency == currency,
+        ExpenseDailyRollup.day >= start,
+    )
+
+def insight_expenses_stmt(user_id: int, currency: str, start: DateType):
+    return select(
+        Expense.id, Expense.date, Expense.category, Expense.amount_minor, Expense.description,
+    ).where(
+        Expense.user_id == user_id,
+        Expense.date >= start,
+        Expense.currency == currency,
+    )
+
+# ----------------------------
+# Background jobs
+# ----------------------------
+ACTIVE_JOB_STATUSES = ("queued", "running")
+
+def update_job_progress(db: Session, job_id: int, attempt: int, progress: float, message: Optional[str], lease_until: datetime) -> None:
+    """Records progress and extends the lease; called from job worker processes."""
+    db.execute(job_progress_stmt(job_id, attempt, progress, message, lease_until))
+    db.commit()
+
+def job_progress_stmt(job_id: int, attempt: int, progress: float, message: Optional[str], lease_until: datetime):
+    return (
+        update(Job)
+        .where(Job.id == job_id, Job.attempts == attempt, Job.status == "running")
+        .values(progress=progress, message=message, lease_expires_at=lease_until)
+    )
+
+def active_jobs_count_stmt(user_id: int):
+    return select(func.count(Job.id)).where(Job.user_id == user_id, Job.status.in_(ACTIVE_JOB_STATUSES))
+
+def user_jobs_stmt(user_id: int, limit: int):
+    return select(Job).where(Job.user_id == user_id).order_by(Job.id.desc()).limit(limit)
+
+def _claimable(now: datetime):
+    return or_(
+        and_(Job.status == "queued", Job.run_after <= now),
+        # Its worker died or hung past the lease.
+        and_(Job.status == "running", Job.lease_expires_at < now),
+    )
+
+def due_jobs_stmt(now: datetime, limit: int):
+    return select(Job.id).where(_claimable(now)).order_by(Job.run_after, Job.id).limit(limit)
+
+def claim_job_stmt(job_id: int, now: datetime, lease_until: datetime):
+    """Conditional UPDATE, so of several runners racing for a job exactly one sees rowcount 1."""
+    return (
+        update(Job)
+        .where(Job.id == job_id, _claimable(now))
+        .values(
+            status="running",
+            attempts=Job.attempts + 1,
+            started_at=now,
+            lease_expires_at=lease_until,
+            progress=0.0,
+            message=None,
+        )
+    )
+
+def finish_job_stmt(job_id: int, attempt: int, **values):
+    """Applies only while `attempt` still owns the job (its lease wasn't taken over)."""
+    return update(Job).where(Job.id == job_id, Job.attempts == attempt, Job.status == "running").values(**values)
+
+# ----------------------------
+# Delta sync
+# ----------------------------
+def get_changes(db: Session, user_id: int, since: Optional[int]) -> dict:
+    """
+    Everything that changed for `user_id` after version `since`: created or
+    updated expenses / goals plus tombstones for deleted ones. `since=None`
+    returns the full state, archived expenses included (archiving changes
+    nothing a client has). `token` is the version to pass as the next `since`.
+    """
+    # Read the version first: any row stamped with a version <= token has committed.
+    token = get_data_version(db, user_id)
+    expenses = list(db.scalars(changed_expenses_stmt(user_id, since)))
+    if since is None:
+        expenses = with_archived(db.execute(archive.segments_stmt(user_id)).all(), expenses)
+    return {
+        "token": token,
+        "expenses": expenses,
+        "goals": list(db.scalars(changed_goals_stmt(user_id, since))),
+        "deleted": list(db.scalars(tombstones_stmt(user_id, since))) if since is not None else [],
+    }
+
+def with_archived(segments: list, expenses: list[Expense]) -> list[Expense]:
+    """`expenses` (in change_seq, id order) merged with the archived rows in `segments`."""
+    return list(heapq.merge(
+        archive.change_ordered(segments), expenses, key=lambda expense: (expense.change_seq, expense.id)
+    ))
+
+def changed_expenses_stmt(user_id: int, since: Optional[int]):
+    stmt = select(Expense).where(Expense.user_id == user_id)
+    if since is not None:
+        stmt = stmt.where(Expense.change_seq > since)
+    return stmt.order_by(Expense.change_seq, Expense.id)
+
+def changed_goals_stmt(user_id: int, since: Optional[int]):
+    stmt = select(SavingGoal).where(SavingGoal.user_id == user_id)
+    if since is not None:
+        stmt = stmt.where(SavingGoal.change_seq > since)
+    return stmt.order_by(SavingGoal.change_seq, SavingGoal.id)
+
+def tombstones_stmt(user_id: int, since: int):
+    return (
+        select(SyncTombstone)
+        .where(SyncTombstone.user_id == user_id, SyncTombstone.change_seq > since)
+        .order_by(SyncTombstone.change_seq, SyncTombstone.id)
+    )
+
 def verify_user_details(db: Session, details: schemas.UserVerifyRequest) -> Optional[User]:
     """
     Finds a user only if email, name, AND date_of_birth match.
@@ -144,6 +954,7 @@ def update_user_password_by_email(db: Session, email: str, new_password: str) ->
     if user:
         user.password = hash_password(new_password)
         db.commit()
+        cache.user_cache.invalidate(email)
         db.refresh(user)
         return user
     return None
\ No newline at end of file
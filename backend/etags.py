@@ -0,0 +1,92 @@
+# backend/etags.py
+"""
+Conditional GET (ETag / If-None-Match) for per-user data.
+
+Every expense or goal write bumps `users.data_version` in the same
+transaction (crud.bump_data_version). A response's strong ETag hashes the
+user id, that version, the request path and query, and an optional scope,
+such as today's date for date-relative results. This gives three outcomes:
+
+* If-None-Match matches the current ETag: 304, after one primary-key lookup.
+* Another request already built the response: its bytes come from
+  `cache.result_cache`, which every worker shares when Redis is used.
+* Otherwise the route's builder runs, and its output is cached under the ETag.
+
+Routes that negotiate their encoding (see serialization.py) get one ETag,
+and one cache entry, per representation, as HTTP requires of strong ETags.
+
+Cached entries are never deleted explicitly. Bumping the version changes
+every ETag for that user, so old entries are never looked up again.
+"""
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Optional
+from fastapi import Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+import async_crud
+import cache
+import serialization
+
+# Clients must revalidate before reuse; shared proxies must not store per-user data.
+CACHE_CONTROL = "private, no-cache"
+
+Builder = Callable[[], Awaitable[tuple[Any, dict]]]
+
+
+def make_etag(user_id: int, version: int, request: Request, scope: str = "") -> str:
+    query = "&".join(sorted(request.url.query.split("&"))) if request.url.query else ""
+    raw = f"{user_id}:{version}:{request.url.path}?{query}:{scope}"
+    return '"' + hashlib.blake2b(raw.encode(), digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses the weak comparison, so a W/ prefix is ignored."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def _pack(body: bytes, headers: dict) -> bytes:
+    return json.dumps(headers).encode() + b"\n" + body
+
+
+def _unpack(value: bytes) -> tuple[bytes, dict]:
+    headers, body = value.split(b"\n", 1)
+    return body, json.loads(headers)
+
+
+async def conditional_response(
+    request: Request,
+    db: AsyncSession,
+    user_id: int,
+    build: Builder,
+    scope: str = "",
+    negotiate: bool = False,
+) -> Response:
+    """
+    Serves `build()` (JSON body bytes plus extra headers) for `user_id`. The
+    response is a 304 or a cached copy when the user's data hasn't changed.
+    With `negotiate`, `build()` returns JSON-ready data instead of bytes,
+    encoded as the request's Accept / Accept-Encoding prefer.
+    """
+    representation = serialization.negotiate(request) if negotiate else None
+    if representation is not None:
+        scope = f"{scope}:{representation.key}"
+    version = await async_crud.get_data_version(db, user_id)
+    etag = make_etag(user_id, version, request, scope)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if representation is not None:
+        headers["Vary"] = serialization.VARY
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    cached = cache.result_cache.get(etag)
+    if cached is not None:
+        body, extra = _unpack(cached)
+    else:
+        body, extra = await build()
+        if representation is not None:
+            body, extra = serialization.render(body, representation, extra)
+        cache.result_cache.set(etag, _pack(body, extra))
+    return Response(content=body, media_type="application/json", headers={**extra, **headers})
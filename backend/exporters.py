@@ -0,0 +1,138 @@
+# backend/exporters.py
+"""
+Encoders for `GET /expenses/export` (CSV, NDJSON and Parquet).
+
+Each encoder reads an async iterator of row batches (lists of the dicts
+`async_crud.iter_expenses_by_user` yields) and yields bytes, so an export
+never holds more than one batch in memory. `gzip_stream` compresses any of
+them on the fly.
+
+CSV exports use the same columns `importers.iter_csv_rows` reads, so an
+export can be re-imported through POST /expenses/bulk.
+"""
+import csv
+import io
+import zlib
+from typing import AsyncIterator
+import money
+import schemas
+
+BATCH_SIZE = 1000
+CSV_COLUMNS = ("id", "date", "category", "amount", "currency", "description")
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+async def batches(rows: AsyncIterator[dict], size: int = BATCH_SIZE) -> AsyncIterator[list[dict]]:
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def csv_stream(chunks: AsyncIterator[list[dict]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    async for batch in chunks:
+        writer.writerows(
+            (row["id"], row["date"], row["category"], money.to_major(row["amount_minor"], row["currency"]),
+             row["currency"], row["description"] or "")
+            for row in batch
+        )
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def ndjson_stream(chunks: AsyncIterator[list[dict]]) -> AsyncIterator[bytes]:
+    async for batch in chunks:
+        yield "".join(
+            schemas.ExpenseResponse.model_validate(row).model_dump_json() + "\n" for row in batch
+        ).encode("utf-8")
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _ChunkSink:
+    """Write-only file object for ParquetWriter; `drain` hands back what was written since the last call."""
+
+    def __init__(self):
+        self.chunks: list[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+async def parquet_stream(chunks: AsyncIterator[list[dict]]) -> AsyncIterator[bytes]:
+    """One row group per batch. Needs pyarrow (check `parquet_available` first)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("date", pa.date32()),
+        ("category", pa.string()),
+        ("amount", pa.float64()),
+        ("amount_minor", pa.int64()),
+        ("currency", pa.string()),
+        ("description", pa.string()),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd")
+    try:
+        async for batch in chunks:
+            columns = {name: [row.get(name) for row in batch] for name in schema.names if name != "amount"}
+            columns["amount"] = [float(money.to_major(row["amount_minor"], row["currency"])) for row in batch]
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {"csv": csv_stream, "ndjson": ndjson_stream, "parquet": parquet_stream}
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
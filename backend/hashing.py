@@ -0,0 +1,110 @@
+# backend/hashing.py
+"""
+bcrypt hashing / verification on a bounded process pool.
+
+Each bcrypt call burns 100-300 ms of CPU. Running it in the request thread
+(or on the event loop) starves every other request during login storms, so
+the async routes hand it to `hash_workers` processes instead. At most
+`hash_workers + hash_queue_size` jobs may be in flight; beyond that callers
+get a 503 immediately rather than queueing without bound.
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from fastapi import HTTPException
+from config import Settings, get_settings
+
+_contexts: dict = {}  # rounds -> passlib CryptContext
+
+
+def make_context(rounds: int):
+    """
+    bcrypt context with `rounds` as both the default and the minimum cost, so
+    `needs_update` flags hashes made with a lower (older) cost factor.
+    passlib is imported here, on first use, rather than when the app loads.
+    """
+    if rounds not in _contexts:
+        from passlib.context import CryptContext
+        _contexts[rounds] = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__rounds=rounds,
+            bcrypt__min_rounds=rounds,
+        )
+    return _contexts[rounds]
+
+
+# Worker-side functions: top level so they pickle into the pool processes.
+def _hash(password: str, rounds: int) -> str:
+    return make_context(rounds).hash(password)
+
+
+def _verify(password: str, hashed_password: str, rounds: int) -> tuple[bool, Optional[str]]:
+    """Returns (matches, replacement hash if the stored one is outdated)."""
+    try:
+        return make_context(rounds).verify_and_update(password, hashed_password)
+    except Exception:
+        return False, None
+
+
+class PasswordHasher:
+    def __init__(self, rounds: int, workers: int, queue_size: int):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_in_flight = workers + queue_size
+        self.in_flight = 0
+        self.rejected = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def _submit(self, fn, *args):
+        if self.workers == 0:
+            return fn(*args)
+        if self.in_flight >= self.max_in_flight:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Too many authentication requests, please retry",
+                headers={"Retry-After": "1"},
+            )
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), fn, *args)
+        finally:
+            self.in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password, self.rounds)
+
+    async def verify(self, password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        return await self._submit(_verify, password, hashed_password, self.rounds)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_hasher: Optional[PasswordHasher] = None
+
+
+def init_hasher(settings: Settings) -> None:
+    """
+    Replaces `hashing.hasher` with one built from `settings` (main.create_app
+    calls this). The previous hasher's pool is not shut down.
+    """
+    global _hasher
+    _hasher = PasswordHasher(settings.bcrypt_rounds, settings.hash_workers, settings.hash_queue_size)
+
+
+def __getattr__(name: str):
+    # `hashing.hasher` is built from get_settings() on first access unless init_hasher ran.
+    if name == "hasher":
+        if _hasher is None:
+            init_hasher(get_settings())
+        return _hasher
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
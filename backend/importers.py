@@ -0,0 +1,190 @@
+# backend/importers.py
+"""
+Row parsers for bulk expense imports (JSON arrays, CSV and OFX statements).
+
+Parsers read from a binary file object one row at a time and yield
+`(row_number, raw_dict)` pairs, so an upload is never held in memory as a
+whole list. `to_expense` validates a raw row against `schemas.ExpenseCreate`.
+"""
+import csv
+import io
+import json
+import re
+from itertools import islice
+from typing import BinaryIO, Iterator, Optional
+from pydantic import ValidationError
+import schemas
+
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+DEFAULT_CATEGORY = "Other"
+
+FORMATS = {
+    "application/json": "json",
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ofx": "ofx",
+    "application/ofx": "ofx",
+    "text/ofx": "ofx",
+}
+
+
+def detect_format(content_type: Optional[str]) -> Optional[str]:
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return FORMATS.get(media_type)
+
+
+_JSON_CHUNK = 64 * 1024
+_JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def iter_json_rows(fileobj: BinaryIO) -> Iterator[tuple[int, dict]]:
+    """
+    Decodes the top-level array one element at a time with `raw_decode`, so
+    only the element being parsed (plus one read chunk) is held in memory.
+    """
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig")
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+
+    def fill() -> bool:
+        nonlocal buffer, pos, eof
+        chunk = text.read(_JSON_CHUNK)
+        buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+        return bool(chunk)
+
+    def skip_whitespace() -> str:
+        nonlocal pos
+        while True:
+            pos = _JSON_WHITESPACE.match(buffer, pos).end()
+            if pos < len(buffer) or not fill():
+                return buffer[pos:pos + 1]
+
+    if skip_whitespace() != "[":
+        raise ValueError("JSON body must be an array of expenses")
+    pos += 1
+    number = 0
+    if skip_whitespace() == "]":
+        pos += 1
+    else:
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            # A number cut by the chunk boundary ("12" of "12.5e3") decodes
+            # cleanly, so only accept an element once its delimiter is read.
+            after = _JSON_WHITESPACE.match(buffer, end).end()
+            if not eof and (after == len(buffer) or buffer[after] not in ",]"):
+                fill()
+                continue
+            pos = end
+            number += 1
+            yield number, item
+            separator = skip_whitespace()
+            if separator == "]":
+                pos += 1
+                break
+            if separator != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+            pos += 1
+            skip_whitespace()
+    if skip_whitespace():
+        raise json.JSONDecodeError("Extra data", buffer, pos)
+
+
+def iter_csv_rows(fileobj: BinaryIO) -> Iterator[tuple[int, dict]]:
+    """CSV with a header row; column names are matched case-insensitively."""
+    reader = csv.DictReader(io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline=""))
+    if reader.fieldnames is None:
+        return
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+    for number, row in enumerate(reader, start=1):
+        yield number, {key: value for key, value in row.items() if key and value not in (None, "")}
+
+
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+def iter_ofx_rows(fileobj: BinaryIO, default_category: str = DEFAULT_CATEGORY) -> Iterator[tuple[int, dict]]:
+    """
+    Yields one row per <STMTTRN>. Works for SGML (OFX 1.x, unclosed leaf tags)
+    and XML (OFX 2.x) statements. Debits become positive expense amounts;
+    credits are passed through with their sign and rejected by `to_expense`.
+    """
+    text = io.TextIOWrapper(fileobj, encoding="utf-8", errors="replace")
+    number, current, pending, currency = 0, None, "", None
+    while True:
+        chunk = text.read(64 * 1024)
+        data = pending + chunk
+        # Keep a possibly incomplete trailing tag for the next chunk.
+        cut = max(data.rfind("<"), 0) if chunk else len(data)
+        pending, data = data[cut:], data[:cut]
+        for closing, tag, value in _OFX_TAG.findall(data):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                if closing and current is not None:
+                    number += 1
+                    yield number, _ofx_to_row(current, default_category, currency)
+                    current = None
+                elif not closing:
+                    current = {}
+            elif tag == "CURDEF" and not closing and value.strip():
+                currency = value.strip()  # the statement's currency, declared before its transactions
+            elif current is not None and not closing and value.strip():
+                current[tag] = value.strip()
+        if not chunk:
+            break
+
+
+def _ofx_to_row(fields: dict, default_category: str, currency: Optional[str] = None) -> dict:
+    # Values stay strings so bad ones surface as per-row validation errors.
+    row = {"category": default_category}
+    if currency:
+        row["currency"] = currency
+    if "TRNAMT" in fields:
+        amount = fields["TRNAMT"]
+        row["amount"] = amount[1:] if amount.startswith("-") else "-" + amount.lstrip("+")
+    if "DTPOSTED" in fields:
+        posted = fields["DTPOSTED"]
+        row["date"] = f"{posted[:4]}-{posted[4:6]}-{posted[6:8]}"
+    description = " - ".join(fields[key] for key in ("NAME", "MEMO") if key in fields)
+    if description:
+        row["description"] = description
+    return row
+
+
+def to_expense(raw: dict, user_id: int) -> schemas.ExpenseCreate:
+    """Validates one imported row for `user_id`; raises ValueError with a readable message."""
+    if not isinstance(raw, dict):
+        raise ValueError("row must be an object")
+    if raw.get("user_id") not in (None, "", user_id, str(user_id)):
+        raise ValueError("user_id does not match the authenticated user")
+    try:
+        expense = schemas.ExpenseCreate.model_validate({**raw, "user_id": user_id})
+    except ValidationError as e:
+        raise ValueError("; ".join(
+            f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" if err["loc"] else err["msg"]
+            for err in e.errors()
+        ))
+    if expense.amount < 0:
+        raise ValueError("amount must not be negative (credits are not expenses)")
+    return expense
+
+
+def next_batch(rows: Iterator[tuple[int, dict]], user_id: int, size: int = BATCH_SIZE):
+    """
+    Parses and validates up to `size` rows. Returns (valid expenses, row
+    errors, rows consumed); zero rows consumed means the input is exhausted.
+    """
+    valid, errors = [], []
+    batch = list(islice(rows, size))
+    for number, raw in batch:
+        try:
+            valid.append(to_expense(raw, user_id))
+        except ValueError as e:
+            errors.append(schemas.BulkRowError(row=number, error=str(e)))
+    return valid, errors, len(batch)
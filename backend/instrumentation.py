@@ -0,0 +1,343 @@
+# backend/instrumentation.py
+"""
+Request-level performance instrumentation.
+
+- `TimingMiddleware` records a latency histogram per (method, route, status)
+  and, per route, how many queries a request ran and how long it spent in
+  the database. A handler with an N+1 shows up as a fat query-count tail.
+- `install_query_hooks` attaches SQLAlchemy cursor events to an engine that
+  feed the per-request counters (through a context variable) and log
+  statements slower than `slow_query_ms` to the "slow_queries" logger,
+  with their parameters unless `slow_query_log_params` is off.
+- With `profiling_enabled`, a request with `?profile=1` (or an `X-Profile: 1`
+  header) is run under a stack-sampling profiler. Its response is replaced
+  by the samples in collapsed-stack format (flamegraph.pl / speedscope).
+
+`render_prometheus` formats all of it for GET /metrics.
+"""
+import logging
+import math
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+from typing import Iterable, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from config import Settings
+
+logger = logging.getLogger("slow_queries")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+MAX_LOGGED_PARAMS = 1000  # characters of repr(parameters) kept in a slow-query log line
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense (le = upper bound, inclusive)."""
+
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestStats:
+    """What one request did in the database; reached through `current_request`."""
+
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+class Registry:
+    """Process-wide request and query metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency: dict[tuple, Histogram] = {}     # (method, route, status)
+        self.db_queries: dict[str, Histogram] = {}    # route
+        self.db_seconds: dict[str, Histogram] = {}    # route
+        self.in_progress = 0
+        self.queries_total = 0
+        self.query_seconds_total = 0.0
+        self.slow_queries_total = 0
+        self.profiled_requests = 0
+
+    def record_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        with self._lock:
+            key = (method, route, str(status))
+            if key not in self.latency:
+                self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.db_queries.setdefault(route, Histogram(QUERY_COUNT_BUCKETS))
+                self.db_seconds.setdefault(route, Histogram(LATENCY_BUCKETS))
+            self.latency[key].observe(seconds)
+            self.db_queries[route].observe(stats.queries)
+            self.db_seconds[route].observe(stats.db_seconds)
+
+    def record_query(self, seconds: float, slow: bool) -> None:
+        with self._lock:
+            self.queries_total += 1
+            self.query_seconds_total += seconds
+            self.slow_queries_total += slow
+
+
+metrics = Registry()
+
+
+# ---- SQLAlchemy hooks ----
+def install_query_hooks(sync_engine: Engine, settings: Settings) -> None:
+    slow_seconds = settings.slow_query_ms / 1000
+    log_params = settings.slow_query_log_params
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        slow = 0 < slow_seconds <= elapsed
+        metrics.record_query(elapsed, slow)
+        stats = current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+        if slow:
+            params = repr(parameters) if log_params else "(not logged)"
+            if len(params) > MAX_LOGGED_PARAMS:
+                params = params[:MAX_LOGGED_PARAMS] + "..."
+            logger.warning(
+                "slow query (%.1f ms)%s: %s | params: %s",
+                elapsed * 1000, " [executemany]" if executemany else "", " ".join(statement.split()), params,
+            )
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _drop_timer(exception_context):
+        started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+        if started:
+            started.pop()
+
+
+# ---- sampling profiler ----
+class SamplingProfiler:
+    """
+    Samples one thread's Python stack every `interval` seconds from a helper
+    thread. For an async request that is the event loop thread, so samples
+    from requests running concurrently on the same loop are included too.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def _profile_requested(scope) -> bool:
+    query = scope.get("query_string", b"").decode("latin-1")
+    if any(part in ("profile=1", "profile=true") for part in query.split("&")):
+        return True
+    return dict(scope.get("headers") or ()).get(b"x-profile", b"").lower() in (b"1", b"true")
+
+
+# ---- middleware ----
+class TimingMiddleware:
+    """Pure ASGI middleware, so streaming responses are timed until their last byte."""
+
+    def __init__(self, app, settings: Settings):
+        self.app = app
+        self.profiling_enabled = settings.profiling_enabled
+        self.profile_interval = settings.profile_interval_ms / 1000
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if self.profiling_enabled and _profile_requested(scope):
+            await self._profiled(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((
+                    b"server-timing",
+                    f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries", '
+                    f"app;dur={(time.perf_counter() - started) * 1000:.1f}".encode(),
+                ))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        metrics.in_progress += 1
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            metrics.in_progress -= 1
+            current_request.reset(token)
+            route = scope.get("route")
+            metrics.record_request(
+                scope["method"], getattr(route, "path", "unmatched"), status, time.perf_counter() - started, stats
+            )
+
+    async def _profiled(self, scope, receive, send):
+        """Runs the request under the profiler and answers with the samples instead of its response."""
+        profiler = SamplingProfiler(threading.get_ident(), self.profile_interval)
+        status = 500
+
+        async def swallow(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, swallow)
+        finally:
+            profiler.stop()
+        metrics.profiled_requests += 1
+        body = (
+            f"# {scope['method']} {scope['path']} -> {status} in {(time.perf_counter() - started) * 1000:.1f} ms, "
+            f"{sum(profiler.samples.values())} samples every {self.profile_interval * 1000:g} ms\n"
+            + profiler.collapsed()
+        ).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/plain; charset=utf-8"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# ---- Prometheus text format ----
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}" if labels else ""
+
+
+def _number(value) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _histogram_lines(name: str, histogram: Histogram, labels: dict) -> list[str]:
+    lines, cumulative = [], 0
+    for bound, count in zip(histogram.buckets + (math.inf,), histogram.counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{_labels(**labels, le=_number(float(bound)))} {cumulative}")
+    lines.append(f"{name}_sum{_labels(**labels)} {_number(histogram.sum)}")
+    lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+    return lines
+
+
+def _gauges(prefix: str, groups: dict[str, dict], label: str) -> list[str]:
+    """One gauge per numeric stat, e.g. `finance_cache_hits{cache="users"}`."""
+    lines = []
+    names = sorted({key for stats in groups.values() for key, value in stats.items() if isinstance(value, (int, float))})
+    for key in names:
+        lines.append(f"# TYPE {prefix}_{key} gauge")
+        for group, stats in groups.items():
+            if isinstance(stats.get(key), (int, float)):
+                lines.append(f"{prefix}_{key}{_labels(**{label: group})} {_number(stats[key])}")
+    return lines
+
+
+def render_prometheus(extra_gauges: Iterable[tuple[str, dict[str, dict], str]] = ()) -> str:
+    """
+    The request/query metrics in Prometheus text format (version 0.0.4).
+    `extra_gauges` are (metric prefix, {label value: stats dict}, label name)
+    triples, such as the pool and cache stats from /metrics/pool and /metrics/cache.
+    """
+    with metrics._lock:
+        latency = {key: _copy(h) for key, h in metrics.latency.items()}
+        db_queries = {key: _copy(h) for key, h in metrics.db_queries.items()}
+        db_seconds = {key: _copy(h) for key, h in metrics.db_seconds.items()}
+        totals = (metrics.queries_total, metrics.query_seconds_total, metrics.slow_queries_total)
+
+    lines = [
+        "# HELP http_request_duration_seconds Time from request start to the last response byte.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for (method, route, status), histogram in sorted(latency.items()):
+        lines += _histogram_lines("http_request_duration_seconds", histogram, dict(method=method, route=route, status=status))
+    lines += ["# HELP http_requests_in_progress Requests being handled right now.",
+              "# TYPE http_requests_in_progress gauge",
+              f"http_requests_in_progress {metrics.in_progress}",
+              "# HELP http_request_db_queries Queries run per request.",
+              "# TYPE http_request_db_queries histogram"]
+    for route, histogram in sorted(db_queries.items()):
+        lines += _histogram_lines("http_request_db_queries", histogram, dict(route=route))
+    lines += ["# HELP http_request_db_seconds Time spent executing queries per request.",
+              "# TYPE http_request_db_seconds histogram"]
+    for route, histogram in sorted(db_seconds.items()):
+        lines += _histogram_lines("http_request_db_seconds", histogram, dict(route=route))
+    lines += [
+        "# HELP db_queries_total Queries executed by this process, in requests or not.",
+        "# TYPE db_queries_total counter",
+        f"db_queries_total {totals[0]}",
+        "# TYPE db_query_seconds_total counter",
+        f"db_query_seconds_total {_number(totals[1])}",
+        "# HELP db_slow_queries_total Queries at or above SLOW_QUERY_MS.",
+        "# TYPE db_slow_queries_total counter",
+        f"db_slow_queries_total {totals[2]}",
+        "# TYPE http_profiled_requests_total counter",
+        f"http_profiled_requests_total {metrics.profiled_requests}",
+    ]
+    for prefix, groups, label in extra_gauges:
+        lines += _gauges(prefix, groups, label)
+    return "\n".join(lines) + "\n"
+
+
+def _copy(histogram: Histogram) -> Histogram:
+    snapshot = Histogram(histogram.buckets)
+    snapshot.counts, snapshot.sum, snapshot.count = list(histogram.counts), histogram.sum, histogram.count
+    return snapshot
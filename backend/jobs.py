@@ -0,0 +1,358 @@
+# backend/jobs.py
+"""
+Background jobs: a DB-backed queue drained by a local process pool, with
+no external broker.
+
+Jobs are queued through POST /jobs or POST /expenses/bulk?background=true.
+Each call inserts a `jobs` row and answers 202 straight away. Every API
+process runs a `JobRunner`. The runner claims due rows with a conditional
+UPDATE, so several processes can share one queue, and runs them on
+`job_workers` worker processes. Two limits apply:
+
+* `job_workers` caps how many jobs one process runs at a time.
+* `job_max_active_per_user` caps queued plus running jobs per user;
+  `enqueue` answers 429 beyond it.
+
+Handlers run in the worker with a sync Session. They report progress into
+the row, and each report extends the claim's lease. A failed job is
+retried with exponential backoff, up to `max_attempts` attempts. If a
+worker dies, its lease runs out and the job is claimed again.
+"""
+import asyncio
+import csv
+import logging
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date as DateType, datetime, timedelta, timezone
+from typing import Callable, Optional
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+import async_crud
+import crud
+import importers
+import money
+import rollup
+import schemas
+from config import Settings, get_settings
+from database import AsyncSessionLocal, SessionLocal
+from models import Job
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_SECONDS = 5
+REPORT_INTERVAL_SECONDS = 0.5
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class PermanentJobError(Exception):
+    """A failure that retrying can't fix (bad input); the job fails at once."""
+
+
+class JobContext:
+    """What a handler gets: the job's owner and params, and a way to report progress."""
+
+    def __init__(self, job_id: int, attempt: int, user_id: int, params: dict, lease_seconds: float):
+        self.job_id = job_id
+        self.attempt = attempt
+        self.user_id = user_id
+        self.params = params
+        self.lease_seconds = lease_seconds
+        self._last_report = 0.0
+
+    def report(self, progress: float, message: Optional[str] = None, force: bool = False) -> None:
+        """Stores progress (0-1) on the job row, at most every REPORT_INTERVAL_SECONDS unless forced."""
+        now = time.monotonic()
+        if not force and now - self._last_report < REPORT_INTERVAL_SECONDS:
+            return
+        self._last_report = now
+        lease_until = utcnow() + timedelta(seconds=self.lease_seconds)
+        with SessionLocal() as db:
+            # SQLite has a single writer. While the handler's own transaction
+            # holds it, skip this report instead of waiting for the lock.
+            sqlite = db.get_bind().dialect.name == "sqlite"
+            if sqlite:
+                db.execute(text("PRAGMA busy_timeout=0"))
+            try:
+                crud.update_job_progress(db, self.job_id, self.attempt, min(max(progress, 0.0), 1.0), message, lease_until)
+            except OperationalError:
+                db.rollback()
+            finally:
+                if sqlite:
+                    db.execute(text(f"PRAGMA busy_timeout={int(get_settings().sqlite_busy_timeout_ms)}"))
+
+
+# ----------------------------
+# Handlers: (sync Session, JobContext) -> JSON-able result dict
+# ----------------------------
+def _month_bounds(month: str) -> tuple[DateType, DateType]:
+    start = DateType.fromisoformat(f"{month}-01")
+    following = DateType(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start, following - timedelta(days=1)
+
+
+def monthly_statement(db: Session, job: JobContext) -> dict:
+    """Totals by category and day, the largest expenses and last month's total for one month."""
+    start, end = _month_bounds(job.params["month"])
+    currency = job.params.get("currency") or get_settings().default_currency
+    job.report(0.1, "Category totals", force=True)
+    categories = crud.get_category_totals(db, job.user_id, start, end, currency)
+    previous_start, previous_end = _month_bounds(f"{(start - timedelta(days=1)):%Y-%m}")
+    previous = crud.get_category_totals(db, job.user_id, previous_start, previous_end, currency)
+    job.report(0.4, "Daily totals")
+    daily = crud.get_daily_trend(db, job.user_id, start, end, currency)
+    job.report(0.7, "Largest expenses")
+    largest = crud.get_expenses_page(db, job.user_id, 10, filters=schemas.ExpenseFilter(
+        start=start, end=end, currency=currency, sort="-amount",
+    ))
+    return {
+        "month": job.params["month"],
+        "currency": currency,
+        "total": round(sum(c["total"] for c in categories), money.exponent(currency)),
+        "count": sum(c["count"] for c in categories),
+        "previous_month_total": round(sum(c["total"] for c in previous), money.exponent(currency)),
+        "categories": [schemas.CategoryTotal(**c).model_dump(mode="json") for c in categories],
+        "daily": [schemas.DailyTotal(**d).model_dump(mode="json") for d in daily],
+        "largest": [schemas.ExpenseResponse.model_validate(e).model_dump(mode="json") for e in largest],
+    }
+
+
+def recompute_analysis(db: Session, job: JobContext) -> dict:
+    """Rebuilds the user's daily rollup from their expenses (archived months keep theirs), then verifies it."""
+    job.report(0.1, "Rebuilding daily rollup", force=True)
+    rows = rollup.rebuild(db, user_id=job.user_id)
+    job.report(0.7, "Verifying")
+    mismatches = rollup.check(db, user_id=job.user_id)
+    # Analysis responses are cached per data_version (etags.py); make them rebuild.
+    crud.bump_data_version(db, job.user_id)
+    db.commit()
+    return {"rollup_rows": rows, "mismatches": len(mismatches)}
+
+
+def bulk_import(db: Session, job: JobContext) -> dict:
+    """POST /expenses/bulk, from the spooled upload at params["upload"], in one transaction."""
+    path, fmt = job.params["upload"], job.params["format"]
+    size = os.path.getsize(path) or 1
+    inserted, failed, errors = 0, 0, []
+    with open(path, "rb") as upload:
+        if fmt == "json":
+            rows = importers.iter_json_rows(upload)
+        elif fmt == "csv":
+            rows = importers.iter_csv_rows(upload)
+        else:
+            rows = importers.iter_ofx_rows(upload, job.params.get("default_category", importers.DEFAULT_CATEGORY))
+        while True:
+            try:
+                valid, row_errors, consumed = importers.next_batch(rows, job.user_id)
+            except (ValueError, csv.Error) as e:
+                raise PermanentJobError(f"Could not parse {fmt} upload: {e}")
+            if not consumed:
+                break
+            failed += len(row_errors)
+            errors.extend(row_errors[:importers.MAX_REPORTED_ERRORS - len(errors)])
+            inserted += crud.insert_expense_batch(db, valid)
+            job.report(upload.tell() / size, f"{inserted} rows imported")
+    db.commit()
+    return schemas.BulkImportResult(inserted=inserted, failed=failed, errors=errors).model_dump()
+
+
+HANDLERS: dict[str, Callable[[Session, JobContext], dict]] = {
+    "monthly_statement": monthly_statement,
+    "recompute_analysis": recompute_analysis,
+    "bulk_import": bulk_import,
+}
+
+
+def validate_params(kind: str, params: dict) -> dict:
+    """Checks POST /jobs params up front so bad input is a 422, not a failed job; raises ValueError."""
+    if kind == "monthly_statement":
+        month = params.get("month")
+        try:
+            _month_bounds(month)
+        except (TypeError, ValueError):
+            raise ValueError('monthly_statement needs "month" as YYYY-MM')
+        currency = params.get("currency")
+        if currency is not None and not (isinstance(currency, str) and len(currency) == 3 and currency.isalpha()):
+            raise ValueError('"currency" must be an ISO 4217 code')
+        return {"month": month, **({"currency": currency.upper()} if currency else {})}
+    if kind == "recompute_analysis":
+        return {}
+    raise ValueError(f"Unknown job kind {kind!r}")
+
+
+# ----------------------------
+# Worker side
+# ----------------------------
+def _init_worker() -> None:
+    # Pooled connections inherited over fork belong to the parent process.
+    from database import get_engine
+    get_engine().dispose(close=False)
+
+
+def execute(job_id: int, attempt: int, user_id: int, kind: str, params: dict, lease_seconds: float) -> dict:
+    """Runs one job attempt. Returns {"result": ...} or {"error": ..., "retry": bool}; never raises."""
+    context = JobContext(job_id, attempt, user_id, params, lease_seconds)
+    with SessionLocal() as db:
+        try:
+            return {"result": HANDLERS[kind](db, context)}
+        except PermanentJobError as e:
+            db.rollback()
+            return {"error": str(e), "retry": False}
+        except Exception:
+            db.rollback()
+            return {"error": traceback.format_exc(limit=5), "retry": True}
+
+
+# ----------------------------
+# API side
+# ----------------------------
+class JobRunner:
+    def __init__(self, settings: Settings):
+        self.workers = settings.job_workers
+        self.slots = max(1, settings.job_workers)
+        self.lease_seconds = settings.job_lease_seconds
+        self.poll_seconds = settings.job_poll_seconds
+        self.storage_dir = settings.job_storage_dir
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+        self.running: set[asyncio.Task] = set()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        return self._executor
+
+    async def start(self) -> None:
+        os.makedirs(self.storage_dir, exist_ok=True)
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        tasks = [t for t in (self._task, *self.running) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        if self._executor is not None:
+            # Interrupted jobs keep their lease and are claimed again once it expires.
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def notify(self) -> None:
+        """Wakes the dispatcher now instead of at the next poll."""
+        if self._wake is not None:
+            self._wake.set()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": len(self.running),
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retried": self.retried,
+        }
+
+    async def _loop(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                await self._dispatch()
+            except Exception:
+                logger.exception("Job dispatch failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _dispatch(self) -> None:
+        free = self.slots - len(self.running)
+        if free <= 0:
+            return
+        now = utcnow()
+        async with AsyncSessionLocal() as db:
+            claimed = await async_crud.claim_jobs(db, free, now, now + timedelta(seconds=self.lease_seconds))
+        for job in claimed:
+            task = asyncio.create_task(self._run(job))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+    async def _run(self, job: Job) -> None:
+        args = (job.id, job.attempts, job.user_id, job.kind, job.params, self.lease_seconds)
+        try:
+            if self.workers == 0:
+                outcome = await run_in_threadpool(execute, *args)
+            else:
+                outcome = await asyncio.get_running_loop().run_in_executor(self._pool(), execute, *args)
+        except Exception:  # e.g. a worker process was killed
+            outcome = {"error": traceback.format_exc(limit=5), "retry": True}
+
+        now = utcnow()
+        if "result" in outcome:
+            values = dict(status="succeeded", progress=1.0, result=outcome["result"], error=None, message=None)
+            self.succeeded += 1
+        elif outcome["retry"] and job.attempts < job.max_attempts:
+            delay = RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+            values = dict(status="queued", error=outcome["error"], run_after=now + timedelta(seconds=delay))
+            self.retried += 1
+        else:
+            values = dict(status="failed", error=outcome["error"])
+            self.failed += 1
+        values["lease_expires_at"] = None
+        if values["status"] != "queued":
+            values["finished_at"] = now
+
+        async with AsyncSessionLocal() as db:
+            owned = await async_crud.finish_job(db, job.id, job.attempts, values)
+        if owned and values["status"] != "queued" and job.params.get("upload"):
+            try:
+                os.remove(job.params["upload"])
+            except OSError:
+                pass
+        self.notify()
+
+
+_runner: Optional[JobRunner] = None
+
+
+def init_runner(settings: Settings) -> None:
+    """
+    Replaces `jobs.runner` with one built from `settings` (main.create_app
+    calls this). Start it with `await jobs.runner.start()`.
+    """
+    global _runner
+    _runner = JobRunner(settings)
+
+
+def __getattr__(name: str):
+    # `jobs.runner` is built from get_settings() on first access unless init_runner ran.
+    if name == "runner":
+        if _runner is None:
+            init_runner(get_settings())
+        return _runner
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+async def enqueue(db, user_id: int, kind: str, params: dict) -> Job:
+    """Queues a job for `user_id`, or answers 429 when they already have too many in progress."""
+    settings = get_settings()
+    if await async_crud.count_active_jobs(db, user_id) >= settings.job_max_active_per_user:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many background jobs in progress, please retry later",
+            headers={"Retry-After": str(int(RETRY_BASE_SECONDS))},
+        )
+    job = await async_crud.create_job(db, user_id, kind, params, settings.job_max_attempts, utcnow())
+    if _runner is not None:  # otherwise no runner polls in this process
+        _runner.notify()
+    return job
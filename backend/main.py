@@ -1,21 +1,80 @@
+from contextlib import asynccontextmanager
+from typing import Optional
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routes import users, expenses, chatbot, auth, saving_goals
-from database import engine, Base
-Base.metadata.create_all(bind=engine)
-app = FastAPI(title="Personal Finance Backend API")
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-app.include_router(users.router)
-app.include_router(expenses.router)
-app.include_router(chatbot.router)
-app.include_router(auth.router)
-app.include_router(saving_goals.router)
-@app.get("/")
-def root():
-    return {"message": "Backend is running successfully!"}
+from config import Settings, get_settings, use_settings
+# Schema changes are applied with `alembic upgrade head`, not at import time.
+
+# Route modules, imported by create_app so that importing this module stays cheap.
+ROUTERS = ("users", "expenses", "chatbot", "auth", "saving_goals", "metrics", "sync", "dashboard", "jobs")
+
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """
+    Builds the API from `settings`. The caches, the bcrypt pool and the job
+    runner are rebuilt from them here; nothing touches the database: the
+    engines are created when the app starts (see `lifespan`) or on first use,
+    and are disposed of when it shuts down.
+
+        uvicorn main:app                       # settings from the environment
+        uvicorn --factory main:create_app
+    """
+    import importlib
+    import hashing
+    import jobs
+    from cache import init_caches
+    from database import dispose_engines, get_replicas, init_engines
+    from instrumentation import TimingMiddleware
+
+    settings = settings or get_settings()
+    if not settings.secret_key:
+        raise RuntimeError("Missing SECRET_KEY (set it in the environment or .env)")
+    use_settings(settings)
+    init_caches(settings)
+    hashing.init_hasher(settings)
+    jobs.init_runner(settings)
+    hasher, job_runner = hashing.hasher, jobs.runner
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        init_engines(settings)
+        replicas = get_replicas()
+        if replicas is not None:
+            await replicas.start()
+        await job_runner.start()
+        try:
+            yield
+        finally:
+            await job_runner.stop()
+            hasher.shutdown()
+            await dispose_engines()
+
+    app = FastAPI(title="Personal Finance Backend API", lifespan=lifespan)
+    app.state.settings = settings
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag", "Location", "Server-Timing"],
+    )
+    # Added last so it wraps CORS too and times the whole request.
+    app.add_middleware(TimingMiddleware, settings=settings)
+    for name in ROUTERS:
+        app.include_router(importlib.import_module(f"routes.{name}").router)
+
+    @app.get("/")
+    def root():
+        return {"message": "Backend is running successfully!"}
+
+    return app
+
+
+def __getattr__(name: str):
+    # `main.app` (uvicorn main:app, `from main import app`) is built on first access.
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,89 @@
+"""baseline schema
+
+Creates the original users / expenses / saving_goals tables on an empty
+database, and brings databases created by the old `Base.metadata.create_all`
+startup hook up to the same shape (this replaces migrate_columns.py).
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-11-20
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if "users" not in tables:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("name", sa.String(length=100), nullable=True),
+            sa.Column("email", sa.String(length=150), nullable=False),
+            sa.Column("password", sa.String(length=255), nullable=False),
+            sa.Column("date_of_birth", sa.Date(), nullable=True),
+            sa.Column("age", sa.Integer(), nullable=True),
+            sa.Column("gender", sa.String(length=20), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+    else:
+        # Profile fields were added to the model after early databases were created.
+        existing = {col["name"] for col in inspector.get_columns("users")}
+        with op.batch_alter_table("users") as batch:
+            if "date_of_birth" not in existing:
+                batch.add_column(sa.Column("date_of_birth", sa.Date(), nullable=True))
+            if "age" not in existing:
+                batch.add_column(sa.Column("age", sa.Integer(), nullable=True))
+            if "gender" not in existing:
+                batch.add_column(sa.Column("gender", sa.String(length=20), nullable=True))
+
+    if "expenses" not in tables:
+        op.create_table(
+            "expenses",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("category", sa.String(length=50), nullable=False),
+            sa.Column("amount", sa.Float(), nullable=False),
+            sa.Column("description", sa.Text(), nullable=True),
+            sa.Column("date", sa.Date(), server_default=sa.func.current_date(), nullable=True),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_expenses_id", "expenses", ["id"])
+
+    if "saving_goals" not in tables:
+        op.create_table(
+            "saving_goals",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("title", sa.String(length=100), nullable=False),
+            sa.Column("target_amount", sa.Float(), nullable=False),
+            sa.Column("saved_amount", sa.Float(), nullable=True),
+            sa.Column("user_id", sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_saving_goals_id", "saving_goals", ["id"])
+    else:
+        # Early builds used camelCase column names.
+        existing = {col["name"] for col in inspector.get_columns("saving_goals")}
+        with op.batch_alter_table("saving_goals") as batch:
+            if "targetAmount" in existing:
+                batch.alter_column("targetAmount", new_column_name="target_amount")
+            if "savedAmount" in existing:
+                batch.alter_column("savedAmount", new_column_name="saved_amount")
+
+
+def downgrade() -> None:
+    op.drop_table("saving_goals")
+    op.drop_table("expenses")
+    op.drop_table("users")
@@ -0,0 +1,40 @@
+"""expense daily rollups
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-11-20
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Databases booted by the old create_all hook may already have it.
+    if "expense_daily_rollups" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "expense_daily_rollups",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("category", sa.String(length=50), nullable=False),
+        sa.Column("total", sa.Float(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "day", "category"),
+    )
+    # Backfill from existing expenses (same query as `python rollup.py rebuild`).
+    op.execute(
+        "INSERT INTO expense_daily_rollups (user_id, day, category, total, count) "
+        "SELECT user_id, date, category, SUM(amount), COUNT(id) FROM expenses "
+        "WHERE date IS NOT NULL GROUP BY user_id, date, category"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("expense_daily_rollups")
@@ -0,0 +1,28 @@
+"""composite indexes for the hot crud queries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-11-20
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_expenses_user_date_id",
+        "expenses",
+        ["user_id", sa.text("date DESC"), sa.text("id DESC")],
+    )
+    op.create_index("ix_saving_goals_user_id", "saving_goals", ["user_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_saving_goals_user_id", table_name="saving_goals")
+    op.drop_index("ix_expenses_user_date_id", table_name="expenses")
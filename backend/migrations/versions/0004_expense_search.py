@@ -0,0 +1,41 @@
+"""expense filtering and full-text search
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-11-21
+"""
+from alembic import op
+import sqlalchemy as sa
+import search
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_expenses_user_amount_id", "expenses", ["user_id", "amount", "id"])
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        statements = search.POSTGRES_DDL
+    elif dialect == "sqlite":
+        statements = search.SQLITE_DDL + search.SQLITE_TRIGGERS
+    else:
+        statements = []  # search falls back to ILIKE
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        statements = search.POSTGRES_DROP
+    elif dialect == "sqlite":
+        statements = search.SQLITE_DROP
+    else:
+        statements = []
+    for statement in statements:
+        op.execute(statement)
+    op.drop_index("ix_expenses_user_amount_id", table_name="expenses")
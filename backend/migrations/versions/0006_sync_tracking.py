@@ -0,0 +1,51 @@
+"""change tracking for delta sync
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-11-22
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Plain ADD COLUMNs (no batch rebuild), so the expenses FTS triggers survive.
+    # SQLite can't add a column with a CURRENT_TIMESTAMP default, hence the backfill.
+    for table in ("expenses", "saving_goals"):
+        op.add_column(table, sa.Column("change_seq", sa.Integer(), nullable=False, server_default="0"))
+        op.add_column(table, sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True))
+        op.execute(f"UPDATE {table} SET updated_at = CURRENT_TIMESTAMP")
+    op.create_index("ix_expenses_user_change_seq", "expenses", ["user_id", "change_seq"])
+    op.create_index("ix_saving_goals_user_change_seq", "saving_goals", ["user_id", "change_seq"])
+    # (user_id, change_seq) serves every lookup the single-column index did.
+    op.drop_index("ix_saving_goals_user_id", table_name="saving_goals")
+
+    op.create_table(
+        "sync_tombstones",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("entity", sa.String(length=20), nullable=False),
+        sa.Column("row_id", sa.Integer(), nullable=False),
+        sa.Column("change_seq", sa.Integer(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_sync_tombstones_user_change_seq", "sync_tombstones", ["user_id", "change_seq"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_sync_tombstones_user_change_seq", table_name="sync_tombstones")
+    op.drop_table("sync_tombstones")
+    op.create_index("ix_saving_goals_user_id", "saving_goals", ["user_id"])
+    op.drop_index("ix_saving_goals_user_change_seq", table_name="saving_goals")
+    op.drop_index("ix_expenses_user_change_seq", table_name="expenses")
+    for table in ("saving_goals", "expenses"):
+        op.drop_column(table, "updated_at")
+        op.drop_column(table, "change_seq")
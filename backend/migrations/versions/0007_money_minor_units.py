@@ -0,0 +1,102 @@
+"""money as integer minor units with a currency
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2025-11-23
+"""
+from alembic import op
+import sqlalchemy as sa
+from config import get_settings
+import money
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+# (table, float column, minor-unit column)
+MONEY_COLUMNS = [
+    ("expenses", "amount", "amount_minor"),
+    ("saving_goals", "target_amount", "target_amount_minor"),
+    ("saving_goals", "saved_amount", "saved_amount_minor"),
+]
+
+
+def _rollups_table(*, minor: bool) -> None:
+    columns = [
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("category", sa.String(length=50), nullable=False),
+    ]
+    if minor:
+        columns += [
+            sa.Column("currency", sa.String(length=3), nullable=False),
+            sa.Column("total_minor", sa.BigInteger(), nullable=False),
+        ]
+        key = ("user_id", "day", "category", "currency")
+    else:
+        columns.append(sa.Column("total", sa.Float(), nullable=False))
+        key = ("user_id", "day", "category")
+    op.create_table(
+        "expense_daily_rollups",
+        *columns,
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint(*key),
+    )
+
+
+def upgrade() -> None:
+    # Existing rows were entered in the deployment's default currency.
+    currency = get_settings().default_currency
+    scale = 10 ** money.exponent(currency)
+    sqlite = op.get_bind().dialect.name == "sqlite"
+
+    # Plain ADD / DROP COLUMNs (no batch rebuild), so the expenses FTS triggers survive.
+    for table in ("expenses", "saving_goals"):
+        op.add_column(table, sa.Column("currency", sa.String(length=3), nullable=False, server_default=currency))
+    for table, old, new in MONEY_COLUMNS:
+        op.add_column(table, sa.Column(new, sa.BigInteger(), nullable=False, server_default="0"))
+        op.execute(f"UPDATE {table} SET {new} = CAST(ROUND(COALESCE({old}, 0) * {scale}) AS BIGINT)")
+    if not sqlite:
+        # The application always supplies these; SQLite can't drop a default without a rebuild.
+        for table, _, new in MONEY_COLUMNS:
+            op.alter_column(table, new, server_default=None)
+        for table in ("expenses", "saving_goals"):
+            op.alter_column(table, "currency", server_default=None)
+
+    op.drop_index("ix_expenses_user_amount_id", table_name="expenses")
+    for table, old, _ in MONEY_COLUMNS:
+        op.drop_column(table, old)
+    op.create_index("ix_expenses_user_amount_minor_id", "expenses", ["user_id", "amount_minor", "id"])
+
+    # The rollup key gains the currency; rebuild it from the converted expenses.
+    op.drop_table("expense_daily_rollups")
+    _rollups_table(minor=True)
+    op.execute(
+        "INSERT INTO expense_daily_rollups (user_id, day, category, currency, total_minor, count) "
+        "SELECT user_id, date, category, currency, SUM(amount_minor), COUNT(id) FROM expenses "
+        "WHERE date IS NOT NULL GROUP BY user_id, date, category, currency"
+    )
+
+
+def downgrade() -> None:
+    scale = 10 ** money.exponent(get_settings().default_currency)
+
+    op.drop_table("expense_daily_rollups")
+    _rollups_table(minor=False)
+    op.execute(
+        "INSERT INTO expense_daily_rollups (user_id, day, category, total, count) "
+        f"SELECT user_id, date, category, SUM(amount_minor) / {scale}.0, COUNT(id) FROM expenses "
+        "WHERE date IS NOT NULL GROUP BY user_id, date, category"
+    )
+
+    op.drop_index("ix_expenses_user_amount_minor_id", table_name="expenses")
+    for table, old, new in MONEY_COLUMNS:
+        op.add_column(table, sa.Column(old, sa.Float(), nullable=old == "saved_amount", server_default="0"))
+        op.execute(f"UPDATE {table} SET {old} = {new} / {scale}.0")
+        op.drop_column(table, new)
+    op.create_index("ix_expenses_user_amount_id", "expenses", ["user_id", "amount", "id"])
+    for table in ("saving_goals", "expenses"):
+        op.drop_column(table, "currency")
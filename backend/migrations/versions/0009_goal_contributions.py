@@ -0,0 +1,49 @@
+"""goal contributions ledger
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2025-11-25
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "goal_contributions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("goal_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=20), nullable=False),
+        sa.Column("amount_minor", sa.BigInteger(), nullable=False),
+        sa.Column("currency", sa.String(length=3), nullable=False),
+        sa.Column("saved_after_minor", sa.BigInteger(), nullable=False),
+        sa.Column("note", sa.String(length=255), nullable=True),
+        sa.Column("idempotency_key", sa.String(length=100), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["goal_id"], ["saving_goals.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_goal_contributions_goal_id_id", "goal_contributions", ["goal_id", "id"])
+    op.create_index(
+        "uq_goal_contributions_user_idempotency_key", "goal_contributions", ["user_id", "idempotency_key"], unique=True
+    )
+    # Open each ledger with the amount already saved, so entries always sum to saved_amount_minor.
+    op.execute(
+        "INSERT INTO goal_contributions (goal_id, user_id, kind, amount_minor, currency, saved_after_minor, created_at) "
+        "SELECT id, user_id, 'adjustment', saved_amount_minor, currency, saved_amount_minor, CURRENT_TIMESTAMP "
+        "FROM saving_goals WHERE saved_amount_minor <> 0 AND user_id IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_goal_contributions_user_idempotency_key", table_name="goal_contributions")
+    op.drop_index("ix_goal_contributions_goal_id_id", table_name="goal_contributions")
+    op.drop_table("goal_contributions")
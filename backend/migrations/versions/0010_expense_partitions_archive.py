@@ -0,0 +1,141 @@
+"""monthly expense partitions and the cold archive catalog
+
+`expenses.date` becomes NOT NULL, because it is the partition key. The
+few rows without a date get their updated_at day (today if they have none),
+and their owners' rollup rows are rebuilt to count them.
+
+On PostgreSQL, `expenses` is rebuilt as a table partitioned by month on
+`date` (see partitions.py). The rows are copied across, and the sequence,
+indexes and search index move with them. SQLite keeps its plain table; the
+batch rebuild that adds NOT NULL drops the search triggers, so they are
+created again.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2025-11-26
+"""
+from datetime import date as DateType
+from alembic import op
+import sqlalchemy as sa
+from config import get_settings
+import partitions
+import search
+
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+COLUMNS = "id, user_id, category, amount_minor, currency, description, date, change_seq, updated_at"
+
+
+def _expenses_table(sequence: str, *, partitioned: bool) -> str:
+    return f"""CREATE TABLE expenses (
+        id INTEGER NOT NULL DEFAULT nextval('{sequence}'),
+        user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+        category VARCHAR(50) NOT NULL,
+        amount_minor BIGINT NOT NULL,
+        currency VARCHAR(3) NOT NULL,
+        description TEXT,
+        date DATE {"NOT NULL " if partitioned else ""}DEFAULT CURRENT_DATE,
+        change_seq INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP WITH TIME ZONE,
+        PRIMARY KEY ({"id, date" if partitioned else "id"})
+    ){" PARTITION BY RANGE (date)" if partitioned else ""}"""
+
+
+def _create_indexes() -> None:
+    op.create_index("ix_expenses_id", "expenses", ["id"])
+    op.create_index("ix_expenses_user_date_id", "expenses", ["user_id", sa.text("date DESC"), sa.text("id DESC")])
+    op.create_index("ix_expenses_user_amount_minor_id", "expenses", ["user_id", "amount_minor", "id"])
+    op.create_index("ix_expenses_user_change_seq", "expenses", ["user_id", "change_seq"])
+    for statement in search.POSTGRES_DDL:
+        op.execute(statement)
+
+
+def _rebuild_expenses(*, partitioned: bool) -> None:
+    """Swaps `expenses` for a new (un)partitioned table holding the same rows."""
+    conn = op.get_bind()
+    sequence = conn.scalar(sa.text("SELECT pg_get_serial_sequence('expenses', 'id')"))
+    op.execute("ALTER TABLE expenses RENAME TO expenses_old")
+    op.execute("ALTER TABLE expenses_old RENAME CONSTRAINT expenses_pkey TO expenses_old_pkey")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+    op.execute(_expenses_table(sequence, partitioned=partitioned))
+    if partitioned:
+        op.execute(f"CREATE TABLE {partitions.DEFAULT_PARTITION} PARTITION OF expenses DEFAULT")
+        today = DateType.today()
+        first = conn.scalar(sa.text("SELECT min(date) FROM expenses_old")) or today
+        last = conn.scalar(sa.text("SELECT max(date) FROM expenses_old")) or today
+        hot_start = partitions.add_months(today.replace(day=1), 1 - get_settings().archive_horizon_months)
+        partitions.ensure_partitions(
+            conn, min(first, hot_start), max(last, partitions.add_months(today.replace(day=1), partitions.MONTHS_AHEAD))
+        )
+    op.execute(f"INSERT INTO expenses ({COLUMNS}) SELECT {COLUMNS} FROM expenses_old")
+    op.execute("DROP TABLE expenses_old")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY expenses.id")
+    _create_indexes()
+
+
+def _set_date_nullable(dialect: str, nullable: bool) -> None:
+    if dialect != "sqlite":
+        op.alter_column("expenses", "date", existing_type=sa.Date(), nullable=nullable)
+        return
+    with op.batch_alter_table("expenses") as batch:
+        batch.alter_column("date", existing_type=sa.Date(), nullable=nullable)
+    for statement in search.SQLITE_TRIGGERS:
+        op.execute(statement)
+
+
+def _backfill_dates() -> None:
+    """Gives undated expenses a date and rebuilds their owners' rollups (which skipped them) to match."""
+    conn = op.get_bind()
+    users = conn.scalars(sa.text("SELECT DISTINCT user_id FROM expenses WHERE date IS NULL")).all()
+    if not users:
+        return
+    # SQLite's CAST(... AS DATE) is numeric (it keeps just the year).
+    day = "date(updated_at)" if conn.dialect.name == "sqlite" else "CAST(updated_at AS DATE)"
+    op.execute(f"UPDATE expenses SET date = COALESCE({day}, CURRENT_DATE) WHERE date IS NULL")
+    affected = sa.bindparam("users", value=list(users), expanding=True)
+    conn.execute(sa.text("DELETE FROM expense_daily_rollups WHERE user_id IN :users").bindparams(affected))
+    conn.execute(sa.text(
+        "INSERT INTO expense_daily_rollups (user_id, day, category, currency, total_minor, count) "
+        "SELECT user_id, date, category, currency, SUM(amount_minor), COUNT(id) FROM expenses "
+        "WHERE user_id IN :users GROUP BY user_id, date, category, currency"
+    ).bindparams(affected))
+
+
+def upgrade() -> None:
+    op.create_table(
+        "expense_archives",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("month", sa.Date(), nullable=False),
+        sa.Column("path", sa.String(length=255), nullable=False),
+        sa.Column("byte_offset", sa.BigInteger(), nullable=False),
+        sa.Column("byte_length", sa.Integer(), nullable=False),
+        sa.Column("row_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_expense_archives_user_month", "expense_archives", ["user_id", "month"])
+
+    _backfill_dates()
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        _rebuild_expenses(partitioned=True)
+    else:
+        _set_date_nullable(dialect, False)
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if conn.scalar(sa.text("SELECT count(*) FROM expense_archives")):
+        raise RuntimeError("Archived months would be lost; bring them back with `python archive.py restore` first")
+    if conn.dialect.name == "postgresql":
+        _rebuild_expenses(partitioned=False)
+    else:
+        _set_date_nullable(conn.dialect.name, True)
+    op.drop_index("ix_expense_archives_user_month", table_name="expense_archives")
+    op.drop_table("expense_archives")
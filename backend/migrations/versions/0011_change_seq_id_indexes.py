@@ -0,0 +1,32 @@
+"""change_seq indexes that also order by id
+
+Delta sync reads ORDER BY change_seq, id. With (user_id, change_seq) alone,
+PostgreSQL sorts each run of equal change_seq values, and a bulk import
+stamps all of its rows with one. SQLite appends the rowid to every index, so
+it never needed the sort.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2025-11-27
+"""
+from alembic import op
+
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+TABLES = ("expenses", "saving_goals", "sync_tombstones")
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.create_index(f"ix_{table}_user_change_seq_id", table, ["user_id", "change_seq", "id"])
+        op.drop_index(f"ix_{table}_user_change_seq", table_name=table)
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.create_index(f"ix_{table}_user_change_seq", table, ["user_id", "change_seq"])
+        op.drop_index(f"ix_{table}_user_change_seq_id", table_name=table)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date, Text
+from sqlalchemy import BigInteger, Column, Integer, String, Float, ForeignKey, Date, DateTime, Text, Index, JSON
 from sqlalchemy.orm import relationship
 from database import Base
 from sqlalchemy.sql import func
@@ -18,6 +18,9 @@ class User(Base):
     age = Column(Integer, nullable=True)
     gender = Column(String(20), nullable=True)
 
+    # Bumped on every expense / goal write; drives ETags (see etags.py)
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
+
     # Relationships
     expenses = relationship("Expense", back_populates="user", cascade="all, delete")
     saving_goals = relationship("SavingGoal", back_populates="user", cascade="all, delete")
@@ -27,15 +30,33 @@ class User(Base):
 class Expense(Base):
     __tablename__ = "expenses"
 
-    id = Column(Integer, primary_key=True, index=True)
+    # PostgreSQL partitions by month on `date` and needs the partition key in
+    # the primary key (see partitions.py), so the key is (id, date) there and
+    # ORM updates and deletes only touch one partition. `id` alone is still
+    # unique (one sequence); SQLite's table keeps it as the whole key.
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     category = Column(String(50), nullable=False)
-    amount = Column(Float, nullable=False)
+    # Money is integer minor units (paise, cents) in `currency`; see money.py
+    amount_minor = Column(BigInteger, nullable=False)
+    currency = Column(String(3), nullable=False)
     description = Column(Text, nullable=True)
-    date = Column(Date, server_default=func.current_date())
+    date = Column(Date, primary_key=True, server_default=func.current_date())
+
+    # Sync bookkeeping: the owner's data_version as of the last write (see routes/sync.py)
+    change_seq = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
 
     user = relationship("User", back_populates="expenses")
 
+    __table_args__ = (
+        # Serves every per-user date range and newest-first keyset page.
+        Index("ix_expenses_user_date_id", "user_id", date.desc(), id.desc()),
+        # Serves amount-sorted pages and amount-range filters.
+        Index("ix_expenses_user_amount_minor_id", "user_id", "amount_minor", "id"),
+        Index("ix_expenses_user_change_seq_id", "user_id", "change_seq", "id"),
+    )
+
 
 # ---------- SAVING GOAL MODEL ----------
 class SavingGoal(Base):
@@ -43,8 +64,125 @@ class SavingGoal(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(100), nullable=False)
-    target_amount = Column(Float, nullable=False)
-    saved_amount = Column(Float, default=0.0)
+    target_amount_minor = Column(BigInteger, nullable=False)
+    saved_amount_minor = Column(BigInteger, nullable=False, default=0)
+    currency = Column(String(3), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    change_seq = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
 
     user = relationship("User", back_populates="saving_goals")
+
+    __table_args__ = (
+        # Also serves the plain per-user goal lookups.
+        Index("ix_saving_goals_user_change_seq_id", "user_id", "change_seq", "id"),
+    )
+
+
+# ---------- GOAL CONTRIBUTION MODEL ----------
+class GoalContribution(Base):
+    """
+    Append-only ledger of money moved into (or out of) a saving goal. The
+    goal's saved_amount_minor is always the running sum of its entries.
+    """
+    __tablename__ = "goal_contributions"
+
+    id = Column(Integer, primary_key=True)
+    goal_id = Column(Integer, ForeignKey("saving_goals.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String(20), nullable=False, default="contribution")  # contribution | adjustment
+    # Minor units in `currency` (always the goal's); negative for withdrawals.
+    amount_minor = Column(BigInteger, nullable=False)
+    currency = Column(String(3), nullable=False)
+    # The goal's saved amount just after this entry was applied.
+    saved_after_minor = Column(BigInteger, nullable=False)
+    note = Column(String(255), nullable=True)
+    # From the Idempotency-Key header; a retry with the same key gets this entry back.
+    idempotency_key = Column(String(100), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=func.now())
+
+    __table_args__ = (
+        # Serves history pages and progress for one goal.
+        Index("ix_goal_contributions_goal_id_id", "goal_id", "id"),
+        # NULL keys never collide, so requests without a key are unaffected.
+        Index("uq_goal_contributions_user_idempotency_key", "user_id", "idempotency_key", unique=True),
+    )
+
+
+# ---------- EXPENSE ROLLUP MODEL ----------
+class ExpenseDailyRollup(Base):
+    """Per-user, per-day, per-category, per-currency spend totals maintained alongside `expenses`."""
+    __tablename__ = "expense_daily_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    category = Column(String(50), primary_key=True)
+    currency = Column(String(3), primary_key=True)
+    total_minor = Column(BigInteger, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+
+# ---------- EXPENSE ARCHIVE MODEL ----------
+class ExpenseArchive(Base):
+    """Where one user's expenses for one archived month live in the cold archive (see archive.py)."""
+    __tablename__ = "expense_archives"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    month = Column(Date, nullable=False)  # first day of the month
+    path = Column(String(255), nullable=False)  # relative to settings.archive_dir
+    byte_offset = Column(BigInteger, nullable=False)
+    byte_length = Column(Integer, nullable=False)
+    row_count = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), default=func.now())
+
+    __table_args__ = (
+        Index("ix_expense_archives_user_month", "user_id", "month"),
+    )
+
+
+# ---------- SYNC TOMBSTONE MODEL ----------
+class SyncTombstone(Base):
+    """A deleted expense or goal, kept so /sync can tell clients to drop their copy."""
+    __tablename__ = "sync_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    entity = Column(String(20), nullable=False)  # "expense" | "goal"
+    row_id = Column(Integer, nullable=False)
+    change_seq = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), default=func.now())
+
+    __table_args__ = (
+        Index("ix_sync_tombstones_user_change_seq_id", "user_id", "change_seq", "id"),
+    )
+
+
+# ---------- BACKGROUND JOB MODEL ----------
+class Job(Base):
+    """A queued unit of background work; see jobs.py."""
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String(50), nullable=False)
+    params = Column(JSON, nullable=False, default=dict)
+    status = Column(String(20), nullable=False, default="queued")  # queued | running | succeeded | failed
+    progress = Column(Float, nullable=False, default=0.0)
+    message = Column(String(255), nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    # Not claimable before run_after (retry backoff); a running job whose
+    # lease expired is assumed lost with its worker and is claimed again.
+    run_after = Column(DateTime(timezone=True), nullable=False)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+        Index("ix_jobs_user_id_id", "user_id", "id"),
+    )
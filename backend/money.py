@@ -0,0 +1,77 @@
+# backend/money.py
+"""
+Amounts are stored as integers in the currency's minor unit (paise, cents,
+yen, fils). The API still speaks decimal major units; `schemas` converts at
+the edge with `to_minor` / `to_major`, so sums in SQL and in Python are exact.
+
+Python-side aggregation runs over int64 buffers (`array('q')`), using NumPy
+when it is installed. NumPy is optional.
+"""
+from array import array
+from decimal import Decimal
+from typing import Iterable, Optional
+from config import get_settings
+
+try:
+    import numpy
+except ImportError:  # optional; the pure-Python paths below are exact too
+    numpy = None
+
+# ISO 4217 currencies whose minor unit isn't 1/100 of the major unit.
+MINOR_UNIT_EXPONENTS = {
+    "BHD": 3, "IQD": 3, "JOD": 3, "KWD": 3, "LYD": 3, "OMR": 3, "TND": 3,
+    "BIF": 0, "CLP": 0, "DJF": 0, "GNF": 0, "ISK": 0, "JPY": 0, "KMF": 0, "KRW": 0,
+    "PYG": 0, "RWF": 0, "UGX": 0, "VND": 0, "VUV": 0, "XAF": 0, "XOF": 0, "XPF": 0,
+}
+
+
+# Minor-unit amounts are stored in BIGINT columns.
+MIN_MINOR = -2**63
+MAX_MINOR = 2**63 - 1
+
+
+def default_currency() -> str:
+    return get_settings().default_currency
+
+
+def exponent(currency: str) -> int:
+    return MINOR_UNIT_EXPONENTS.get(currency, 2)
+
+
+def to_minor(amount: Decimal, currency: str, rounding: Optional[str] = None) -> int:
+    """
+    Major-unit Decimal -> integer minor units. Sub-minor-unit precision raises
+    ValueError unless a `decimal` rounding mode (e.g. ROUND_CEILING) is given.
+    Amounts that don't fit a BIGINT raise ValueError too; with a rounding mode
+    (filter bounds) they are clamped instead, which matches the same rows.
+    """
+    # Checked before scaling: scaleb itself overflows for huge exponents.
+    low, high = to_major(MIN_MINOR, currency), to_major(MAX_MINOR, currency)
+    amount = Decimal(amount)
+    if rounding is not None:
+        amount = min(max(amount, low), high)
+    elif not low <= amount <= high:
+        raise ValueError(f"{currency} amounts must be between {low} and {high}")
+    scaled = amount.scaleb(exponent(currency))
+    if rounding is not None:
+        return int(scaled.to_integral_value(rounding=rounding))
+    if scaled != scaled.to_integral_value():
+        raise ValueError(f"{currency} amounts have at most {exponent(currency)} decimal places")
+    return int(scaled)
+
+
+def to_major(minor: int, currency: str) -> Decimal:
+    return Decimal(int(minor)).scaleb(-exponent(currency))
+
+
+def int64_buffer(values: Optional[Iterable[int]] = None) -> array:
+    return array("q", values or ())
+
+
+def column_sums(buffer: array, columns: int) -> list[int]:
+    """Sums each column of a row-major `columns`-wide int64 matrix stored flat in `buffer`."""
+    if not buffer:
+        return [0] * columns
+    if numpy is not None:
+        return numpy.frombuffer(buffer, dtype=numpy.int64).reshape(-1, columns).sum(axis=0).tolist()
+    return [sum(buffer[column::columns]) for column in range(columns)]
@@ -0,0 +1,97 @@
+# backend/partitions.py
+"""
+Monthly range partitioning of `expenses` on `date` (PostgreSQL only).
+
+On PostgreSQL `expenses` is a partitioned table with one partition per
+calendar month, named expenses_pYYYYMM, plus `expenses_default` for dates
+without one. Queries that bound `date` only touch the partitions in range,
+and newest-first pages read the newest partitions first. An archived month
+(see archive.py) is removed by dropping its partition instead of a DELETE,
+which leaves no dead rows or index bloat behind.
+
+PostgreSQL requires the partition key in the primary key, so there it is
+(id, date) and `date` is NOT NULL. Ids still come from one sequence, so they
+stay unique. SQLite has no partitioning: `expenses` stays a plain table and
+archive.py deletes archived months from it.
+
+The DDL lives here so the migration and archive.py can share it.
+"""
+import re
+from datetime import date as DateType
+from sqlalchemy import text
+
+DEFAULT_PARTITION = "expenses_default"
+MONTHS_AHEAD = 3  # future months kept partitioned (archive.py creates them as time passes)
+_NAME = re.compile(r"expenses_p(\d{4})(\d{2})")
+
+
+def add_months(month: DateType, months: int) -> DateType:
+    """First day of the month `months` after (or before, if negative) `month`'s."""
+    index = month.year * 12 + month.month - 1 + months
+    return DateType(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: DateType) -> str:
+    return f"expenses_p{month:%Y%m}"
+
+
+def is_partition(name: str) -> bool:
+    """True for the partitions of `expenses`, which autogenerate must ignore."""
+    return bool(name) and (name == DEFAULT_PARTITION or _NAME.fullmatch(name) is not None)
+
+
+def monthly_partitions(conn) -> dict[DateType, str]:
+    """The existing monthly partitions, by month."""
+    names = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'expenses'::regclass"
+    )).scalars()
+    months = {}
+    for name in names:
+        match = _NAME.fullmatch(name)
+        if match:
+            months[DateType(int(match[1]), int(match[2]), 1)] = name
+    return months
+
+
+def create_partition(conn, month: DateType) -> str:
+    """
+    Adds the partition for `month`. PostgreSQL refuses while the default
+    partition holds rows for that month, so those are moved across in the
+    same transaction.
+    """
+    name, start, end = partition_name(month), month, add_months(month, 1)
+    bounds = {"start": start, "end": end}
+    conn.execute(text("CREATE TEMP TABLE expenses_moving (LIKE expenses)"))
+    conn.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE date >= :start AND date < :end RETURNING *) "
+        "INSERT INTO expenses_moving SELECT * FROM moved"
+    ), bounds)
+    conn.execute(text(f"CREATE TABLE {name} PARTITION OF expenses FOR VALUES FROM ('{start}') TO ('{end}')"))
+    conn.execute(text("INSERT INTO expenses SELECT * FROM expenses_moving"))
+    conn.execute(text("DROP TABLE expenses_moving"))
+    return name
+
+
+def ensure_partitions(conn, first: DateType, last: DateType) -> list[str]:
+    """Creates the missing monthly partitions from `first`'s month through `last`'s."""
+    existing = monthly_partitions(conn)
+    created = []
+    month = first.replace(day=1)
+    while month <= last:
+        if month not in existing:
+            created.append(create_partition(conn, month))
+        month = add_months(month, 1)
+    return created
+
+
+def drop_partition(conn, month: DateType) -> None:
+    """
+    Detaches and drops `month`'s partition, rows and all. Rows inserted for
+    that month afterwards land in the default partition.
+    """
+    name = partition_name(month)
+    # DETACH briefly locks the parent; give up rather than queue behind long reads.
+    conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+    conn.execute(text(f"ALTER TABLE expenses DETACH PARTITION {name}"))
+    conn.execute(text(f"DROP TABLE {name}"))
@@ -0,0 +1,144 @@
+# backend/rollup.py
+"""
+Maintenance commands for the `expense_daily_rollups` table.
+
+    python rollup.py rebuild [--user-id ID]   # backfill / rebuild from raw expenses
+    python rollup.py check [--user-id ID]     # diff the rollup against raw expenses
+
+Days in archived months (see archive.py) are left alone by both: their raw
+expenses are no longer in `expenses`, and the rollup is all that analysis
+reads for them.
+"""
+import argparse
+import sys
+from datetime import date as DateType
+from typing import Optional
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import Expense, ExpenseArchive, ExpenseDailyRollup
+import money
+import partitions
+
+
+def hot_start(db: Session) -> Optional[DateType]:
+    """The first day after the newest archived month, or None if nothing is archived."""
+    newest = db.scalar(select(func.max(ExpenseArchive.month)))
+    return partitions.add_months(newest, 1) if newest is not None else None
+
+
+def _raw_totals_query(user_id: Optional[int], start: Optional[DateType] = None):
+    stmt = (
+        select(
+            Expense.user_id,
+            Expense.date,
+            Expense.category,
+            Expense.currency,
+            func.sum(Expense.amount_minor),
+            func.count(Expense.id),
+        )
+        .where(Expense.date.isnot(None))
+        .group_by(Expense.user_id, Expense.date, Expense.category, Expense.currency)
+    )
+    if user_id is not None:
+        stmt = stmt.where(Expense.user_id == user_id)
+    if start is not None:
+        stmt = stmt.where(Expense.date >= start)
+    return stmt
+
+
+def rebuild(db: Session, user_id: Optional[int] = None) -> int:
+    """Replaces the rollup rows (all, or one user's) with fresh aggregates in one transaction."""
+    start = hot_start(db)
+    clear = delete(ExpenseDailyRollup)
+    if user_id is not None:
+        clear = clear.where(ExpenseDailyRollup.user_id == user_id)
+    if start is not None:
+        clear = clear.where(ExpenseDailyRollup.day >= start)
+    db.execute(clear)
+    result = db.execute(
+        insert(ExpenseDailyRollup).from_select(
+            ["user_id", "day", "category", "currency", "total_minor", "count"],
+            _raw_totals_query(user_id, start),
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+
+def check(db: Session, user_id: Optional[int] = None) -> list[dict]:
+    """
+    Returns one entry per (user_id, day, category, currency) where the rollup
+    disagrees with `expenses`. Totals are integer minor units, so any
+    difference is a real one.
+    """
+    start = hot_start(db)
+    expected = {
+        (uid, day, category, currency): (int(total), count)
+        for uid, day, category, currency, total, count in db.execute(_raw_totals_query(user_id, start))
+    }
+    stmt = select(
+        ExpenseDailyRollup.user_id,
+        ExpenseDailyRollup.day,
+        ExpenseDailyRollup.category,
+        ExpenseDailyRollup.currency,
+        ExpenseDailyRollup.total_minor,
+        ExpenseDailyRollup.count,
+    )
+    if user_id is not None:
+        stmt = stmt.where(ExpenseDailyRollup.user_id == user_id)
+    if start is not None:
+        stmt = stmt.where(ExpenseDailyRollup.day >= start)
+    actual = {
+        (uid, day, category, currency): (int(total), count)
+        for uid, day, category, currency, total, count in db.execute(stmt)
+        # Rows whose expenses were all removed may linger at zero.
+        if count != 0 or total != 0
+    }
+
+    mismatches = []
+    for key in sorted(expected.keys() | actual.keys(), key=str):
+        want = expected.get(key, (0, 0))
+        got = actual.get(key, (0, 0))
+        if want != got:
+            uid, day, category, currency = key
+            mismatches.append({
+                "user_id": uid,
+                "day": day,
+                "category": category,
+                "currency": currency,
+                "expected_total": money.to_major(want[0], currency),
+                "rollup_total": money.to_major(got[0], currency),
+                "expected_count": want[1],
+                "rollup_count": got[1],
+            })
+    return mismatches
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            rows = rebuild(db, user_id=args.user_id)
+            print(f"Rebuilt {rows} rollup rows.")
+            return 0
+        mismatches = check(db, user_id=args.user_id)
+        for m in mismatches:
+            print(
+                f"user={m['user_id']} day={m['day']} category={m['category']} currency={m['currency']}: "
+                f"expected {m['expected_total']}/{m['expected_count']} "
+                f"got {m['rollup_total']}/{m['rollup_count']}"
+            )
+        print("Rollup is consistent." if not mismatches else f"{len(mismatches)} mismatched rows.")
+        return 1 if mismatches else 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
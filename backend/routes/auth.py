@@ -1,9 +1,10 @@
 # backend/routes/auth.py
 from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
-import crud
+from sqlalchemy.ext.asyncio import AsyncSession
+import async_crud
 import schemas
-from database import get_db
+from database import get_async_db
+import hashing
 from datetime import timedelta
 from auth_utils import create_access_token, get_current_user # ✅ Import
 import models # ✅ Import models
@@ -13,17 +14,17 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 @router.post("/register", response_model=schemas.RegisterResponse)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    existing = crud.get_user_by_email(db, email=user.email)
+async def register(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    existing = await async_crud.get_user_by_email(db, email=user.email)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    new_user = crud.create_user(db=db, user=user)
+    new_user = await async_crud.create_user(db=db, user=user)
     
     # ✅ Create a token for the new user
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": new_user.email}, expires_delta=access_token_expires
+        data={"sub": new_user.email, "uid": new_user.id}, expires_delta=access_token_expires
     )
     
     return {
@@ -35,16 +36,22 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
     }
 
 @router.post("/login") # ✅ This will be our token endpoint
-def login(credentials: schemas.LoginRequest, db: Session = Depends(get_db)):
-    existing = crud.get_user_by_email(db, email=credentials.email)
+async def login(credentials: schemas.LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    existing = await async_crud.get_user_by_email(db, email=credentials.email)
     
-    if not existing or not crud.verify_password(credentials.password, existing.password):
+    if not existing:
         raise HTTPException(status_code=401, detail="Invalid email or password")
+    valid, new_hash = await hashing.hasher.verify(credentials.password, existing.password)
+    if not valid:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    if new_hash:
+        # Stored hash uses an outdated cost factor; upgrade it transparently.
+        await async_crud.update_password_hash(db, existing, new_hash)
 
     # ✅ Create and return a token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": existing.email}, expires_delta=access_token_expires
+        data={"sub": existing.email, "uid": existing.id}, expires_delta=access_token_expires
     )
 
     return {
@@ -59,16 +66,16 @@ async def read_users_me(current_user: models.User = Depends(get_current_user)):
     return current_user
 
 # ... (your /verify-details and /reset-password routes are fine) ...
-router.post("/verify-details")
-def verify_user_for_reset(details: schemas.UserVerifyRequest, db: Session = Depends(get_db)):
-    user = crud.verify_user_details(db, details=details)
+@router.post("/verify-details")
+async def verify_user_for_reset(details: schemas.UserVerifyRequest, db: AsyncSession = Depends(get_async_db)):
+    user = await async_crud.verify_user_details(db, details=details)
     if not user:
         raise HTTPException(status_code=404, detail="User details do not match.")
     return {"message": "User verified successfully."}
 
 @router.post("/reset-password")
-def reset_password(request: schemas.PasswordResetRequest, db: Session = Depends(get_db)):
-    user = crud.update_user_password_by_email(
+async def reset_password(request: schemas.PasswordResetRequest, db: AsyncSession = Depends(get_async_db)):
+    user = await async_crud.update_user_password_by_email(
         db, 
         email=request.email, 
         new_password=request.new_password
@@ -1,10 +1,32 @@
-from fastapi import APIRouter
+# backend/routes/chatbot.py
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 from schemas import ChatRequest, ChatReply
+from ai import insights
+from ai.ai_model import get_ai_reply
+from auth_utils import get_current_user
+import models
 
 router = APIRouter(prefix="/chatbot", tags=["Chatbot"])
 
 @router.post("/", response_model=ChatReply)
-def chat_with_bot(request: ChatRequest):
-    # Simple placeholder logic
-    user_msg = request.message
-    return ChatReply(reply=f"Bot reply to: {user_msg}")
+async def chat_with_bot(
+    request: ChatRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Answer from the *currently authenticated* user's cached spending insights"""
+    model = await insights.load(db, current_user.id)
+    return ChatReply(reply=get_ai_reply(request.message, model.summary()))
+
+@router.get("/insights")
+async def get_insights(
+    currency: Optional[str] = Query(None, pattern="^[A-Za-z]{3}$", description="ISO 4217 code; defaults to the server's currency"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Month-end forecast, unusual recent expenses and goal projections the chatbot answers from"""
+    model = await insights.load(db, current_user.id, currency.upper() if currency else None)
+    return model.summary()
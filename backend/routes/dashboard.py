@@ -0,0 +1,109 @@
+# backend/routes/dashboard.py
+import asyncio
+from datetime import date as DateType
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.pool import StaticPool
+from config import get_settings
+import async_crud
+import etags
+import schemas
+import serialization
+import models
+from auth_utils import get_current_user, get_current_user_read_db
+from routes.expenses import MAX_PAGE_SIZE, currency_query, encode_cursor
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+DEFAULT_SECTIONS = ["expenses", "analysis", "goals"]
+DEFAULT_RECENT = 20
+FANOUT_WAIT_SECONDS = 0.1
+_NO_CONNECTION = object()
+
+
+def _spare_connections(engine) -> int:
+    pool = engine.pool
+    if isinstance(pool, StaticPool):
+        return 0  # one shared connection (in-memory SQLite); it can't be used concurrently
+    settings = get_settings()
+    return max(settings.db_pool_size + settings.db_max_overflow - pool.checkedout(), 0)
+
+
+async def _gather(db: AsyncSession, loaders: list) -> list:
+    """
+    Runs each `loader(session)`, concurrently where the pool of the request's
+    database (the primary or a read replica) has spare connections. The first
+    reuses the request's session, which is otherwise idle here. Every extra
+    connection is taken without waiting more than FANOUT_WAIT_SECONDS.
+    Holding one connection while blocking on more would deadlock once every
+    pool slot belongs to a waiting dashboard. Loaders that get no connection
+    run afterwards on the request's session.
+    """
+    extra = min(len(loaders) - 1, _spare_connections(db.bind))
+
+    async def own_session(loader):
+        async with AsyncSession(db.bind, autoflush=False, expire_on_commit=False) as session:
+            try:
+                await asyncio.wait_for(session.connection(), FANOUT_WAIT_SECONDS)
+            except (asyncio.TimeoutError, sa_exc.TimeoutError):
+                return _NO_CONNECTION
+            return await loader(session)
+
+    results = list(await asyncio.gather(loaders[0](db), *(own_session(loader) for loader in loaders[1:extra + 1])))
+    results += [_NO_CONNECTION] * (len(loaders) - len(results))
+    for i, result in enumerate(results):
+        if result is _NO_CONNECTION:
+            results[i] = await loaders[i](db)
+    return results
+
+
+@router.get("", response_model=schemas.DashboardResponse, response_model_exclude_unset=True)
+async def get_dashboard(
+    request: Request,
+    include: Optional[list[schemas.DashboardSection]] = Query(None, description="Sections to return (repeat); all by default"),
+    limit: int = Query(DEFAULT_RECENT, ge=1, le=MAX_PAGE_SIZE, description="Recent expenses to include"),
+    currency: Optional[str] = Depends(currency_query),
+    db: AsyncSession = Depends(get_current_user_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    The home screen in one round trip for the *currently authenticated*
+    user: recent expenses, the spending analysis and saving goals. The
+    sections are queried concurrently on separate connections. Like the
+    endpoints it replaces, the response carries an ETag (If-None-Match gives
+    a 304), is served from the result cache while the data is unchanged,
+    and honours Accept (application/msgpack) and Accept-Encoding (gzip, br).
+    """
+    sections = [section for section in DEFAULT_SECTIONS if section in (include or DEFAULT_SECTIONS)]
+    user_id = current_user.id
+
+    async def expenses(session: AsyncSession):
+        return await async_crud.get_expense_rows_page(db=session, user_id=user_id, limit=limit + 1)
+
+    async def analysis(session: AsyncSession):
+        return await async_crud.analyze_user_expenses(db=session, user_id=user_id, currency=currency)
+
+    async def goals(session: AsyncSession):
+        return await async_crud.get_goal_rows(db=session, user_id=user_id)
+
+    loaders = {"expenses": expenses, "analysis": analysis, "goals": goals}
+
+    async def build():
+        results = dict(zip(sections, await _gather(db, [loaders[section] for section in sections])))
+        headers = {}
+        page = results.get("expenses")
+        if page is not None:
+            if len(page) > limit:
+                page = page[:limit]
+                headers["X-Next-Cursor"] = encode_cursor(page[-1])
+            results["expenses"] = serialization.expenses(page)
+        if "goals" in results:
+            results["goals"] = serialization.goals(results["goals"])
+        return results, headers
+
+    # The analysis windows are relative to today, so the result changes at midnight too.
+    return await etags.conditional_response(
+        request, db, user_id, build, scope=DateType.today().isoformat(), negotiate=True
+    )
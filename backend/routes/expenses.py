@@ -1,29 +1,175 @@
 # backend/routes/expenses.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import get_db
-import crud
+import base64
+import csv
+import os
+import tempfile
+from datetime import date as DateType, timedelta
+from decimal import Decimal
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from database import get_async_db, read_session
+import async_crud
+import etags
+import exporters
+import importers
+import jobs
 import schemas
+import serialization
 import models # ✅ Import models
-from auth_utils import get_current_user # ✅ Import the dependency
+from auth_utils import get_current_user, get_current_user_read_db # ✅ Import the dependency
 
 router = APIRouter(prefix="/expenses", tags=["Expenses"])
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+MAX_IMPORT_BYTES = 50 * 1024 * 1024
+
+CategoryTotals = TypeAdapter(list[schemas.CategoryTotal])
+DailyTotals = TypeAdapter(list[schemas.DailyTotal])
+Analysis = TypeAdapter(dict)
+
+
+# Model attribute behind each sort key; amounts sort in integer minor units.
+SORT_ATTRIBUTES = {"date": "date", "amount": "amount_minor"}
+
+
+def encode_cursor(expense, sort: schemas.ExpenseSort = "-date") -> str:
+    key = getattr(expense, SORT_ATTRIBUTES[sort.lstrip("-")])
+    raw = f"{key.isoformat() if isinstance(key, DateType) else repr(key)}|{expense.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str, sort: schemas.ExpenseSort = "-date") -> tuple:
+    """Parses a cursor from `encode_cursor`; it is only valid for the sort it was made with."""
+    try:
+        key, expense_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        if sort.lstrip("-") == "date":
+            return DateType.fromisoformat(key), int(expense_id)
+        return int(key), int(expense_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def currency_query(
+    currency: Optional[str] = Query(None, pattern="^[A-Za-z]{3}$", description="ISO 4217 code; defaults to the server's currency"),
+) -> Optional[str]:
+    return currency.upper() if currency else None
+
+
+def expense_filters(
+    start: Optional[DateType] = Query(None, description="Earliest date (inclusive)"),
+    end: Optional[DateType] = Query(None, description="Latest date (inclusive)"),
+    category: Optional[list[str]] = Query(None, description="Repeat to match any of several categories"),
+    min_amount: Optional[Decimal] = Query(None, ge=0, description="In `currency`"),
+    max_amount: Optional[Decimal] = Query(None, ge=0, description="In `currency`"),
+    q: Optional[str] = Query(None, max_length=100, description="Words (or word prefixes) that must all appear in the description"),
+    sort: schemas.ExpenseSort = Query(
+        "-date", description="date or amount; prefix with - for descending. Amounts compare in minor units, so filter by `currency` too"
+    ),
+    currency: Optional[str] = Depends(currency_query),
+) -> schemas.ExpenseFilter:
+    return schemas.ExpenseFilter(
+        start=start, end=end, categories=category or [],
+        min_amount=min_amount, max_amount=max_amount, currency=currency, q=q, sort=sort,
+    )
+
+
+async def stream_expenses_ndjson(user_id: int, after: Optional[tuple], filters: schemas.ExpenseFilter):
+    # The stream outlives the request's dependencies, so it owns its session.
+    async with read_session(user_id) as db:
+        async for row in async_crud.iter_expenses_by_user(db, user_id=user_id, after=after, filters=filters):
+            yield schemas.ExpenseResponse.model_validate(row).model_dump_json() + "\n"
+
+
 # ❗️ This route is now protected.
 # We get the user from the token, not a URL parameter.
 @router.get("/", response_model=list[schemas.ExpenseResponse])
-def get_expenses_by_user(
-    db: Session = Depends(get_db), 
+async def get_expenses_by_user(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    format: Literal["json", "ndjson"] = "json",
+    filters: schemas.ExpenseFilter = Depends(expense_filters),
+    db: AsyncSession = Depends(get_current_user_read_db), 
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Get expenses for the *currently authenticated* user, newest first by default.
+    Filters (date range, categories, amount range, description search) run in SQL.
+    Pages are keyset-paginated: pass the X-Next-Cursor header back as `after`
+    with the same filters and sort.
+    `format=ndjson` streams every match (from `after`) one row per line.
+    JSON pages carry an ETag; send it back as If-None-Match to get a 304.
+    Pages honour Accept (application/msgpack) and Accept-Encoding (gzip, br).
+    """
+    keyset = decode_cursor(after, filters.sort) if after else None
+    if format == "ndjson":
+        return StreamingResponse(
+            stream_expenses_ndjson(current_user.id, keyset, filters),
+            media_type="application/x-ndjson",
+        )
+
+    async def build():
+        page = await async_crud.get_expense_rows_page(
+            db=db, user_id=current_user.id, limit=limit + 1, after=keyset, filters=filters
+        )
+        headers = {}
+        if len(page) > limit:
+            page = page[:limit]
+            headers["X-Next-Cursor"] = encode_cursor(page[-1], filters.sort)
+        return serialization.expenses(page), headers
+
+    return await etags.conditional_response(request, db, current_user.id, build, negotiate=True)
+
+async def stream_export(user_id: int, fmt: str, filters: schemas.ExpenseFilter):
+    async with read_session(user_id) as db:
+        rows = async_crud.iter_expenses_by_user(
+            db, user_id=user_id, batch_size=exporters.BATCH_SIZE, filters=filters
+        )
+        async for chunk in exporters.ENCODERS[fmt](exporters.batches(rows)):
+            if chunk:
+                yield chunk
+
+@router.get("/export")
+async def export_expenses(
+    format: Literal["csv", "ndjson", "parquet"] = "csv",
+    gzip: bool = Query(False, description="Compress the download on the fly (adds .gz)"),
+    filters: schemas.ExpenseFilter = Depends(expense_filters),
     current_user: models.User = Depends(get_current_user)
 ):
-    """Get all expenses for the *currently authenticated* user"""
-    return crud.get_expenses_by_user(db=db, user_id=current_user.id)
+    """
+    Download every matching expense of the *currently authenticated* user as
+    a CSV, NDJSON or Parquet file. Rows stream from a server-side cursor in
+    batches, so memory stays flat however large the history is. Takes the
+    same filters as GET /expenses/ (e.g. `start`/`end` for a date range).
+    """
+    if format == "parquet":
+        if not exporters.parquet_available():
+            raise HTTPException(status_code=501, detail="Parquet export needs the pyarrow package on the server")
+        if gzip:
+            raise HTTPException(status_code=400, detail="Parquet files are already compressed; drop gzip=true")
+
+    body = stream_export(current_user.id, format, filters)
+    filename = f"expenses-{DateType.today().isoformat()}.{format}"
+    media_type = exporters.MEDIA_TYPES[format]
+    if gzip:
+        body = exporters.gzip_stream(body)
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        body, media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 # ❗️ This route is now protected.
 @router.post("/", response_model=schemas.ExpenseResponse)
-def create_expense(
+async def create_expense(
     expense: schemas.ExpenseCreate, 
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_async_db), 
     current_user: models.User = Depends(get_current_user)
 ):
     """Create a new expense for the *currently authenticated* user"""
@@ -32,13 +178,107 @@ def create_expense(
     if expense.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to create expense for this user")
         
-    return crud.create_expense(db=db, expense=expense)
+    return await async_crud.create_expense(db=db, expense=expense)
+
+@router.delete("/{expense_id}", status_code=204)
+async def delete_expense(
+    expense_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Delete one of the *currently authenticated* user's expenses"""
+    if not await async_crud.delete_expense(db=db, expense_id=expense_id, user_id=current_user.id):
+        raise HTTPException(status_code=404, detail="Expense not found")
+
+@router.post("/bulk", response_model=schemas.BulkImportResult, responses={202: {"model": schemas.JobResponse}})
+async def bulk_import_expenses(
+    request: Request,
+    default_category: str = Query(importers.DEFAULT_CATEGORY, max_length=50, description="Category for OFX rows"),
+    background: bool = Query(False, description="Queue the import as a job and answer 202 with it"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Import many expenses for the *currently authenticated* user in one transaction.
+    The body is a JSON array (application/json), a CSV file with a header row
+    (text/csv) or an OFX bank statement (application/x-ofx). Invalid rows are
+    reported and skipped; valid rows are inserted in multi-row batches.
+    With `background=true` the upload is stored and imported by a job
+    (see /jobs); its result has the same shape as this response.
+    """
+    fmt = importers.detect_format(request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Send application/json, text/csv or application/x-ofx")
+    if background:
+        return await queue_bulk_import(request, db, current_user.id, fmt, default_category)
+
+    # Spool the upload (to disk past 1 MB) and parse it incrementally from there.
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as upload:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > MAX_IMPORT_BYTES:
+                raise HTTPException(status_code=413, detail="Import file is too large")
+            upload.write(chunk)
+        upload.seek(0)
+
+        if fmt == "json":
+            rows = importers.iter_json_rows(upload)
+        elif fmt == "csv":
+            rows = importers.iter_csv_rows(upload)
+        else:
+            rows = importers.iter_ofx_rows(upload, default_category)
+
+        inserted, failed, errors = 0, 0, []
+        while True:
+            try:
+                valid, row_errors, consumed = await run_in_threadpool(importers.next_batch, rows, current_user.id)
+            except (ValueError, csv.Error) as e:
+                raise HTTPException(status_code=400, detail=f"Could not parse {fmt} upload: {e}")
+            if not consumed:
+                break
+            failed += len(row_errors)
+            errors.extend(row_errors[:importers.MAX_REPORTED_ERRORS - len(errors)])
+            inserted += await async_crud.insert_expense_batch(db, valid)
+        await db.commit()
+
+    return schemas.BulkImportResult(inserted=inserted, failed=failed, errors=errors)
+
+async def queue_bulk_import(request: Request, db: AsyncSession, user_id: int, fmt: str, default_category: str):
+    storage_dir = jobs.runner.storage_dir
+    os.makedirs(storage_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix=f"import-{user_id}-", suffix=f".{fmt}", dir=storage_dir)
+    try:
+        with os.fdopen(fd, "wb") as upload:
+            size = 0
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > MAX_IMPORT_BYTES:
+                    raise HTTPException(status_code=413, detail="Import file is too large")
+                upload.write(chunk)
+        job = await jobs.enqueue(db, user_id, "bulk_import", {
+            "upload": path, "format": fmt, "default_category": default_category,
+        })
+    except BaseException:
+        os.remove(path)
+        raise
+    return JSONResponse(
+        status_code=202,
+        content=schemas.JobResponse.model_validate(job).model_dump(mode="json"),
+        headers={"Location": f"/jobs/{job.id}"},
+    )
 
 # ❗️ This route is now protected.
 @router.get("/analysis/{user_id}")
-def analyze_expenses(
+async def analyze_expenses(
     user_id: int, 
-    db: Session = Depends(get_db), 
+    request: Request,
+    weeks: int = Query(0, ge=0, le=52, description="Also return N trailing week totals"),
+    months: int = Query(0, ge=0, le=24, description="Also return N trailing month totals"),
+    daily_days: int = Query(0, ge=0, le=92, description="Also return per-day totals for the last N days"),
+    by_category: bool = Query(False, description="Also return a per-category breakdown"),
+    currency: Optional[str] = Depends(currency_query),
+    db: AsyncSession = Depends(get_current_user_read_db), 
     current_user: models.User = Depends(get_current_user)
 ):
     """Analyze weekly, monthly spending and behavioral savings pattern"""
@@ -46,4 +286,62 @@ def analyze_expenses(
     if user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to view this analysis")
 
-    return crud.analyze_user_expenses(db=db, user_id=user_id)
\ No newline at end of file
+    async def build():
+        analysis = await async_crud.analyze_user_expenses(
+            db=db,
+            user_id=user_id,
+            weeks=weeks,
+            months=months,
+            by_category=by_category,
+            daily_days=daily_days,
+            currency=currency,
+        )
+        return Analysis.dump_json(analysis), {}
+
+    # Windows are relative to today, so the result changes at midnight too.
+    return await etags.conditional_response(request, db, user_id, build, scope=DateType.today().isoformat())
+
+@router.get("/categories/{user_id}", response_model=list[schemas.CategoryTotal])
+async def category_totals(
+    user_id: int,
+    request: Request,
+    start: Optional[DateType] = None,
+    end: Optional[DateType] = None,
+    currency: Optional[str] = Depends(currency_query),
+    db: AsyncSession = Depends(get_current_user_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Spend per category between `start` and `end` (defaults to the current month)"""
+    if user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to view this analysis")
+    end = end or DateType.today()
+    start = start or end.replace(day=1)
+
+    async def build():
+        totals = await async_crud.get_category_totals(db=db, user_id=user_id, start=start, end=end, currency=currency)
+        return CategoryTotals.dump_json(CategoryTotals.validate_python(totals)), {}
+
+    return await etags.conditional_response(request, db, user_id, build, scope=f"{start}:{end}")
+
+
+@router.get("/trend/{user_id}", response_model=list[schemas.DailyTotal])
+async def daily_trend(
+    user_id: int,
+    request: Request,
+    days: int = Query(30, ge=1, le=366),
+    currency: Optional[str] = Depends(currency_query),
+    db: AsyncSession = Depends(get_current_user_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Daily spend for the last `days` days, oldest first"""
+    if user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to view this analysis")
+    end = DateType.today()
+
+    async def build():
+        trend = await async_crud.get_daily_trend(
+            db=db, user_id=user_id, start=end - timedelta(days=days - 1), end=end, currency=currency
+        )
+        return DailyTotals.dump_json(DailyTotals.validate_python(trend)), {}
+
+    return await etags.conditional_response(request, db, user_id, build, scope=end.isoformat())
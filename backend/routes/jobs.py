@@ -0,0 +1,51 @@
+# backend/routes/jobs.py
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+import async_crud
+import jobs
+import schemas
+import models
+from auth_utils import get_current_user
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+@router.post("", status_code=202, response_model=schemas.JobResponse)
+async def create_job(
+    job: schemas.JobCreate,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Queue a monthly statement or a full-history analysis recompute for the
+    *currently authenticated* user. Poll the Location header for progress.
+    """
+    try:
+        params = jobs.validate_params(job.kind, job.params)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    queued = await jobs.enqueue(db, current_user.id, job.kind, params)
+    response.headers["Location"] = f"/jobs/{queued.id}"
+    return queued
+
+@router.get("", response_model=list[schemas.JobResponse])
+async def list_jobs(
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """The *currently authenticated* user's most recent jobs, newest first"""
+    return await async_crud.list_jobs(db, current_user.id, limit)
+
+@router.get("/{job_id}", response_model=schemas.JobResponse)
+async def get_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Status, progress and (once finished) result or error of one job"""
+    job = await async_crud.get_job(db, job_id, current_user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
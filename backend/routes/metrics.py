@@ -0,0 +1,63 @@
+# backend/routes/metrics.py
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+import cache
+from database import async_pool_stats, get_async_engine, get_engine, get_replicas, pool_stats
+import hashing
+from instrumentation import render_prometheus
+import jobs
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+@router.get("", response_class=PlainTextResponse)
+def get_prometheus_metrics():
+    """
+    Per-route latency, per-request query count and DB time, slow queries,
+    plus the pool / cache / job stats below, in Prometheus text format
+    """
+    pool = get_pool_metrics()
+    return PlainTextResponse(
+        render_prometheus([
+            ("finance_db_pool", {"async": pool["async"], "sync": pool["sync"]}, "engine"),
+            ("finance_db_replica", pool.get("replicas", {}), "replica"),
+            ("finance_hashing", {"bcrypt": pool["hashing"]}, "pool"),
+            ("finance_cache", get_cache_metrics(), "cache"),
+            ("finance_jobs", {"runner": get_job_metrics()}, "scope"),
+        ]),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+@router.get("/pool")
+def get_pool_metrics():
+    """
+    Connection pool usage (checked-out / overflow connections, checkout waits),
+    read replica health and routing, and the bcrypt worker pool
+    """
+    replicas = get_replicas()
+    hasher = hashing.hasher
+    return {
+        "async": async_pool_stats.snapshot(get_async_engine().sync_engine),
+        "sync": pool_stats.snapshot(get_engine()),
+        "hashing": {
+            "workers": hasher.workers,
+            "in_flight": hasher.in_flight,
+            "max_in_flight": hasher.max_in_flight,
+            "rejected": hasher.rejected,
+        },
+        **({"replicas": replicas.stats()} if replicas is not None else {}),
+    }
+
+@router.get("/cache")
+def get_cache_metrics():
+    """Hit rate and size of the authenticated-user, response and chatbot insight caches, and the primary pins"""
+    return {
+        "users": cache.user_cache.stats(),
+        "results": cache.result_cache.stats(),
+        "insights": cache.insights_cache.stats(),
+        "pins": cache.primary_pins.stats(),
+    }
+
+@router.get("/jobs")
+def get_job_metrics():
+    """Background jobs this process is running and has finished (see jobs.py)"""
+    return jobs.runner.stats()
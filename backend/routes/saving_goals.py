@@ -1,44 +1,148 @@
 # backend/routes/saving_goals.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import get_db
-import crud
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+import async_crud
+import etags
 import schemas
+import serialization
+import models
+from auth_utils import get_current_user, get_current_user_read_db
 
 router = APIRouter(prefix="/goals", tags=["Saving Goals"])
 
+DEFAULT_HISTORY_SIZE = 50
+MAX_HISTORY_SIZE = 500
+
 @router.get("/user/{user_id}", response_model=list[schemas.SavingGoalResponse])
-def get_goals_for_user(user_id: int, db: Session = Depends(get_db)):
-    """✅ FIX: Fetch all saving goals for a *specific user*"""
-    return crud.get_goals_by_user(db=db, user_id=user_id)
+async def get_goals_for_user(
+    user_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_current_user_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """✅ FIX: Fetch all saving goals for the *currently authenticated* user"""
+    if user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    async def build():
+        return serialization.goals(await async_crud.get_goal_rows(db=db, user_id=user_id)), {}
+
+    return await etags.conditional_response(request, db, user_id, build, negotiate=True)
 
 @router.post("/", response_model=schemas.SavingGoalResponse)
-def add_goal(goal: schemas.SavingGoalCreate, db: Session = Depends(get_db)):
-    """✅ FIX: Add a new saving goal using a Pydantic schema"""
-    if not crud.get_user_by_id(db, user_id=goal.user_id):
-         raise HTTPException(status_code=404, detail="User not found")
-         
-    return crud.create_saving_goal(db=db, goal=goal)
+async def add_goal(
+    goal: schemas.SavingGoalCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """✅ FIX: Add a new saving goal for the *currently authenticated* user"""
+    if goal.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to create a goal for this user")
+
+    return await async_crud.create_saving_goal(db=db, goal=goal)
 
 @router.patch("/{goal_id}", response_model=schemas.SavingGoalResponse)
-def update_saved_amount(
+async def update_saved_amount(
     goal_id: int, 
     req: schemas.SavingGoalUpdate, 
-    user_id: int, # ✅ Add user_id as query param for security
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
 ):
     """
     ✅ BUG FIX: Update saved amount for a goal.
     This now SETS the amount, it does not ADD to it.
-    It also ensures the goal belongs to the user.
+    Only the *currently authenticated* user's goals can be updated.
+    Concurrent deposits from several devices can overwrite each other here;
+    use POST /goals/{goal_id}/contributions to add to the amount instead.
     """
-    updated_goal = crud.update_saving_goal_amount(
-        db=db, 
-        goal_id=goal_id, 
-        user_id=user_id, 
-        goal_update=req
-    )
+    try:
+        updated_goal = await async_crud.update_saving_goal_amount(
+            db=db, 
+            goal_id=goal_id, 
+            user_id=current_user.id, 
+            goal_update=req
+        )
+    except ValueError as e:  # more decimal places than the goal's currency has
+        raise HTTPException(status_code=422, detail=str(e))
     if not updated_goal:
         raise HTTPException(status_code=404, detail="Goal not found or user does not own goal")
     
-    return updated_goal
\ No newline at end of file
+    return updated_goal
+
+@router.delete("/{goal_id}", status_code=204)
+async def delete_goal(
+    goal_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Delete one of the *currently authenticated* user's goals."""
+    if not await async_crud.delete_saving_goal(db=db, goal_id=goal_id, user_id=current_user.id):
+        raise HTTPException(status_code=404, detail="Goal not found or user does not own goal")
+
+@router.post("/{goal_id}/contributions", status_code=201, response_model=schemas.GoalContributionResponse)
+async def add_contribution(
+    goal_id: int,
+    contribution: schemas.GoalContributionCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(
+        None, max_length=100, description="Send the same key when retrying; the deposit is applied once"
+    ),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Add money to one of the *currently authenticated* user's goals (a
+    negative amount withdraws). The saved amount is
+    incremented in SQL, so deposits made at the same time from several
+    devices all count. A retry carrying an Idempotency-Key that already
+    succeeded returns the original entry (200, Idempotent-Replayed: true).
+    """
+    try:
+        entry, replayed = await async_crud.add_goal_contribution(
+            db=db, goal_id=goal_id, user_id=current_user.id, contribution=contribution, idempotency_key=idempotency_key
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Goal not found or user does not own goal")
+    if replayed:
+        response.status_code = 200
+        response.headers["Idempotent-Replayed"] = "true"
+    return entry
+
+@router.get("/{goal_id}/contributions", response_model=list[schemas.GoalContributionResponse])
+async def get_contributions(
+    goal_id: int,
+    response: Response,
+    limit: int = Query(DEFAULT_HISTORY_SIZE, ge=1, le=MAX_HISTORY_SIZE),
+    after: Optional[int] = Query(None, description="X-Next-Cursor from the previous page"),
+    db: AsyncSession = Depends(get_current_user_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """A goal's contribution history from the ledger, newest first, one keyset page at a time."""
+    page = await async_crud.get_goal_contributions(
+        db=db, goal_id=goal_id, user_id=current_user.id, limit=limit + 1, after=after
+    )
+    if not page and after is None:
+        goal = await async_crud.get_goal_by_id(db, goal_id)
+        if goal is None or goal.user_id != current_user.id:
+            raise HTTPException(status_code=404, detail="Goal not found or user does not own goal")
+    if len(page) > limit:
+        page = page[:limit]
+        response.headers["X-Next-Cursor"] = str(page[-1].id)
+    return page
+
+@router.get("/{goal_id}/progress", response_model=schemas.GoalProgress)
+async def get_progress(
+    goal_id: int,
+    months: int = Query(12, ge=1, le=120, description="Calendar months of history, including this one"),
+    db: AsyncSession = Depends(get_current_user_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Saved vs target, contributions per month and the month the target is reached at the current pace."""
+    progress = await async_crud.get_goal_progress(db=db, goal_id=goal_id, user_id=current_user.id, months=months)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Goal not found or user does not own goal")
+    return progress
@@ -0,0 +1,53 @@
+# backend/routes/sync.py
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+import async_crud
+import etags
+import models
+import schemas
+from auth_utils import get_current_user
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+
+def parse_sync_token(token: Optional[str]) -> Optional[int]:
+    """Sync tokens are the user's data_version; anything unreadable means "start over"."""
+    try:
+        return int(token) if token else None
+    except ValueError:
+        return None
+
+
+@router.get("", response_model=schemas.SyncResponse)
+async def sync(
+    request: Request,
+    since: Optional[str] = Query(None, description="Token from the previous sync; omit for a full download"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Expenses and goals created, updated or deleted since `since`, for the
+    *currently authenticated* user. Apply `expenses` / `goals` as upserts and
+    `deleted` as removals, then store `token`. When `full` is true the response
+    is the whole state and the client should replace its copy.
+    """
+    since_version = parse_sync_token(since)
+
+    async def build():
+        changes = await async_crud.get_changes(db, current_user.id, since_version)
+        full = since_version is None
+        if not full and since_version > changes["token"]:
+            # Token from the future (restored database, other server): resync.
+            changes, full = await async_crud.get_changes(db, current_user.id, None), True
+        response = schemas.SyncResponse(
+            token=str(changes["token"]),
+            full=full,
+            expenses=[schemas.ExpenseResponse.model_validate(e) for e in changes["expenses"]],
+            goals=[schemas.SavingGoalResponse.model_validate(g) for g in changes["goals"]],
+            deleted=[schemas.SyncTombstone(entity=t.entity, id=t.row_id) for t in changes["deleted"]],
+        )
+        return response.model_dump_json().encode(), {}
+
+    return await etags.conditional_response(request, db, current_user.id, build)
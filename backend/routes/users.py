@@ -1,21 +1,56 @@
 # backend/routes/users.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import get_db
-import crud
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_read_db, get_async_user_read_db, read_session
+import async_crud
 import schemas
+import serialization
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+async def stream_users_ndjson():
+    # The stream outlives the request's dependencies, so it owns its session.
+    async with read_session() as db:
+        async for row in async_crud.iter_users(db):
+            yield schemas.UserResponse.model_validate(row).model_dump_json() + "\n"
+
+
 @router.get("/", response_model=list[schemas.UserResponse])
-def get_all_users(db: Session = Depends(get_db)):
-    """Fetch all users"""
-    return crud.get_all_users(db=db)
+async def get_all_users(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, description="X-Next-Cursor from the previous page"),
+    count: Literal["none", "estimate", "exact"] = Query("none", description="Also send X-Total-Count"),
+    format: Literal["json", "ndjson"] = "json",
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Fetch users ordered by id, one keyset page at a time (pass X-Next-Cursor back as `after`).
+    `format=ndjson` streams every user for export instead. Password hashes are never loaded.
+    Pages honour Accept (application/msgpack) and Accept-Encoding (gzip, br).
+    """
+    headers = {}
+    if count != "none":
+        headers["X-Total-Count"] = str(await async_crud.count_users(db, exact=count == "exact"))
+    if format == "ndjson":
+        return StreamingResponse(stream_users_ndjson(), media_type="application/x-ndjson", headers=headers)
+
+    page = await async_crud.get_users_page(db=db, limit=limit + 1, after=after)
+    if len(page) > limit:
+        page = page[:limit]
+        headers["X-Next-Cursor"] = str(page[-1].id)
+    return serialization.response(request, serialization.users(page), headers)
 
 @router.get("/{user_id}", response_model=schemas.UserResponse)
-def get_user(user_id: int, db: Session = Depends(get_db)):
+async def get_user(user_id: int, db: AsyncSession = Depends(get_async_user_read_db)):
     """Fetch user by ID"""
-    user = crud.get_user_by_id(db=db, user_id=user_id)
+    user = await async_crud.get_user_by_id(db=db, user_id=user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
\ No newline at end of file
+    return user
@@ -1,7 +1,40 @@
 # backend/schemas.py
-from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
-from datetime import date as DateType
+from pydantic import AfterValidator, BaseModel, BeforeValidator, Field, ConfigDict, PlainSerializer, model_validator
+from typing import Annotated, Literal, Optional
+from datetime import date as DateType, datetime, timezone
+from decimal import Decimal
+import money
+
+# Decimal major units on the way in, a JSON number on the way out; stored as
+# integer minor units (see money.py).
+Money = Annotated[Decimal, PlainSerializer(float, return_type=float, when_used="json")]
+Currency = Annotated[
+    str,
+    BeforeValidator(lambda v: v.strip().upper() if isinstance(v, str) else v),
+    Field(pattern="^[A-Z]{3}$", description="ISO 4217 code"),
+]
+# SQLite hands DateTime(timezone=True) columns back without their offset;
+# they are always written in UTC.
+UTCDateTime = Annotated[datetime, AfterValidator(lambda v: v if v.tzinfo else v.replace(tzinfo=timezone.utc))]
+
+_MISSING = object()
+
+def _from_minor_units(cls, data, fields: dict[str, str]):
+    """
+    Lets a response schema validate an ORM row or row dict that stores money
+    as integer minor units: each major-unit field in `fields` is filled from
+    its `*_minor` source, in the row's currency.
+    """
+    read = data.get if isinstance(data, dict) else (lambda name, default=None: getattr(data, name, default))
+    if all(read(minor, _MISSING) is _MISSING for minor in fields.values()):
+        return data
+    values = {name: read(name, _MISSING) for name in cls.model_fields}
+    values = {name: value for name, value in values.items() if value is not _MISSING}
+    currency = read("currency", None) or money.default_currency()
+    for major, minor in fields.items():
+        raw = read(minor, None)
+        values[major] = None if raw is None else money.to_major(raw, currency)
+    return values
 
 # ... (UserBase, UserCreate, UserResponse schemas are fine) ...
 class UserBase(BaseModel):
@@ -23,30 +56,175 @@ class UserResponse(UserBase):
 # ... (SavingGoal schemas are fine) ...
 class SavingGoalBase(BaseModel):
     title: str
-    target_amount: float
+    target_amount: Money
+    currency: Currency = Field(default_factory=money.default_currency)
     user_id: int
+
+    @model_validator(mode="after")
+    def _fits_minor_units(self):
+        money.to_minor(self.target_amount, self.currency)
+        return self
 class SavingGoalCreate(SavingGoalBase):
-    pass
+    def as_row(self) -> dict:
+        """Column values for models.SavingGoal."""
+        return {
+            **self.model_dump(exclude={"target_amount"}),
+            "target_amount_minor": money.to_minor(self.target_amount, self.currency),
+        }
 class SavingGoalUpdate(BaseModel):
-    saved_amount: float
+    saved_amount: Money
 class SavingGoalResponse(SavingGoalBase):
     id: int
-    saved_amount: float
+    saved_amount: Money
+    model_config = ConfigDict(from_attributes=True)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _major_units(cls, data):
+        return _from_minor_units(cls, data, {"target_amount": "target_amount_minor", "saved_amount": "saved_amount_minor"})
+class GoalContributionCreate(BaseModel):
+    amount: Money = Field(..., description="Negative to withdraw")
+    currency: Currency = Field(default_factory=money.default_currency, description="Must be the goal's currency")
+    note: Optional[str] = Field(None, max_length=255)
+
+    @model_validator(mode="after")
+    def _fits_minor_units(self):
+        if money.to_minor(self.amount, self.currency) == 0:
+            raise ValueError("amount must not be zero")
+        return self
+class GoalContributionResponse(BaseModel):
+    id: int
+    goal_id: int
+    kind: Literal["contribution", "adjustment"] = Field(..., description="adjustment: set through PATCH /goals/{goal_id}")
+    amount: Money
+    currency: str
+    saved_after: Money = Field(..., description="The goal's saved amount just after this entry")
+    note: Optional[str] = None
+    created_at: UTCDateTime
     model_config = ConfigDict(from_attributes=True)
 
+    @model_validator(mode="before")
+    @classmethod
+    def _major_units(cls, data):
+        return _from_minor_units(cls, data, {"amount": "amount_minor", "saved_after": "saved_after_minor"})
+class GoalProgressMonth(BaseModel):
+    month: str = Field(..., description="YYYY-MM")
+    contributed: float
+    count: int
+class GoalProgress(BaseModel):
+    goal_id: int
+    currency: str
+    target_amount: float
+    saved_amount: float
+    remaining: float
+    percent: float = Field(..., description="saved_amount as a percentage of target_amount")
+    months: list[GoalProgressMonth] = Field(..., description="Contributions per calendar month, oldest first")
+    average_monthly: float = Field(..., description="Mean of `months`")
+    projected_completion: Optional[str] = Field(
+        None, description="YYYY-MM the target is reached at average_monthly; null if nothing is being saved"
+    )
+
 # ... (Expense schemas are fine) ...
 class ExpenseBase(BaseModel):
   category: str
-  amount: float
+  amount: Money
+  currency: Currency = Field(default_factory=money.default_currency)
   date: Optional[DateType] = Field(default_factory=DateType.today) 
   user_id: int
   description: Optional[str] = None
+
+  @model_validator(mode="after")
+  def _fits_minor_units(self):
+      money.to_minor(self.amount, self.currency)
+      return self
 class ExpenseCreate(ExpenseBase):
-    pass
+    def as_row(self) -> dict:
+        """Column values for models.Expense."""
+        return {**self.model_dump(exclude={"amount"}), "amount_minor": money.to_minor(self.amount, self.currency)}
 class ExpenseResponse(ExpenseBase):
     id: int
     model_config = ConfigDict(from_attributes=True)
 
+    @model_validator(mode="before")
+    @classmethod
+    def _major_units(cls, data):
+        return _from_minor_units(cls, data, {"amount": "amount_minor"})
+
+ExpenseSort = Literal["-date", "date", "-amount", "amount"]
+
+class ExpenseFilter(BaseModel):
+    start: Optional[DateType] = None
+    end: Optional[DateType] = None
+    categories: list[str] = []
+    min_amount: Optional[Decimal] = None
+    max_amount: Optional[Decimal] = None
+    currency: Optional[str] = None
+    q: Optional[str] = None
+    sort: ExpenseSort = "-date"
+
+class BulkRowError(BaseModel):
+    row: int
+    error: str
+
+class BulkImportResult(BaseModel):
+    inserted: int
+    failed: int
+    errors: list[BulkRowError]
+
+class CategoryTotal(BaseModel):
+    category: str
+    total: float
+    count: int
+
+class DailyTotal(BaseModel):
+    date: DateType
+    total: float
+    count: int
+
+class SyncTombstone(BaseModel):
+    entity: Literal["expense", "goal"]
+    id: int
+
+class SyncResponse(BaseModel):
+    token: str = Field(..., description="Pass back as `since` on the next sync")
+    full: bool = Field(..., description="True when this is the complete state rather than a delta")
+    expenses: list[ExpenseResponse]
+    goals: list[SavingGoalResponse]
+    deleted: list[SyncTombstone]
+
+# ---------- DASHBOARD SCHEMAS ----------
+DashboardSection = Literal["expenses", "analysis", "goals"]
+
+class DashboardResponse(BaseModel):
+    """Only the requested sections are present."""
+    expenses: Optional[list[ExpenseResponse]] = Field(
+        None, description="Newest first; pass the X-Next-Cursor header to GET /expenses/ as `after` for more"
+    )
+    analysis: Optional[dict] = Field(None, description="Same as GET /expenses/analysis/{user_id}")
+    goals: Optional[list[SavingGoalResponse]] = None
+
+# ---------- JOB SCHEMAS ----------
+JobKind = Literal["monthly_statement", "recompute_analysis"]
+
+class JobCreate(BaseModel):
+    kind: JobKind
+    params: dict = Field(default_factory=dict, description="Kind-specific, e.g. {\"month\": \"2025-10\"} for monthly_statement")
+
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    progress: float = Field(..., description="0 to 1")
+    message: Optional[str] = None
+    attempts: int
+    max_attempts: int
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    model_config = ConfigDict(from_attributes=True)
+
 # ... (Chatbot schemas are fine) ...
 class ChatRequest(BaseModel):
     message: str = Field(..., description="User message for chatbot")
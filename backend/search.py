@@ -0,0 +1,93 @@
+# backend/search.py
+"""
+Full-text search over `Expense.description`.
+
+Postgres uses a GIN index on `to_tsvector('simple', coalesce(description, ''))`
+and prefix tsqueries (`coffee:* & shop:*`). SQLite uses an external-content
+FTS5 table, `expenses_fts`, kept in sync with `expenses` by triggers. Any
+other dialect falls back to one ILIKE per search term.
+
+The DDL lives here so migrations can share it. Batch migrations on SQLite
+rebuild `expenses` by copying it, which drops its triggers. Any migration
+that does this must run `SQLITE_TRIGGERS` again afterwards.
+"""
+import re
+from typing import Optional
+from sqlalchemy import and_, column, func, literal_column, select, table, true
+from models import Expense
+
+_TERM = re.compile(r"[^\W_]+")
+
+# Not part of models.Base.metadata: Alembic can't express either object.
+FTS_TABLE = "expenses_fts"
+FTS_INDEX = "ix_expenses_description_fts"
+expenses_fts = table(FTS_TABLE, column("rowid"), column(FTS_TABLE))
+
+POSTGRES_DDL = [
+    f"CREATE INDEX {FTS_INDEX} ON expenses USING gin (to_tsvector('simple'::regconfig, coalesce(description, '')))",
+]
+POSTGRES_DROP = [f"DROP INDEX IF EXISTS {FTS_INDEX}"]
+
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(description, content='expenses', content_rowid='id')",
+]
+SQLITE_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS expenses_fts_ai",
+    "DROP TRIGGER IF EXISTS expenses_fts_ad",
+    "DROP TRIGGER IF EXISTS expenses_fts_au",
+    f"""CREATE TRIGGER expenses_fts_ai AFTER INSERT ON expenses BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, description) VALUES (new.id, new.description);
+    END""",
+    f"""CREATE TRIGGER expenses_fts_ad AFTER DELETE ON expenses BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description) VALUES ('delete', old.id, old.description);
+    END""",
+    f"""CREATE TRIGGER expenses_fts_au AFTER UPDATE OF description ON expenses BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description) VALUES ('delete', old.id, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, description) VALUES (new.id, new.description);
+    END""",
+    # Re-index from `expenses`, e.g. after the table was rebuilt without triggers.
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS expenses_fts_au",
+    "DROP TRIGGER IF EXISTS expenses_fts_ad",
+    "DROP TRIGGER IF EXISTS expenses_fts_ai",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def is_search_object(name: str) -> bool:
+    """True for the objects above (and FTS5's shadow tables), which autogenerate must ignore."""
+    return bool(name) and (name.startswith(FTS_TABLE) or name == FTS_INDEX)
+
+
+def search_terms(q: str) -> list[str]:
+    """Lower-cased word tokens; punctuation and FTS/tsquery operators are dropped."""
+    return _TERM.findall(q.lower())
+
+
+def text_matches(q: str, description: Optional[str]) -> bool:
+    """`description_matches` for one description in Python (archived rows, see archive.py)."""
+    words = search_terms(description or "")
+    return all(any(word.startswith(term) for word in words) for term in search_terms(q))
+
+
+def description_matches(dialect: str, q: str):
+    """WHERE clause matching expenses whose description contains every term of `q` as a word prefix."""
+    terms = search_terms(q)
+    if not terms:
+        return true()
+    if dialect == "postgresql":
+        # Constants are inlined so the expression matches the index even under generic plans.
+        document = func.to_tsvector(
+            literal_column("'simple'::regconfig"),
+            func.coalesce(Expense.description, literal_column("''")),
+        )
+        query = func.to_tsquery(literal_column("'simple'::regconfig"), " & ".join(f"{t}:*" for t in terms))
+        return document.op("@@")(query)
+    if dialect == "sqlite":
+        match = " ".join(f'"{t}"*' for t in terms)
+        return Expense.id.in_(
+            select(expenses_fts.c.rowid).where(expenses_fts.c[FTS_TABLE].op("MATCH")(match))
+        )
+    return and_(*(Expense.description.ilike(f"%{t}%") for t in terms))
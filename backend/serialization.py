@@ -0,0 +1,218 @@
+# backend/serialization.py
+"""
+Fast encoding for the list endpoints (`/expenses/`, `/goals/user/{id}`,
+`/users/`, `/dashboard`).
+
+Those routes select plain column tuples (`crud.EXPENSE_COLUMNS`,
+`GOAL_COLUMNS`, `USER_PUBLIC_COLUMNS`) and turn each one directly into
+JSON-ready values here. No ORM objects are built, and no response model
+validates rows that came from our own database. The output matches the
+`schemas` response models field for field, so those stay the documented
+shape in OpenAPI.
+
+Bodies are negotiated per request:
+  Accept           application/json (the default) or application/msgpack
+  Accept-Encoding  gzip, or br, for bodies of at least MIN_COMPRESS_BYTES
+
+JSON is encoded with orjson when it is installed, and with the stdlib
+otherwise. MessagePack needs msgpack and brotli needs brotli. All three are
+optional; a representation the server can't produce is simply not offered.
+"""
+import json
+import zlib
+from datetime import date as DateType, datetime
+from typing import NamedTuple, Optional
+from fastapi import Request, Response
+import money
+
+try:
+    import orjson
+except ImportError:  # optional; stdlib json gives the same output, slower
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional; clients then get JSON
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # optional; clients then get gzip
+    brotli = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+# Accept values that ask for MessagePack; there is no single registered type.
+MSGPACK_ALIASES = (MSGPACK, "application/x-msgpack", "application/vnd.msgpack")
+
+# Smaller bodies fit in a packet or two either way; compressing them only costs CPU.
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+# Quality 11 is for static assets; 4 is about as fast as gzip -6 and still smaller.
+BROTLI_QUALITY = 4
+
+VARY = "Accept, Accept-Encoding"
+
+
+class Representation(NamedTuple):
+    media_type: str = JSON
+    encoding: Optional[str] = None  # "gzip", "br" or None for identity
+
+    @property
+    def key(self) -> str:
+        """Distinguishes the representation in ETags and cache keys."""
+        return f"{self.media_type};{self.encoding or 'identity'}"
+
+
+# ----------------------------
+# Rows -> JSON-ready values
+# ----------------------------
+_SCALES: dict[str, int] = {}
+
+
+def major(minor: int, currency: str) -> float:
+    """Minor units -> the float `schemas.Money` serializes (int / int division rounds exactly once)."""
+    scale = _SCALES.get(currency)
+    if scale is None:
+        scale = _SCALES[currency] = 10 ** money.exponent(currency)
+    return minor / scale
+
+
+def expenses(rows) -> list[dict]:
+    """`crud.EXPENSE_COLUMNS` rows -> ExpenseResponse dicts."""
+    return [
+        {
+            "category": category,
+            "amount": major(amount_minor, currency),
+            "currency": currency,
+            "date": day.isoformat() if day is not None else None,
+            "user_id": user_id,
+            "description": description,
+            "id": expense_id,
+        }
+        for expense_id, user_id, category, amount_minor, currency, description, day in rows
+    ]
+
+
+def goals(rows) -> list[dict]:
+    """`crud.GOAL_COLUMNS` rows -> SavingGoalResponse dicts."""
+    return [
+        {
+            "title": title,
+            "target_amount": major(target_minor, currency),
+            "currency": currency,
+            "user_id": user_id,
+            "id": goal_id,
+            "saved_amount": major(saved_minor, currency),
+        }
+        for goal_id, user_id, title, target_minor, saved_minor, currency in rows
+    ]
+
+
+def users(rows) -> list[dict]:
+    """`crud.USER_PUBLIC_COLUMNS` rows -> UserResponse dicts."""
+    return [
+        {
+            "name": name,
+            "email": email,
+            "id": user_id,
+            "date_of_birth": date_of_birth.isoformat() if date_of_birth is not None else None,
+            "age": age,
+            "gender": gender,
+        }
+        for user_id, name, email, date_of_birth, age, gender in rows
+    ]
+
+
+# ----------------------------
+# Negotiation and encoding
+# ----------------------------
+def _preferences(header: Optional[str]) -> dict[str, float]:
+    """Parses an Accept or Accept-Encoding header into {value: q}."""
+    preferences = {}
+    for part in (header or "").split(","):
+        value, *params = part.split(";")
+        value = value.strip().lower()
+        if not value:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, raw = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(raw)
+                except ValueError:
+                    q = 0.0
+        preferences[value] = max(q, preferences.get(value, 0.0))
+    return preferences
+
+
+def media_type(accept: Optional[str]) -> str:
+    if msgpack is None or not accept:
+        return JSON
+    preferences = _preferences(accept)
+
+    def quality(candidates: tuple) -> float:
+        for candidate in (*candidates, "application/*", "*/*"):
+            if candidate in preferences:
+                return preferences[candidate]
+        return 0.0
+
+    # Ties (including */*) go to JSON.
+    return MSGPACK if quality(MSGPACK_ALIASES) > quality((JSON,)) else JSON
+
+
+def content_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    if not accept_encoding:
+        return None
+    preferences = _preferences(accept_encoding)
+    wildcard = preferences.get("*", 0.0)
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_q = None, 0.0
+    for encoding in offered:
+        q = preferences.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def negotiate(request: Request) -> Representation:
+    return Representation(media_type(request.headers.get("accept")), content_encoding(request.headers.get("accept-encoding")))
+
+
+def _default(value):
+    """Dates (e.g. in analysis windows) encode as ISO strings, as orjson and Pydantic do."""
+    if isinstance(value, (DateType, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not serializable")
+
+
+def dumps(data, media: str = JSON) -> bytes:
+    if media == MSGPACK:
+        return msgpack.packb(data, default=_default)
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    return compressor.compress(body) + compressor.flush()
+
+
+def render(data, representation: Representation, headers: Optional[dict] = None) -> tuple[bytes, dict]:
+    """Encodes `data`; returns the body and its headers (Content-Type, Vary, maybe Content-Encoding)."""
+    body = dumps(data, representation.media_type)
+    headers = {**(headers or {}), "Content-Type": representation.media_type, "Vary": VARY}
+    if representation.encoding and len(body) >= MIN_COMPRESS_BYTES:
+        body = compress(body, representation.encoding)
+        headers["Content-Encoding"] = representation.encoding
+    return body, headers
+
+
+def response(request: Request, data, headers: Optional[dict] = None) -> Response:
+    """`data` as the representation `request` negotiates, for routes without an ETag."""
+    body, headers = render(data, negotiate(request), headers)
+    return Response(content=body, headers=headers)
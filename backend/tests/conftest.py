@@ -0,0 +1,69 @@
+# backend/tests/conftest.py
+"""
+Shared fixtures. Each test gets a scratch SQLite database migrated to head
+and builds the app from Settings that point at it (see main.create_app),
+with bcrypt and jobs running inline.
+
+    cd backend && python -m pytest -q
+"""
+import os
+import sys
+from contextlib import contextmanager
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from config import Settings, use_settings  # noqa: E402
+
+
+def migrate(url: str) -> None:
+    """Runs `alembic upgrade head` against `url`."""
+    engine = create_engine(url)
+    try:
+        with engine.begin() as conn:
+            cfg = Config(os.path.join(BACKEND, "alembic.ini"))
+            cfg.set_main_option("script_location", os.path.join(BACKEND, "migrations"))
+            cfg.attributes["connection"] = conn
+            command.upgrade(cfg, "head")
+    finally:
+        engine.dispose()
+
+
+@contextmanager
+def running(settings: Settings):
+    """A TestClient for create_app(settings), with the lifespan (engines, job runner) running."""
+    from fastapi.testclient import TestClient
+    from main import create_app
+    with TestClient(create_app(settings)) as client:
+        yield client
+
+
+def register(client, email: str = "ann@example.com") -> int:
+    """Registers a user, authenticates `client` as them and returns their id."""
+    response = client.post("/auth/register", json={"name": email.split("@")[0], "email": email, "password": "pw"})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    client.headers["Authorization"] = f"Bearer {body['access_token']}"
+    return body["user"]["id"]
+
+
+@pytest.fixture
+def settings(tmp_path) -> Settings:
+    settings = Settings.from_env().model_copy(update=dict(
+        database_url=f"sqlite:///{tmp_path / 'primary.db'}",
+        database_replica_urls=[],
+        result_cache_url="",
+        bcrypt_rounds=4,
+        hash_workers=0,
+        job_workers=0,
+        job_storage_dir=str(tmp_path / "jobs"),
+        archive_dir=str(tmp_path / "archive"),
+    ))
+    use_settings(settings)
+    migrate(settings.database_url)
+    return settings
@@ -0,0 +1,59 @@
+# backend/tests/test_goal_contributions.py
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from conftest import register, running
+
+REQUESTS = 24
+AMOUNT = 1.25
+
+
+def _key(i: int):
+    """Every 4th request replays one key, every 4th has none, the rest have their own."""
+    return {0: "replayed", 1: None}.get(i % 4, f"key-{i}")
+
+
+def test_concurrent_contributions_apply_each_key_once(settings):
+    with running(settings) as client:
+        user_id = register(client)
+        goal = client.post("/goals/", json={"title": "Trip", "target_amount": 1000, "user_id": user_id}).json()
+        url = f"/goals/{goal['id']}/contributions"
+
+        def contribute(i):
+            key = _key(i)
+            return client.post(url, json={"amount": AMOUNT}, headers={"Idempotency-Key": key} if key else {})
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            responses = list(pool.map(contribute, range(REQUESTS)))
+
+        assert all(r.status_code in (200, 201) for r in responses), [r.text for r in responses]
+        replays = [r for i, r in enumerate(responses) if _key(i) == "replayed"]
+        assert sorted(r.status_code for r in replays) == [200] * (len(replays) - 1) + [201]
+        assert all(r.headers.get("Idempotent-Replayed") == "true" for r in replays if r.status_code == 200)
+        assert len({r.json()["id"] for r in replays}) == 1
+        created = {r.json()["created_at"] for r in replays}
+        assert len(created) == 1
+        assert datetime.fromisoformat(created.pop()).utcoffset() is not None
+
+        applied = len({_key(i) for i in range(REQUESTS)} - {None}) + sum(_key(i) is None for i in range(REQUESTS))
+        ledger = client.get(url, params={"limit": 100}).json()
+        assert len(ledger) == applied
+        assert sum(1 for entry in ledger if entry["amount"] == AMOUNT) == applied
+        goals = client.get(f"/goals/user/{user_id}").json()
+        assert goals[0]["saved_amount"] == applied * AMOUNT
+        assert ledger[0]["saved_after"] == applied * AMOUNT
+
+
+def test_replay_with_a_different_amount_is_refused(settings):
+    with running(settings) as client:
+        user_id = register(client)
+        goal = client.post("/goals/", json={"title": "Trip", "target_amount": 1000, "user_id": user_id}).json()
+        url = f"/goals/{goal['id']}/contributions"
+
+        first = client.post(url, json={"amount": 5}, headers={"Idempotency-Key": "k"})
+        again = client.post(url, json={"amount": 5}, headers={"Idempotency-Key": "k"})
+        other = client.post(url, json={"amount": 7}, headers={"Idempotency-Key": "k"})
+
+        assert first.status_code == 201
+        assert again.status_code == 200 and again.json() == first.json()
+        assert other.status_code == 422
+        assert client.get(f"/goals/user/{user_id}").json()[0]["saved_amount"] == 5
@@ -0,0 +1,79 @@
+# backend/tests/test_query_plans.py
+"""
+check_query_plans.py as a test: EXPLAINs each hot crud query on a migrated,
+seeded database and asserts it is served by the expected index.
+
+Runs on a scratch SQLite file. The PostgreSQL cases (including partition
+pruning) only run when DATABASE_URL is a PostgreSQL URL, which they migrate
+and seed, so point it at a disposable database.
+"""
+import os
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+import check_query_plans as plans
+from conftest import migrate
+from config import Settings, use_settings
+
+POSTGRES_URL = os.environ.get("DATABASE_URL", "")
+BACKENDS = [
+    "sqlite",
+    pytest.param("postgresql", marks=pytest.mark.skipif(
+        not POSTGRES_URL.startswith("postgresql"), reason="DATABASE_URL is not a PostgreSQL database"
+    )),
+]
+HOT_QUERIES = {label: (index, ordered) for label, _, index, ordered in plans._hot_queries(0)}
+PRUNED_QUERIES = [label for label, *_ in plans._pruned_queries(0)]
+
+
+@pytest.fixture(scope="module", params=BACKENDS)
+def seeded(request, tmp_path_factory):
+    """(engine, session, user id) on a database migrated to head and seeded by check_query_plans."""
+    if request.param == "sqlite":
+        url = f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}"
+    else:
+        url = POSTGRES_URL
+    use_settings(Settings.from_env().model_copy(update={"database_url": url, "database_replica_urls": []}))
+    migrate(url)
+    engine = create_engine(url)
+    with Session(bind=engine) as db:
+        user_id = plans._seed(db)
+        if engine.dialect.name == "postgresql":
+            # Tiny tables make sequential scans and sorts cheapest; we only care whether an index *can* serve the query.
+            db.execute(text("SET enable_seqscan = off"))
+            db.execute(text("SET enable_sort = off"))
+        yield engine, db, user_id
+    engine.dispose()
+
+
+def _call(queries, label: str):
+    return next(call for name, call, *_ in queries if name == label)
+
+
+@pytest.mark.parametrize("label", HOT_QUERIES)
+def test_hot_query_uses_index(seeded, label):
+    engine, db, user_id = seeded
+    index, ordered = HOT_QUERIES[label]
+    captured = plans._captured(engine, db, _call(plans._hot_queries(user_id), label))
+    conn = db.connection()
+    explained = [plans._explain(conn, statement, params) for statement, params in captured]
+    assert explained, f"{label} ran no SELECT"
+    for plan in explained:
+        assert not plans._problems(plan, engine.dialect.name, ordered), plan
+    if index:
+        # The index has to serve one of the call's statements (others read e.g. the archive catalog).
+        names = plans._index_names(conn, index)
+        assert any(name in plan for plan in explained for name in names), "\n\n".join(explained)
+
+
+@pytest.mark.parametrize("label", PRUNED_QUERIES)
+def test_date_bounded_query_is_pruned(seeded, label):
+    engine, db, user_id = seeded
+    if engine.dialect.name != "postgresql":
+        pytest.skip("expenses are only partitioned on PostgreSQL")
+    _, call, first, last = next(q for q in plans._pruned_queries(user_id) if q[0] == label)
+    conn = db.connection()
+    allowed = plans._allowed_partitions(conn, first, last)
+    for statement, params in plans._captured(engine, db, call):
+        plan = plans._explain(conn, statement, params)
+        assert set(plans.PARTITION_SCAN.findall(plan)) <= allowed, plan
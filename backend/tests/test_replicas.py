@@ -0,0 +1,120 @@
+# backend/tests/test_replicas.py
+"""
+Read/write splitting (database.read_session) with two SQLite files standing
+in for the replicas. "Replication" is a copy of the primary file, so a write
+made afterwards is only on the primary. A replica under a directory that
+does not exist can't be opened, which is how these tests take one down.
+"""
+import os
+import sqlite3
+import pytest
+import cache
+import database
+from conftest import register, running
+
+READS = 6
+
+
+def _replicate(settings, url: str) -> None:
+    source = sqlite3.connect(settings.database_url.removeprefix("sqlite:///"))
+    target = sqlite3.connect(url.removeprefix("sqlite:///"))
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+
+
+@pytest.fixture
+def user(settings):
+    """(Authorization header, id) of a user registered on the primary before any replica is copied."""
+    with running(settings) as client:
+        user_id = register(client)
+        return client.headers["Authorization"], user_id
+
+
+@pytest.fixture
+def replica_url(settings, tmp_path):
+    """replica_url(name) copies the primary to a new replica; replica_url(name, up=False) is one that can't be opened."""
+    def make(name: str, up: bool = True) -> str:
+        if not up:
+            return f"sqlite:///{tmp_path / 'missing' / name}.db"
+        url = f"sqlite:///{tmp_path / name}.db"
+        _replicate(settings, url)
+        return url
+    return make
+
+
+def _with_replicas(settings, *urls: str, **overrides):
+    # No periodic health checks during a test: only the one at startup.
+    return settings.model_copy(update=dict(database_replica_urls=list(urls), replica_check_seconds=3600, **overrides))
+
+
+def _read(client, user_id: int) -> list[dict]:
+    response = client.get("/expenses/", params={"user_id": user_id})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_reads_go_to_the_replicas(settings, user, replica_url):
+    token, user_id = user
+    with running(_with_replicas(settings, replica_url("r0"), replica_url("r1"))) as client:
+        client.headers["Authorization"] = token
+        for _ in range(READS):
+            _read(client, user_id)
+        replicas = database.get_replicas()
+        assert replicas.primary_reads == 0
+        assert all(replica.reads > 0 and replica.healthy for replica in replicas.replicas)
+
+
+def test_reads_stay_on_the_primary_after_a_write(settings, user, replica_url):
+    token, user_id = user
+    with running(_with_replicas(settings, replica_url("r0"), replica_url("r1"), replica_pin_seconds=60)) as client:
+        client.headers["Authorization"] = token
+        created = client.post("/expenses/", json={"category": "Food", "amount": 12.5, "user_id": user_id})
+        assert created.status_code == 200, created.text
+        replicas = database.get_replicas()
+        replica_reads = sum(replica.reads for replica in replicas.replicas)
+
+        assert [e["id"] for e in _read(client, user_id)] == [created.json()["id"]]
+        assert replicas.primary_reads > 0
+        assert sum(replica.reads for replica in replicas.replicas) == replica_reads
+
+        # Once the pin expires reads go back to the replicas, which never got the write.
+        cache.primary_pins.invalidate(str(user_id))
+        assert _read(client, user_id) == []
+
+
+def test_an_unhealthy_replica_is_taken_out(settings, user, replica_url):
+    token, user_id = user
+    down = replica_url("r1", up=False)
+    with running(_with_replicas(settings, replica_url("r0"), down)) as client:
+        client.headers["Authorization"] = token
+        for _ in range(READS):
+            _read(client, user_id)
+        replicas = database.get_replicas()
+        up, broken = replicas.replicas
+        assert not broken.healthy and broken.failures > 0 and broken.error
+        assert broken.reads == 0
+        assert up.healthy and up.reads + replicas.primary_reads >= READS
+
+        # Once it can be opened, the next health check puts it back.
+        path = down.removeprefix("sqlite:///")
+        os.makedirs(os.path.dirname(path))
+        _replicate(settings, down)
+        client.portal.call(replicas.check, broken)
+        assert broken.healthy and broken.error is None
+        for _ in range(READS):
+            _read(client, user_id)
+        assert broken.reads > 0
+
+
+def test_reads_fail_over_to_the_primary(settings, user, replica_url):
+    token, user_id = user
+    with running(_with_replicas(settings, replica_url("r0", up=False), replica_url("r1", up=False))) as client:
+        client.headers["Authorization"] = token
+        for _ in range(READS):
+            _read(client, user_id)
+        replicas = database.get_replicas()
+        assert not any(replica.healthy or replica.reads for replica in replicas.replicas)
+        assert replicas.primary_reads >= READS
@@ -7,7 +7,7 @@ import React, {
   useEffect,
   useState
 } from "react";
-import api from "../api/api";
+import api, { fetchAllPages } from "../api/api";
 import { useAuth } from "./AuthContext";
 
 export type Expense = {
@@ -39,8 +39,7 @@ export const ExpenseProvider: React.FC<{ children: ReactNode }> = ({ children })
     }
     try {
       // This route is protected and gets expenses for the token's user
-      const res = await api.get(`/expenses/`);
-      setExpenses(res.data || []);
+      setExpenses(await fetchAllPages<Expense>(`/expenses/`));
     } catch (err) {
       console.warn("fetchExpenses error", err);
     }